@@ -0,0 +1,85 @@
+from os.path import join, exists
+import typer
+from .dependencies import folder_path
+from .core.engine import create_project_engine
+from .core.migrations import upgrade
+from .core.totals import rebuild_monthly_totals
+from .core.integrity import check
+
+app = typer.Typer(help="Maintenance of project files in PROJECT_FOLDER.")
+
+@app.callback()
+def main():
+    pass
+
+def open_project(project: str):
+    """
+    Return engine of migrated project
+    """
+    file_path = join(folder_path, project)
+
+    if not exists(file_path):
+        raise typer.BadParameter(f'Project {project} not found in {folder_path}')
+
+    engine = create_project_engine(file_path)
+    with engine.begin() as connection:
+        upgrade(connection)
+
+    return engine
+
+@app.command()
+def rebuild_totals(project: str):
+    """
+    Recompute MonthlyTotals of project from its transactions.
+    """
+    engine = open_project(project)
+
+    with engine.begin() as connection:
+        rebuild_monthly_totals(connection)
+        rows = connection.exec_driver_sql('SELECT COUNT(*) FROM MonthlyTotals').scalar()
+
+    engine.dispose()
+    typer.echo(f'{project}: {rows} monthly totals')
+
+@app.command()
+def verify(
+    project: str,
+    repair: bool = typer.Option(False, help="Recompute everything that differs."),
+):
+    """
+    Check balances, balance checkpoints and monthly totals of project
+    against its transactions. Exits with 1 if something differs and isn't repaired.
+
+    Balance is checked against opening balance plus transactions. Projects
+    created before opening balances were stored got it derived from the balance
+    they had then, so a difference made before that is taken as correct:
+    compare derived opening balances (listed here) with real ones and fix
+    them by setting the balance with /account/update.
+    """
+    engine = open_project(project)
+
+    with engine.begin() as connection:
+        result = check(connection, repair)
+
+    engine.dispose()
+
+    for account in result.accounts:
+        typer.echo(
+            f"account {account['id']} {account['title']}: balance {account['balance']}, "
+            f"expected {account['expected']} ({account['difference']:+})"
+        )
+    for account in result.opening_balances:
+        typer.echo(
+            f"account {account['id']} {account['title']}: opening balance {account['opening_balance']}, "
+            f"derived by migration as {account['derived']}"
+        )
+    typer.echo(f'{project}: {result.balance_checkpoints} balance checkpoints, '
+               f'{result.monthly_totals} monthly totals differ')
+
+    if result.repaired:
+        typer.echo(f'{project}: repaired')
+    elif not result.ok:
+        raise typer.Exit(code=1)
+
+if __name__ == '__main__':
+    app()
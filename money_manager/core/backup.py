@@ -0,0 +1,76 @@
+import sqlite3
+import zlib
+from os import getenv, remove
+from os.path import dirname
+from tempfile import NamedTemporaryFile
+from .error import HTTPException, makeDetail
+
+# Downloaded project is a snapshot made with SQLite online backup, so it includes
+# WAL contents and never mixes pages of different transactions.
+
+BACKUP_PAGES = int(getenv('BACKUP_PAGES', 1024))
+DOWNLOAD_CHUNK = 1024 * 1024
+
+COMPRESSIONS = {
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+
+def snapshot(path: str) -> str:
+    """
+    Copy project to hidden temporary file next to it in steps of BACKUP_PAGES pages,
+    return its path
+    """
+    with NamedTemporaryFile(dir=dirname(path), prefix='.', suffix='.download', delete=False) as temp:
+        target_path = temp.name
+
+    source = sqlite3.connect(path, timeout=30, isolation_level=None)
+    target = sqlite3.connect(target_path, isolation_level=None)
+    try:
+        # Read transaction is held for all steps: every step copies pages of the
+        # same snapshot, writers go on in WAL and backup never restarts.
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=BACKUP_PAGES)
+        source.execute('COMMIT')
+    except BaseException:
+        target.close()
+        remove(target_path)
+        raise
+    finally:
+        source.close()
+        target.close()
+
+    return target_path
+
+def compressor(method: str):
+    """
+    Object with compress() and flush() for method, zstd needs zstandard package
+    """
+    if method == 'gzip':
+        # wbits=31 writes gzip header and trailer
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    try:
+        import zstandard
+    except ImportError:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Compression zstd requires zstandard package',
+            )])
+
+    return zstandard.ZstdCompressor().compressobj()
+
+def compressed_chunks(path: str, compress):
+    """
+    Yield file compressed chunk by chunk, file is removed afterwards
+    """
+    try:
+        with open(path, 'rb') as file:
+            while chunk := file.read(DOWNLOAD_CHUNK):
+                if data := compress.compress(chunk):
+                    yield data
+        yield compress.flush()
+    finally:
+        remove(path)
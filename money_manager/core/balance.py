@@ -0,0 +1,76 @@
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, select, update
+from .models import Accounts, BalanceDeferred, Transactions, TransactionStatus
+from .ledger import incoming, outgoing
+
+def balance_deltas(transactions, sign: int = 1) -> dict:
+    """
+    Change of balance per account made by transactions (dicts with Transactions fields),
+    same rules as balance triggers. sign=-1 gives change of removing them.
+    """
+    deltas = defaultdict(Decimal)
+
+    for transaction in transactions:
+        amount = Decimal(transaction['amount'])
+
+        if transaction['transaction_type'] == TransactionStatus.Deposit:
+            deltas[transaction['account_id']] += sign * amount
+        else:
+            deltas[transaction['account_id']] -= sign * amount
+
+        to_account_id = transaction.get('to_account_id')
+        if to_account_id is not None:
+            to_amount = Decimal(transaction.get('to_amount') or 0)
+            deltas[to_account_id] += sign * (to_amount if to_amount != 0 else amount)
+
+    return deltas
+
+async def removed_balance_deltas(session, filter: list) -> dict:
+    """
+    Change of balance per account made by deleting Transactions matching filter,
+    summed by SQLite with the rules of balance delete trigger
+    """
+    sent = (
+        select(
+            Transactions.account_id,
+            (-func.sum(outgoing())).label('delta'),
+        )
+        .where(*filter)
+        .group_by(Transactions.account_id)
+    )
+    received = (
+        select(
+            Transactions.to_account_id,
+            (-func.sum(incoming())).label('delta'),
+        )
+        .where(Transactions.to_account_id.is_not(None), *filter)
+        .group_by(Transactions.to_account_id)
+    )
+
+    deltas = defaultdict(Decimal)
+    for query in (sent, received):
+        for account_id, delta in await session.execute(query):
+            deltas[account_id] += Decimal(str(delta))
+    return deltas
+
+async def defer_balance(session):
+    """
+    Balance triggers stop updating Accounts until apply_balance in this transaction
+    """
+    await session.execute(insert(BalanceDeferred).values(id=1))
+
+async def apply_balance(session, deltas: dict):
+    """
+    Update balance once per account and turn balance triggers back on
+    """
+    for account_id, delta in deltas.items():
+        if delta == 0:
+            continue
+        await session.execute(
+            update(Accounts)
+            .where(Accounts.id == account_id)
+            .values(balance=func.round(Accounts.balance + delta, 2))
+        )
+
+    await session.execute(delete(BalanceDeferred))
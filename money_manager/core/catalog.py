@@ -0,0 +1,138 @@
+import logging
+import sqlite3
+from asyncio import Lock, ensure_future
+from os import scandir, stat
+from os.path import basename, exists, join
+from types import SimpleNamespace
+from fastapi.concurrency import run_in_threadpool
+from watchfiles import awatch
+
+# Transactions count is summed from MonthlyTotals (kept by triggers),
+# projects not migrated yet fall back to counting rows.
+metadata_sql = '''
+SELECT
+	(SELECT SUM(count) FROM MonthlyTotals),
+	(SELECT MAX(date) FROM Transactions)
+'''
+
+def project_name(path: str) -> str | None:
+    """
+    Project file changed by path (database or its WAL), None for other files
+    """
+    name = basename(path)
+    if name.startswith('.'):
+        return None
+    if name.endswith('.db-wal'):
+        name = name[:-len('-wal')]
+    return name if name.endswith('.db') else None
+
+def watch_filter(change, path: str) -> bool:
+    return project_name(path) is not None
+
+def connect_readonly(path: str, wal: bool, **kwargs) -> sqlite3.Connection:
+    """
+    Read only connection to project, wal tells if its -wal exists.
+    Without WAL project is closed and checkpointed: immutable doesn't lock the file
+    or create -wal and -shm, which would stay after read only connection.
+    With WAL its contents must be read, existing -shm is used.
+    """
+    uri = f'file:{path}?mode=ro' if wal else f'file:{path}?mode=ro&immutable=1'
+    return sqlite3.connect(uri, uri=True, **kwargs)
+
+def read_metadata(path: str, cached: SimpleNamespace | None = None) -> SimpleNamespace:
+    """
+    Size and mtime of project (with its WAL), count and date of last transaction.
+    Database isn't opened when size and mtime are the same as cached ones.
+    """
+    info = stat(path)
+    size, mtime = info.st_size, info.st_mtime
+    wal = exists(path + '-wal')
+    if wal:
+        info = stat(path + '-wal')
+        size, mtime = size + info.st_size, max(mtime, info.st_mtime)
+
+    # Reading opens the WAL, watcher reports it as change of the project
+    if cached is not None and (cached.size, cached.mtime) == (size, mtime):
+        return cached
+
+    transactions = last_activity = None
+    try:
+        connection = connect_readonly(path, wal, timeout=1)
+        try:
+            transactions, last_activity = connection.execute(metadata_sql).fetchone()
+        except sqlite3.OperationalError:
+            transactions, last_activity = connection.execute(
+                'SELECT COUNT(*), MAX(date) FROM Transactions'
+            ).fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        # Empty, locked or not a project yet
+        pass
+
+    return SimpleNamespace(
+        name=basename(path),
+        size=size,
+        mtime=mtime,
+        transactions=transactions or 0,
+        last_activity=last_activity,
+    )
+
+class ProjectCatalog:
+    """
+    Projects in folder with their metadata, kept in memory.
+    Folder is scanned once, then watchfiles reports changes made by anyone,
+    changes made by the app itself are applied right away with refresh.
+    Watcher starts on first use, if it stops the folder is scanned again.
+    """
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._projects = {}
+        self._task = None
+        # Concurrent first calls wait for one scan and start one watcher
+        self._lock = Lock()
+
+    async def projects(self) -> dict:
+        async with self._lock:
+            if self._task is None or self._task.done():
+                self._projects = await run_in_threadpool(self._scan)
+                self._task = ensure_future(self._watch())
+        return self._projects
+
+    async def names(self) -> list:
+        return list(await self.projects())
+
+    async def refresh(self, path: str):
+        """
+        Re-read metadata of project, drop it if file doesn't exist anymore
+        """
+        await self._refresh({project_name(path)} - {None})
+
+    async def _refresh(self, names: set):
+        for name in names:
+            path = join(self.folder, name)
+            try:
+                self._projects[name] = await run_in_threadpool(
+                    read_metadata, path, self._projects.get(name)
+                )
+            except FileNotFoundError:
+                self._projects.pop(name, None)
+
+    def _scan(self) -> dict:
+        projects = {}
+        with scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and project_name(entry.name) == entry.name:
+                    try:
+                        projects[entry.name] = read_metadata(entry.path)
+                    except FileNotFoundError:
+                        pass
+        return projects
+
+    async def _watch(self):
+        try:
+            async for changes in awatch(self.folder, watch_filter=watch_filter):
+                names = {project_name(path) for _, path in changes}
+                await self._refresh(names)
+        except Exception:
+            logging.exception(f'Watching {self.folder} failed')
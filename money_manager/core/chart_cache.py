@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from itertools import count
+from os import getenv, stat
+from os.path import abspath, exists
+from sys import getsizeof
+from threading import RLock
+from fastapi.concurrency import run_in_threadpool
+from .catalog import connect_readonly
+
+class ChartCache:
+    """
+    Rendered charts of projects, bounded by size in bytes.
+    Least recently used charts are dropped when cache is full.
+
+    Chart is stored with data_version of its project, which changes every time
+    other connection commits to the file. It's read on a dedicated read only
+    connection (never used for writes), so any commit made through the engines
+    or outside of the app makes cached charts of the project stale.
+    Project without WAL is watched on an immutable connection, which doesn't
+    create -wal and -shm, so its size and mtime are part of the version. Once
+    WAL appears the watcher is reopened read only to see commits in it.
+
+    At most maxwatchers connections are kept open, least recently used one is
+    closed: data_version is only comparable on the same connection, so a version
+    is paired with the watcher that read it. Watchers are opened and read in
+    worker threads, charts are only touched from the event loop.
+    """
+    def __init__(self, maxsize: int, maxwatchers: int):
+        self.maxsize = maxsize
+        self.maxwatchers = maxwatchers
+        self.size = 0
+        self._charts = OrderedDict()
+        self._watchers = OrderedDict()
+        self._generations = count()
+        # Reentrant, _version closes watchers while holding it
+        self._lock = RLock()
+
+    async def version(self, file: str) -> tuple:
+        """
+        Current version of project, must be read before querying chart data
+        """
+        return await run_in_threadpool(self._version, abspath(file))
+
+    def _version(self, file: str) -> tuple:
+        wal = exists(file + '-wal')
+
+        with self._lock:
+            entry = self._watchers.get(file)
+
+            # Immutable watcher doesn't see commits, project was opened since
+            if entry is not None and entry[2] and wal:
+                self._close(file)
+                entry = None
+
+            if entry is None:
+                watcher = connect_readonly(file, wal, check_same_thread=False)
+                entry = self._watchers[file] = (watcher, next(self._generations), not wal)
+
+                while len(self._watchers) > self.maxwatchers:
+                    self._close(next(iter(self._watchers)))
+            else:
+                self._watchers.move_to_end(file)
+
+            watcher, generation, immutable = entry
+            version = (generation, watcher.execute('PRAGMA data_version').fetchone()[0])
+
+        if immutable:
+            info = stat(file)
+            version += (info.st_size, info.st_mtime_ns)
+        return version
+
+    async def get(self, file: str, key: tuple):
+        file = abspath(file)
+        entry = self._charts.get((file, key))
+
+        if entry is None:
+            return None
+
+        version, chart = entry
+        if version != await self.version(file):
+            self._remove((file, key))
+            return None
+
+        if (file, key) in self._charts:
+            self._charts.move_to_end((file, key))
+        return chart
+
+    def put(self, file: str, key: tuple, version: tuple, chart: str):
+        file = abspath(file)
+        size = getsizeof(chart)
+
+        if size > self.maxsize:
+            return
+
+        self._remove((file, key))
+        self._charts[(file, key)] = (version, chart)
+        self.size += size
+
+        while self.size > self.maxsize:
+            self._remove(next(iter(self._charts)))
+
+    async def evict(self, file: str):
+        """
+        Drop charts of the project and close its watcher,
+        must be called before file is removed or replaced and before its
+        engine is disposed: read only watcher left as the last connection
+        can't remove -wal and -shm
+        """
+        file = abspath(file)
+        for entry in [entry for entry in self._charts if entry[0] == file]:
+            self._remove(entry)
+
+        await run_in_threadpool(self._close, file)
+
+    def _close(self, file: str):
+        with self._lock:
+            entry = self._watchers.pop(file, None)
+            if entry is not None:
+                entry[0].close()
+
+    def _remove(self, entry: tuple):
+        cached = self._charts.pop(entry, None)
+        if cached is not None:
+            self.size -= getsizeof(cached[1])
+
+charts = ChartCache(
+    maxsize=int(getenv('CHART_CACHE_SIZE', 8 * 1024 * 1024)),
+    maxwatchers=int(getenv('CHART_CACHE_PROJECTS', 16)),
+)
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from asyncio import ensure_future, shield
+from os import getenv
+from os.path import abspath
+from time import monotonic
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import create_engine
+from fastapi.concurrency import run_in_threadpool
+from .migrations import upgrade
+from .chart_cache import charts
+
+PRAGMAS = (
+    'PRAGMA foreign_keys=ON',
+    # readers don't block the writer, needed once requests run concurrently
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+
+POOL_SIZE = int(getenv('ENGINE_POOL_SIZE', 5))
+POOL_OVERFLOW = int(getenv('ENGINE_POOL_OVERFLOW', 10))
+
+def set_pragmas(dbapi_connection, connection_record):
+    """
+    Applies PRAGMAS to every new pooled connection
+    """
+    cursor = dbapi_connection.cursor()
+    for pragma in PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def create_project_engine(file: str) -> Engine:
+    engine = create_engine(f"sqlite:///{file}")
+    event.listen(engine, "connect", set_pragmas)
+    return engine
+
+def create_async_project_engine(file: str) -> AsyncEngine:
+    # aiosqlite defaults to NullPool for files, connections are kept explicitly
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{file}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_OVERFLOW,
+    )
+    event.listen(engine.sync_engine, "connect", set_pragmas)
+    return engine
+
+def migrate(file: str):
+    """
+    Apply missing migrations to project on its own short-lived connection
+    """
+    engine = create_project_engine(file)
+    try:
+        with engine.begin() as connection:
+            upgrade(connection)
+    finally:
+        engine.dispose()
+
+async def prepare_engine(engine):
+    # Migrations of big project take seconds, event loop keeps serving meanwhile
+    await run_in_threadpool(migrate, engine.url.database)
+
+async def dispose(engines: list):
+    for engine in engines:
+        # Chart watcher closes first, so last connection of engine removes WAL
+        await charts.evict(engine.url.database)
+        await engine.dispose()
+
+class EngineRegistry:
+    """
+    Process-wide cache with one engine (and its connection pool) per project file.
+    Least recently used engines are disposed when the registry is full,
+    engines unused for longer than idle_timeout seconds are disposed on next access.
+
+    Registry is only used from the event loop: bookkeeping is done without
+    awaiting, disposing of retired engines happens afterwards.
+    Prepare (project migrations) runs once for every new engine,
+    concurrent requests wait for it before engine is returned.
+    """
+    def __init__(self, factory, prepare, maxsize: int, idle_timeout: float):
+        self.factory = factory
+        self.prepare = prepare
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._engines = OrderedDict()
+        self._preparing = {}
+
+    async def get(self, file: str):
+        file = abspath(file)
+        now = monotonic()
+        retired = self._expire(now)
+
+        entry = self._engines.pop(file, None)
+        engine = entry[0] if entry else self.factory(file)
+        self._engines[file] = (engine, now)
+
+        while len(self._engines) > self.maxsize:
+            _, (old_engine, _) = self._engines.popitem(last=False)
+            retired.append(old_engine)
+
+        if entry is None:
+            self._preparing[file] = ensure_future(self.prepare(engine))
+
+        await dispose(retired)
+
+        if file in self._preparing:
+            await self._wait_prepared(file, engine)
+
+        return engine
+
+    async def _wait_prepared(self, file: str, engine):
+        task = self._preparing[file]
+        try:
+            await shield(task)
+        except Exception:
+            # Next request tries again with new engine
+            if self._engines.get(file, (None,))[0] is engine:
+                del self._engines[file]
+                await dispose([engine])
+            raise
+        finally:
+            if self._preparing.get(file) is task:
+                del self._preparing[file]
+
+    async def evict(self, file: str):
+        """
+        Dispose engine of the project, must be called before file is removed or replaced
+        """
+        entry = self._engines.pop(abspath(file), None)
+        if entry:
+            await dispose([entry[0]])
+
+    async def clear(self):
+        retired = [engine for engine, _ in self._engines.values()]
+        self._engines.clear()
+        await dispose(retired)
+
+    def _expire(self, now: float) -> list:
+        expired = [
+            file for file, (_, last_used) in self._engines.items()
+            if now - last_used > self.idle_timeout
+        ]
+        return [self._engines.pop(file)[0] for file in expired]
+
+async_engines = EngineRegistry(
+    create_async_project_engine,
+    prepare_engine,
+    maxsize=int(getenv('ENGINE_CACHE_SIZE', 16)),
+    idle_timeout=float(getenv('ENGINE_IDLE_TIMEOUT', 600)),
+)
+
+async def evict(file: str):
+    """
+    Dispose engine of the project and drop its cached charts
+    """
+    await charts.evict(file)
+    await async_engines.evict(file)
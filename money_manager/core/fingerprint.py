@@ -0,0 +1,17 @@
+import re
+from decimal import Decimal
+from hashlib import blake2b
+
+def normalize(description: str | None) -> str:
+    """
+    Case, punctuation and spacing of description don't matter
+    """
+    return ' '.join(re.findall(r'\w+', (description or '').casefold()))
+
+def fingerprint(account_id: int, date, amount, description: str | None) -> str:
+    """
+    Hash of account, date, amount and normalized description,
+    same statement line imported twice has same fingerprint
+    """
+    value = f'{account_id}|{date}|{Decimal(amount):.2f}|{normalize(description)}'
+    return blake2b(value.encode(), digest_size=12).hexdigest()
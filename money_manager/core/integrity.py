@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+from .ledger import rebuild_balances
+from .totals import monthly_totals_sql
+
+# Balances and derived tables kept by triggers, checked against Transactions.
+# Transactions are grouped once for MonthlyTotals, balance checkpoints are summed
+# from that plus one pass over transfers only.
+
+expected_checkpoints_sql = '''
+SELECT account_id, month, ROUND(SUM(delta), 2), SUM(count)
+FROM (
+	SELECT account_id, month, CASE WHEN type = 'Deposit' THEN total ELSE -total END AS delta, count
+	FROM ExpectedTotals
+	UNION ALL
+	SELECT to_account_id, substr(date, 1, 7), CASE WHEN to_amount <> 0 THEN to_amount ELSE amount END, 1
+	FROM Transactions NOT INDEXED
+	WHERE to_account_id IS NOT NULL
+)
+GROUP BY account_id, month
+'''
+
+# Rows of left table missing in right one, both sides rounded the same way
+difference_sql = '''
+SELECT COUNT(*) FROM (
+	SELECT {columns} FROM {left}
+	EXCEPT
+	SELECT {columns} FROM {right}
+)
+'''
+
+accounts_sql = '''
+SELECT Accounts.id, Accounts.title,
+	ROUND(Accounts.balance, 2) AS balance,
+	ROUND(Accounts.opening_balance + COALESCE(expected.delta, 0), 2) AS expected
+FROM Accounts
+LEFT JOIN (
+	SELECT account_id, SUM(delta) AS delta FROM ExpectedCheckpoints GROUP BY account_id
+) AS expected ON expected.account_id = Accounts.id
+WHERE ROUND(Accounts.balance, 2) <> ROUND(Accounts.opening_balance + COALESCE(expected.delta, 0), 2)
+ORDER BY Accounts.id
+'''
+
+# Opening balances derived by migration, any drift before it is part of them
+opening_balances_sql = '''
+SELECT Accounts.id, Accounts.title,
+	ROUND(Accounts.opening_balance, 2) AS opening_balance,
+	ROUND(derived.opening_balance, 2) AS derived
+FROM DerivedOpeningBalances AS derived
+JOIN Accounts ON Accounts.id = derived.account_id
+ORDER BY Accounts.id
+'''
+
+CHECKPOINT_COLUMNS = 'account_id, month, ROUND(delta, 2), count'
+TOTAL_COLUMNS = 'account_id, category_id, month, type, ROUND(total, 2), count'
+
+def mismatched(connection, left: str, right: str, columns: str) -> int:
+    """
+    Number of rows differing between two tables, counted both ways
+    """
+    count = 0
+    for a, b in ((left, right), (right, left)):
+        sql = difference_sql.format(columns=columns, left=a, right=b)
+        count += connection.exec_driver_sql(sql).scalar()
+    return count
+
+def compare(connection) -> SimpleNamespace:
+    accounts = [
+        dict(row, difference=round(row['balance'] - row['expected'], 2))
+        for row in connection.exec_driver_sql(accounts_sql).mappings()
+    ]
+    checkpoints = mismatched(connection, 'ExpectedCheckpoints', 'BalanceCheckpoints', CHECKPOINT_COLUMNS)
+    totals = mismatched(connection, 'ExpectedTotals', 'MonthlyTotals', TOTAL_COLUMNS)
+    opening_balances = [dict(row) for row in connection.exec_driver_sql(opening_balances_sql).mappings()]
+
+    return SimpleNamespace(
+        ok=not accounts and not checkpoints and not totals,
+        accounts=accounts,
+        balance_checkpoints=checkpoints,
+        monthly_totals=totals,
+        opening_balances=opening_balances,
+    )
+
+def repair(connection):
+    """
+    Replace MonthlyTotals and BalanceCheckpoints with expected ones,
+    then recompute Accounts.balance from them
+    """
+    connection.exec_driver_sql('DELETE FROM MonthlyTotals')
+    connection.exec_driver_sql('INSERT INTO MonthlyTotals SELECT * FROM ExpectedTotals')
+    connection.exec_driver_sql('DELETE FROM BalanceCheckpoints')
+    connection.exec_driver_sql('INSERT INTO BalanceCheckpoints SELECT * FROM ExpectedCheckpoints')
+    rebuild_balances(connection)
+
+def check(connection, fix: bool = False) -> SimpleNamespace:
+    """
+    Compare Accounts.balance, BalanceCheckpoints and MonthlyTotals with values
+    recomputed from Transactions, with fix repair them when anything differs.
+    Runs under write lock when fixing, result describes state before repair.
+    Opening balances derived by migration are listed, they can't be checked.
+    """
+    if fix:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    connection.exec_driver_sql(
+        'CREATE TEMP TABLE ExpectedTotals (account_id, category_id, month, type, total, count)'
+    )
+    connection.exec_driver_sql(
+        'CREATE TEMP TABLE ExpectedCheckpoints (account_id, month, delta, count)'
+    )
+
+    try:
+        connection.exec_driver_sql(f'INSERT INTO ExpectedTotals {monthly_totals_sql}')
+        connection.exec_driver_sql(f'INSERT INTO ExpectedCheckpoints {expected_checkpoints_sql}')
+
+        result = compare(connection)
+        result.repaired = fix and not result.ok
+
+        if result.repaired:
+            repair(connection)
+    finally:
+        connection.exec_driver_sql('DROP TABLE temp.ExpectedTotals')
+        connection.exec_driver_sql('DROP TABLE temp.ExpectedCheckpoints')
+
+    return result
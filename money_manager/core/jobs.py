@@ -0,0 +1,29 @@
+from asyncio import ensure_future
+from os.path import abspath
+from types import SimpleNamespace
+
+class JobRegistry:
+    """
+    Background jobs running in this process, keyed by project file and job id.
+    Tasks are referenced here until they finish, so they aren't garbage collected.
+    Job is removed when its task is done, its progress and final state
+    are in the project (ImportJobs).
+    """
+    def __init__(self):
+        self._jobs = {}
+
+    def start(self, file: str, id: int, work) -> SimpleNamespace:
+        """
+        Run work() as asyncio task
+        """
+        key = (abspath(file), id)
+        job = SimpleNamespace(id=id, task=ensure_future(work()))
+
+        self._jobs[key] = job
+        job.task.add_done_callback(lambda _: self._jobs.pop(key, None))
+        return job
+
+    def get(self, file: str, id: int) -> SimpleNamespace | None:
+        return self._jobs.get((abspath(file), id))
+
+jobs = JobRegistry()
@@ -0,0 +1,123 @@
+from datetime import date
+from sqlalchemy import Float, case, cast, func
+from sqlmodel import select
+from .models import Accounts, BalanceCheckpoints, Transactions, TransactionStatus
+
+# Balance of account on any day is opening_balance, plus deltas of months before it
+# from BalanceCheckpoints, plus transactions of its own month up to the day.
+# Current balance is still kept in Accounts.balance by triggers.
+
+balance_checkpoints_sql = '''
+SELECT account_id, month, ROUND(SUM(delta), 2), COUNT(*)
+FROM (
+	SELECT account_id, substr(date, 1, 7) AS month,
+		CASE WHEN transaction_type = 'Deposit' THEN amount ELSE -amount END AS delta
+	FROM Transactions
+	UNION ALL
+	SELECT to_account_id, substr(date, 1, 7),
+		CASE WHEN to_amount <> 0 THEN to_amount ELSE amount END
+	FROM Transactions
+	WHERE to_account_id IS NOT NULL
+)
+GROUP BY account_id, month
+'''
+
+rebuild_balance_checkpoints_sql = f'''
+INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+{balance_checkpoints_sql}
+'''
+
+rebuild_balances_sql = '''
+UPDATE Accounts
+SET balance = ROUND(opening_balance + COALESCE(
+	(SELECT SUM(delta) FROM BalanceCheckpoints WHERE account_id = Accounts.id), 0
+), 2)
+'''
+
+def rebuild_balance_checkpoints(connection):
+    """
+    Recompute BalanceCheckpoints from Transactions in one pass
+    """
+    connection.exec_driver_sql('DELETE FROM BalanceCheckpoints')
+    connection.exec_driver_sql(rebuild_balance_checkpoints_sql)
+
+def rebuild_balances(connection):
+    """
+    Recompute Accounts.balance from opening_balance and BalanceCheckpoints
+    """
+    connection.exec_driver_sql(rebuild_balances_sql)
+
+def outgoing():
+    """
+    Change of account_id balance made by transaction
+    """
+    return case(
+        (Transactions.transaction_type == TransactionStatus.Deposit, Transactions.amount),
+        else_=-Transactions.amount,
+    )
+
+def incoming():
+    """
+    Change of to_account_id balance made by transaction
+    """
+    return case(
+        (Transactions.to_amount != 0, Transactions.to_amount),
+        else_=Transactions.amount,
+    )
+
+async def balance_at(session, account_id: int, day: date):
+    """
+    Balance of account at the end of day, None if account doesn't exist
+    """
+    month = day.strftime('%Y-%m')
+    first = day.replace(day=1)
+
+    before = (
+        select(func.coalesce(func.sum(BalanceCheckpoints.delta), 0))
+        .where(BalanceCheckpoints.account_id == account_id, BalanceCheckpoints.month < month)
+        .scalar_subquery()
+    )
+    sent = (
+        select(func.coalesce(func.sum(outgoing()), 0))
+        .where(Transactions.account_id == account_id, Transactions.date >= first, Transactions.date <= day)
+        .scalar_subquery()
+    )
+    received = (
+        select(func.coalesce(func.sum(incoming()), 0))
+        .where(Transactions.to_account_id == account_id, Transactions.date >= first, Transactions.date <= day)
+        .scalar_subquery()
+    )
+
+    query = (
+        select(cast(func.round(Accounts.opening_balance + before + sent + received, 2), Float))
+        .where(Accounts.id == account_id)
+    )
+    return (await session.execute(query)).scalar_one_or_none()
+
+async def balance_history(session, account_id: int, first=None, last=None) -> list:
+    """
+    Change and closing balance of account per month with transactions,
+    first and last are months 'YYYY-MM'
+    """
+    running = func.sum(BalanceCheckpoints.delta).over(order_by=BalanceCheckpoints.month)
+    history = (
+        select(
+            BalanceCheckpoints.month,
+            cast(func.round(BalanceCheckpoints.delta, 2), Float).label('delta'),
+            cast(func.round(Accounts.opening_balance + running, 2), Float).label('balance'),
+        )
+        .join(Accounts, Accounts.id == BalanceCheckpoints.account_id)
+        .where(BalanceCheckpoints.account_id == account_id)
+        .subquery()
+    )
+
+    # Range is applied after the running sum, so it includes earlier months
+    filter = []
+    if first:
+        filter.append(history.c.month >= first)
+    if last:
+        filter.append(history.c.month <= last)
+
+    query = select(history).where(*filter).order_by(history.c.month)
+    results = await session.execute(query)
+    return [dict(row) for row in results.mappings()]
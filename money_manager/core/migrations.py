@@ -0,0 +1,670 @@
+import logging
+from contextlib import contextmanager
+from sqlalchemy import inspect
+from sqlmodel import SQLModel
+from .models import Transactions, MonthlyTotals, BalanceDeferred, BalanceCheckpoints
+from .totals import rebuild_monthly_totals
+from .ledger import rebuild_balance_checkpoints
+from .fingerprint import fingerprint
+from .search import create_transactions_search, rebuild_transactions_search
+from .triggers import (
+    update_balance_on_transaction_delete,
+    update_balance_on_transaction_insert,
+    update_balance_on_transaction_update,
+    update_to_account_balance,
+    update_monthly_totals_on_transaction_insert,
+    update_monthly_totals_on_transaction_delete,
+    update_monthly_totals_on_transaction_update,
+    update_search_on_transaction_insert,
+    update_search_on_transaction_delete,
+    update_search_on_transaction_update,
+    update_search_on_category_update,
+    update_search_on_tag_update,
+    update_balance_checkpoints_on_transaction_insert,
+    update_balance_checkpoints_on_transaction_delete,
+    update_balance_checkpoints_on_transaction_update,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tables SQLModel.metadata doesn't know about
+VIRTUAL_TABLES = (
+    create_transactions_search,
+)
+
+# Triggers of the latest schema version
+TRIGGERS = (
+    update_balance_on_transaction_delete,
+    update_balance_on_transaction_insert,
+    update_balance_on_transaction_update,
+    update_to_account_balance,
+    update_monthly_totals_on_transaction_insert,
+    update_monthly_totals_on_transaction_delete,
+    update_monthly_totals_on_transaction_update,
+    update_search_on_transaction_insert,
+    update_search_on_transaction_delete,
+    update_search_on_transaction_update,
+    update_search_on_category_update,
+    update_search_on_tag_update,
+    update_balance_checkpoints_on_transaction_insert,
+    update_balance_checkpoints_on_transaction_delete,
+    update_balance_checkpoints_on_transaction_update,
+)
+
+def create_indexes(connection, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(connection, checkfirst=True)
+
+def add_transactions_indexes(connection):
+    create_indexes(connection, Transactions.__table__, (
+        'ix_Transactions_date',
+        'ix_Transactions_account_id_date',
+        'ix_Transactions_to_account_id_date',
+        'ix_Transactions_category_id_date',
+        'ix_Transactions_tag_id_date',
+    ))
+
+# DDL below is frozen as it was when each migration was added, so its result
+# doesn't change with triggers.py, which only create_schema uses.
+
+v2_monthly_totals_insert = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO MonthlyTotals (account_id, category_id, month, type, total, count)
+	VALUES (new.account_id, new.category_id, substr(new.date, 1, 7), new.transaction_type, ROUND(new.amount, 2), 1)
+	ON CONFLICT (account_id, category_id, month, type) DO UPDATE
+	SET total = ROUND(total + excluded.total, 2), count = count + 1;
+END
+'''
+
+v2_monthly_totals_delete = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	UPDATE MonthlyTotals
+	SET total = ROUND(total - old.amount, 2), count = count - 1
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type;
+
+	DELETE FROM MonthlyTotals
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type
+		AND count <= 0;
+END
+'''
+
+v2_monthly_totals_update = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Update
+AFTER UPDATE OF account_id, category_id, transaction_type, date, amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Remove OLD data
+	UPDATE MonthlyTotals
+	SET total = ROUND(total - old.amount, 2), count = count - 1
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type;
+
+	DELETE FROM MonthlyTotals
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type
+		AND count <= 0;
+
+	-- Add NEW data
+	INSERT INTO MonthlyTotals (account_id, category_id, month, type, total, count)
+	VALUES (new.account_id, new.category_id, substr(new.date, 1, 7), new.transaction_type, ROUND(new.amount, 2), 1)
+	ON CONFLICT (account_id, category_id, month, type) DO UPDATE
+	SET total = ROUND(total + excluded.total, 2), count = count + 1;
+END
+'''
+
+def add_monthly_totals(connection):
+    MonthlyTotals.__table__.create(connection, checkfirst=True)
+
+    connection.exec_driver_sql(v2_monthly_totals_insert)
+    connection.exec_driver_sql(v2_monthly_totals_delete)
+    connection.exec_driver_sql(v2_monthly_totals_update)
+
+    rebuild_monthly_totals(connection)
+
+v3_transactions_search = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS TransactionsSearch USING fts5(
+	description,
+	category,
+	tag,
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+)
+'''
+
+v3_search_transaction_insert = '''
+CREATE TRIGGER Update_Search_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO TransactionsSearch (rowid, description, category, tag)
+	VALUES (
+		new.id,
+		new.description,
+		(SELECT title FROM Categories WHERE id = new.category_id),
+		(SELECT title FROM Tags WHERE id = new.tag_id)
+	);
+END
+'''
+
+v3_search_transaction_delete = '''
+CREATE TRIGGER Update_Search_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	DELETE FROM TransactionsSearch WHERE rowid = old.id;
+END
+'''
+
+v3_search_transaction_update = '''
+CREATE TRIGGER Update_Search_On_Transaction_Update
+AFTER UPDATE OF description, category_id, tag_id ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Tag delete sets tag_id to NULL, so it's handled here too
+	UPDATE TransactionsSearch
+	SET description = new.description,
+		category = (SELECT title FROM Categories WHERE id = new.category_id),
+		tag = (SELECT title FROM Tags WHERE id = new.tag_id)
+	WHERE rowid = new.id;
+END
+'''
+
+v3_search_category_update = '''
+CREATE TRIGGER Update_Search_On_Category_Update
+AFTER UPDATE OF title ON Categories
+FOR EACH ROW
+
+BEGIN
+	UPDATE TransactionsSearch
+	SET category = new.title
+	WHERE rowid IN (SELECT id FROM Transactions WHERE category_id = new.id);
+END
+'''
+
+v3_search_tag_update = '''
+CREATE TRIGGER Update_Search_On_Tag_Update
+AFTER UPDATE OF title ON Tags
+FOR EACH ROW
+
+BEGIN
+	UPDATE TransactionsSearch
+	SET tag = new.title
+	WHERE rowid IN (SELECT id FROM Transactions WHERE tag_id = new.id);
+END
+'''
+
+def add_transactions_search(connection):
+    connection.exec_driver_sql(v3_transactions_search)
+
+    connection.exec_driver_sql(v3_search_transaction_insert)
+    connection.exec_driver_sql(v3_search_transaction_delete)
+    connection.exec_driver_sql(v3_search_transaction_update)
+    connection.exec_driver_sql(v3_search_category_update)
+    connection.exec_driver_sql(v3_search_tag_update)
+
+    rebuild_transactions_search(connection)
+
+v4_balance_insert = '''
+CREATE TRIGGER Update_Balance_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
+
+BEGIN
+	UPDATE Accounts
+	SET balance = CASE
+		WHEN new.transaction_type = 'Withdrawal' OR new.transaction_type = 'Transfer'
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) - new.amount, 2)
+		
+		WHEN new.transaction_type = 'Deposit'
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) + new.amount, 2)
+		
+		ELSE RAISE(IGNORE)
+	END WHERE id = new.account_id;
+	
+	UPDATE Accounts
+	SET balance = CASE
+		WHEN new.to_account_id IS NOT NULL AND (new.to_amount IS NOT NULL AND new.to_amount <> 0)
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.to_amount, 2)
+		
+		WHEN new.to_account_id IS NOT NULL AND new.amount IS NOT NULL
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.amount, 2)
+		
+		ELSE RAISE(IGNORE)
+	END WHERE id = new.to_account_id;
+END;
+'''
+
+def add_balance_deferred(connection):
+    BalanceDeferred.__table__.create(connection, checkfirst=True)
+
+    connection.exec_driver_sql('DROP TRIGGER IF EXISTS Update_Balance_On_Transaction_Insert')
+    connection.exec_driver_sql(v4_balance_insert)
+
+v5_import_jobs = '''
+CREATE TABLE IF NOT EXISTS "ImportJobs" (
+	id INTEGER NOT NULL,
+	account_id INTEGER NOT NULL,
+	source VARCHAR(255) NOT NULL,
+	status VARCHAR(7),
+	rows INTEGER NOT NULL,
+	errors VARCHAR,
+	balance NUMERIC,
+	created_at DATETIME NOT NULL,
+	started_at DATETIME,
+	finished_at DATETIME,
+	PRIMARY KEY (id)
+)
+'''
+
+def add_import_jobs(connection):
+    connection.exec_driver_sql(v5_import_jobs)
+
+def add_transactions_fingerprint(connection):
+    connection.exec_driver_sql('ALTER TABLE Transactions ADD COLUMN fingerprint VARCHAR(24)')
+    connection.exec_driver_sql(
+        'ALTER TABLE Transactions ADD COLUMN duplicate_of INTEGER '
+        'REFERENCES Transactions (id) ON DELETE SET NULL'
+    )
+    create_indexes(connection, Transactions.__table__, ('ix_Transactions_fingerprint',))
+
+    rows = connection.exec_driver_sql(
+        'SELECT id, account_id, date, amount, description FROM Transactions'
+    ).all()
+    # Empty parameter list would run the statement once without parameters
+    if not rows:
+        return
+    connection.exec_driver_sql(
+        'UPDATE Transactions SET fingerprint = ? WHERE id = ?',
+        [(fingerprint(account_id, date, amount, description), id)
+            for id, account_id, date, amount, description in rows],
+    )
+
+v7_balance_delete = '''
+CREATE TRIGGER Update_Balance_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
+
+BEGIN
+	UPDATE Accounts
+	SET balance = CASE
+		WHEN old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer'
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) + old.amount, 2)
+		
+		WHEN old.transaction_type = 'Deposit'
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) - old.amount, 2)
+		
+		ELSE RAISE(ABORT, "ELSE UPDATE Accounts ON DELETE")
+	END WHERE id = old.account_id;
+	
+	UPDATE Accounts
+	SET balance = CASE
+		WHEN old.to_account_id IS NOT NULL AND (old.to_amount IS NOT NULL AND old.to_amount <> 0)
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.to_amount, 2)
+		
+		WHEN old.to_account_id IS NOT NULL AND old.amount IS NOT NULL
+		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.amount, 2)
+		
+		ELSE RAISE(IGNORE)
+	END WHERE id = old.to_account_id;
+END
+'''
+
+def defer_balance_on_bulk_delete(connection):
+    connection.exec_driver_sql('DROP TRIGGER IF EXISTS Update_Balance_On_Transaction_Delete')
+    connection.exec_driver_sql(v7_balance_delete)
+    # Without it every deleted row scans Transactions for ON DELETE SET NULL
+    create_indexes(connection, Transactions.__table__, ('ix_Transactions_duplicate_of',))
+
+v8_balance_delete = '''
+CREATE TRIGGER Update_Balance_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
+
+BEGIN
+	UPDATE Accounts
+	SET balance = ROUND(balance - CASE
+		WHEN old.transaction_type = 'Deposit' THEN old.amount
+		ELSE -old.amount
+	END, 2)
+	WHERE id = old.account_id;
+
+	UPDATE Accounts
+	SET balance = ROUND(balance - CASE
+		WHEN old.to_amount <> 0 THEN old.to_amount
+		ELSE old.amount
+	END, 2)
+	WHERE id = old.to_account_id;
+END
+'''
+
+v8_balance_insert = '''
+CREATE TRIGGER Update_Balance_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
+
+BEGIN
+	UPDATE Accounts
+	SET balance = ROUND(balance + CASE
+		WHEN new.transaction_type = 'Deposit' THEN new.amount
+		ELSE -new.amount
+	END, 2)
+	WHERE id = new.account_id;
+
+	UPDATE Accounts
+	SET balance = ROUND(balance + CASE
+		WHEN new.to_amount <> 0 THEN new.to_amount
+		ELSE new.amount
+	END, 2)
+	WHERE id = new.to_account_id;
+END
+'''
+
+v8_balance_update = '''
+CREATE TRIGGER Update_Balance_On_Transaction_Update
+AFTER UPDATE OF account_id, transaction_type, amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Revert OLD data, then apply NEW data, account may be the same
+	UPDATE Accounts
+	SET balance = ROUND(balance - CASE
+		WHEN old.transaction_type = 'Deposit' THEN old.amount
+		ELSE -old.amount
+	END, 2)
+	WHERE id = old.account_id;
+
+	UPDATE Accounts
+	SET balance = ROUND(balance + CASE
+		WHEN new.transaction_type = 'Deposit' THEN new.amount
+		ELSE -new.amount
+	END, 2)
+	WHERE id = new.account_id;
+END
+'''
+
+v8_to_account_balance = '''
+CREATE TRIGGER Update_ToAccount_Balance
+AFTER UPDATE OF to_account_id, amount, to_amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Revert OLD data, then apply NEW data, account may be the same
+	UPDATE Accounts
+	SET balance = ROUND(balance - CASE
+		WHEN old.to_amount <> 0 THEN old.to_amount
+		ELSE old.amount
+	END, 2)
+	WHERE id = old.to_account_id;
+
+	UPDATE Accounts
+	SET balance = ROUND(balance + CASE
+		WHEN new.to_amount <> 0 THEN new.to_amount
+		ELSE new.amount
+	END, 2)
+	WHERE id = new.to_account_id;
+END
+'''
+
+v8_checkpoints_insert = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	VALUES (
+		new.account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.transaction_type = 'Deposit' THEN new.amount ELSE -new.amount END,
+		1
+	)
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	SELECT
+		new.to_account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.to_amount <> 0 THEN new.to_amount ELSE new.amount END,
+		1
+	WHERE new.to_account_id IS NOT NULL
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+END
+'''
+
+v8_checkpoints_delete = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.transaction_type = 'Deposit' THEN old.amount ELSE -old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.account_id AND month = substr(old.date, 1, 7);
+
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.to_amount <> 0 THEN old.to_amount ELSE old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.to_account_id AND month = substr(old.date, 1, 7);
+
+	DELETE FROM BalanceCheckpoints
+	WHERE account_id IN (old.account_id, old.to_account_id)
+		AND month = substr(old.date, 1, 7)
+		AND count <= 0;
+END
+'''
+
+v8_checkpoints_update = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Update
+AFTER UPDATE OF account_id, to_account_id, transaction_type, date, amount, to_amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Remove OLD data
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.transaction_type = 'Deposit' THEN old.amount ELSE -old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.account_id AND month = substr(old.date, 1, 7);
+
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.to_amount <> 0 THEN old.to_amount ELSE old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.to_account_id AND month = substr(old.date, 1, 7);
+
+	DELETE FROM BalanceCheckpoints
+	WHERE account_id IN (old.account_id, old.to_account_id)
+		AND month = substr(old.date, 1, 7)
+		AND count <= 0;
+
+	-- Add NEW data
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	VALUES (
+		new.account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.transaction_type = 'Deposit' THEN new.amount ELSE -new.amount END,
+		1
+	)
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	SELECT
+		new.to_account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.to_amount <> 0 THEN new.to_amount ELSE new.amount END,
+		1
+	WHERE new.to_account_id IS NOT NULL
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+END
+'''
+
+v8_derived_opening_balances = '''
+CREATE TABLE IF NOT EXISTS "DerivedOpeningBalances" (
+	account_id INTEGER NOT NULL,
+	opening_balance NUMERIC NOT NULL,
+	PRIMARY KEY (account_id),
+	FOREIGN KEY(account_id) REFERENCES "Accounts" (id) ON DELETE CASCADE
+)
+'''
+
+def add_balance_checkpoints(connection):
+    connection.exec_driver_sql(
+        'ALTER TABLE Accounts ADD COLUMN opening_balance NUMERIC NOT NULL DEFAULT 0'
+    )
+    BalanceCheckpoints.__table__.create(connection, checkfirst=True)
+
+    # Same rules without reading balance back in subselects
+    for name, trigger in (
+        ('Update_Balance_On_Transaction_Delete', v8_balance_delete),
+        ('Update_Balance_On_Transaction_Insert', v8_balance_insert),
+        ('Update_Balance_On_Transaction_Update', v8_balance_update),
+        ('Update_ToAccount_Balance', v8_to_account_balance),
+    ):
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+        connection.exec_driver_sql(trigger)
+
+    connection.exec_driver_sql(v8_checkpoints_insert)
+    connection.exec_driver_sql(v8_checkpoints_delete)
+    connection.exec_driver_sql(v8_checkpoints_update)
+
+    rebuild_balance_checkpoints(connection)
+
+    # Current balance is kept, what it was before all transactions is derived from it
+    connection.exec_driver_sql('''
+        UPDATE Accounts
+        SET opening_balance = ROUND(balance - COALESCE(
+            (SELECT SUM(delta) FROM BalanceCheckpoints WHERE account_id = Accounts.id), 0
+        ), 2)
+    ''')
+
+    # Any earlier drift of balance is now part of opening_balance, verify can't see it
+    # but lists derived values. Only a negative one hints at drift by itself.
+    connection.exec_driver_sql(v8_derived_opening_balances)
+    connection.exec_driver_sql(
+        'INSERT INTO DerivedOpeningBalances (account_id, opening_balance) '
+        'SELECT id, opening_balance FROM Accounts'
+    )
+    for id, title, opening_balance in connection.exec_driver_sql(
+        'SELECT id, title, opening_balance FROM Accounts WHERE opening_balance < 0 ORDER BY id'
+    ):
+        logger.warning(
+            f'Account {id} {title}: derived opening balance {opening_balance} is negative, '
+            f'check it against the real one'
+        )
+
+def add_import_jobs_updated_at(connection):
+    connection.exec_driver_sql('ALTER TABLE ImportJobs ADD COLUMN updated_at DATETIME')
+
+def add_derived_opening_balances(connection):
+    # Created by add_balance_checkpoints since it stores derived values,
+    # projects migrated by it earlier get an empty one
+    connection.exec_driver_sql(v8_derived_opening_balances)
+
+# Project with user_version N has MIGRATIONS[:N] applied.
+# Append only, version 0 is a project created before migrations.
+MIGRATIONS = (
+    add_transactions_indexes,
+    add_monthly_totals,
+    add_transactions_search,
+    add_balance_deferred,
+    add_import_jobs,
+    add_transactions_fingerprint,
+    defer_balance_on_bulk_delete,
+    add_balance_checkpoints,
+    add_import_jobs_updated_at,
+    add_derived_opening_balances,
+)
+
+VERSION = len(MIGRATIONS)
+
+def get_version(connection) -> int:
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+def set_version(connection, version: int):
+    connection.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+
+@contextmanager
+def write_lock(connection):
+    """
+    Run block in its own BEGIN IMMEDIATE transaction: concurrent openers wait
+    for it, and on error nothing of it is left in the file
+    """
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.exec_driver_sql('ROLLBACK')
+        raise
+    connection.exec_driver_sql('COMMIT')
+
+def has_schema(connection) -> bool:
+    return inspect(connection).has_table(Transactions.__tablename__)
+
+def create_schema(connection):
+    """
+    Create tables and triggers of the latest version in new project
+    """
+    with write_lock(connection):
+        # Concurrent opener may have created it meanwhile
+        if has_schema(connection):
+            return
+
+        SQLModel.metadata.create_all(connection)
+
+        for virtual_table in VIRTUAL_TABLES:
+            connection.exec_driver_sql(virtual_table)
+
+        for trigger in TRIGGERS:
+            connection.exec_driver_sql(trigger)
+
+        set_version(connection, VERSION)
+
+def upgrade(connection):
+    """
+    Apply migrations missing in project.
+    Runs under write lock, so concurrent processes don't apply them twice.
+    """
+    if get_version(connection) >= VERSION:
+        return
+
+    with write_lock(connection):
+        version = get_version(connection)
+
+        # Empty file, schema is created by create_schema
+        if version >= VERSION or not has_schema(connection):
+            return
+
+        for migration in MIGRATIONS[version:]:
+            migration(connection)
+
+        set_version(connection, VERSION)
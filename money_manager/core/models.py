@@ -1,5 +1,5 @@
 import enum
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from typing import List, Optional
 from pydantic import BaseModel
@@ -9,6 +9,7 @@ from sqlmodel import (
     Column,
     Enum,
     Relationship,
+    Index,
 )
 
 class SQLModel(BaseSQLModel):
@@ -28,6 +29,9 @@ class Accounts(SQLModel, table=True):
     title: str = Field(unique=True, max_length=255)
     currency: str = Field(default=None, max_length=255)
     balance: Decimal = Field(default=0, decimal_places=2)
+    # Balance before all transactions, balance = opening_balance + sum of BalanceCheckpoints.
+    # Internal, not part of account responses.
+    opening_balance: Decimal = Field(default=0, decimal_places=2, exclude=True)
 
     transactions: List["Transactions"] = Relationship(
         cascade_delete=True,
@@ -68,6 +72,16 @@ class Tags(SQLModel, table=True):
 
 class Transactions(SQLModel, table=True):
     __tablename__ = 'Transactions'
+    # id is rowid, so every index also ends with id and serves (date desc, id desc) order
+    __table_args__ = (
+        Index('ix_Transactions_date', 'date'),
+        Index('ix_Transactions_account_id_date', 'account_id', 'date'),
+        Index('ix_Transactions_to_account_id_date', 'to_account_id', 'date'),
+        Index('ix_Transactions_category_id_date', 'category_id', 'date'),
+        Index('ix_Transactions_tag_id_date', 'tag_id', 'date'),
+        Index('ix_Transactions_fingerprint', 'fingerprint'),
+        Index('ix_Transactions_duplicate_of', 'duplicate_of'),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     account_id: int = Field(gt=0, foreign_key="Accounts.id", ondelete="CASCADE")
@@ -80,6 +94,10 @@ class Transactions(SQLModel, table=True):
     amount: Decimal = Field(ge=0, decimal_places=2)
     to_amount: Decimal = Field(default=0, ge=0, decimal_places=2)
     description: Optional[str] = Field(default=None, max_length=255)
+    # See core/fingerprint.py, set on every write made by the app
+    fingerprint: Optional[str] = Field(default=None, max_length=24)
+    # Imported with duplicates=flag, points to transaction it duplicates
+    duplicate_of: Optional[int] = Field(default=None, foreign_key="Transactions.id", ondelete="SET NULL")
 
     transactions: Optional[Accounts] = Relationship(
         back_populates="transactions",
@@ -102,6 +120,66 @@ class Transactions(SQLModel, table=True):
             "foreign_keys": "[Transactions.tag_id]",
         })
 
+# Sum and count of transactions per account, category, month and type, kept by triggers.
+# Transfer is counted for account_id only. Derived data, so no foreign keys.
+class MonthlyTotals(SQLModel, table=True):
+    __tablename__ = 'MonthlyTotals'
+
+    account_id: int = Field(primary_key=True)
+    category_id: int = Field(primary_key=True)
+    month: str = Field(primary_key=True, max_length=7)
+    type: TransactionStatus = Field(sa_column=Column(Enum(TransactionStatus), primary_key=True))
+    total: Decimal = Field(default=0, decimal_places=2)
+    count: int = Field(default=0)
+
+# Change of account balance per month and number of transactions making it, kept by triggers.
+# Transfer counts for both accounts. Derived data, so no foreign keys.
+class BalanceCheckpoints(SQLModel, table=True):
+    __tablename__ = 'BalanceCheckpoints'
+
+    account_id: int = Field(primary_key=True)
+    month: str = Field(primary_key=True, max_length=7)
+    delta: Decimal = Field(default=0, decimal_places=2)
+    count: int = Field(default=0)
+
+# Opening balance of an account that existed before opening balances were stored,
+# derived by migration from its balance then. Listed by verify to be checked.
+class DerivedOpeningBalances(SQLModel, table=True):
+    __tablename__ = 'DerivedOpeningBalances'
+
+    account_id: int = Field(primary_key=True, foreign_key="Accounts.id", ondelete="CASCADE")
+    opening_balance: Decimal = Field(decimal_places=2)
+
+# Row exists while a bulk write applies balance changes once per account,
+# balance triggers skip rows written meanwhile. Set and removed in the same transaction.
+class BalanceDeferred(SQLModel, table=True):
+    __tablename__ = 'BalanceDeferred'
+
+    id: int = Field(primary_key=True)
+
+class ImportJobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+# Background imports of the project. Running job writes rows and updated_at
+# with every committed batch, so any worker process can report its progress.
+class ImportJobs(SQLModel, table=True):
+    __tablename__ = 'ImportJobs'
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    account_id: int
+    source: str = Field(max_length=255)
+    status: ImportJobStatus = Field(sa_column=Column(Enum(ImportJobStatus)))
+    rows: int = Field(default=0)
+    errors: Optional[str] = Field(default=None)
+    balance: Optional[Decimal] = Field(default=None)
+    created_at: datetime
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
+    updated_at: Optional[datetime] = Field(default=None)
+
 class AccountScheme(BaseModel):
     id: int | None = Field(default=None, primary_key=True)
     title: str = Field(min_length=1, unique=True, max_length=255)
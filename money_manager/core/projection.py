@@ -0,0 +1,40 @@
+from sqlalchemy import Date, Enum, Float, Numeric, String, cast, type_coerce
+
+def plain(attribute):
+    """
+    Convert column in SQL to value ready for JSON: Decimal as float,
+    dates and enums as stored strings. Skips result processing in Python.
+    """
+    if isinstance(attribute.type, Numeric):
+        return cast(attribute, Float)
+    if isinstance(attribute.type, (Date, Enum)):
+        return type_coerce(attribute, String)
+    return attribute
+
+class Projection:
+    """
+    Fields of several (aliased) entities selected as plain values, only the
+    listed ones: internal columns never reach responses. First field is the
+    primary key. nest() turns flat row into dict of dicts, same shape as
+    result.mappings() of entities. Entity with NULL primary key (outer join
+    without match) is None.
+    """
+    def __init__(self, *entities):
+        self.columns = []
+        self._slices = []
+
+        for name, alias, fields in entities:
+            start = len(self.columns)
+
+            for field in fields:
+                value = plain(getattr(alias, field))
+                self.columns.append(value.label(f'{name}__{field}'))
+
+            self._slices.append((name, tuple(fields), start, len(self.columns)))
+
+    def nest(self, row) -> dict:
+        item = {}
+        for name, fields, start, end in self._slices:
+            values = row[start:end]
+            item[name] = dict(zip(fields, values)) if values[0] is not None else None
+        return item
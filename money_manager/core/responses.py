@@ -0,0 +1,32 @@
+import enum
+import json
+from datetime import date
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+
+def default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(content) -> str:
+    return json.dumps(
+        content,
+        default=default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':'),
+    )
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for plain dicts and lists (e.g. projected rows).
+    Decimal and date are encoded directly, without jsonable_encoder.
+    Return instance from handler, so FastAPI doesn't encode content itself.
+    """
+    def render(self, content) -> bytes:
+        return dumps(content).encode('utf-8')
@@ -0,0 +1,46 @@
+import re
+from sqlalchemy.sql import table, column
+
+# Full-text index of transactions, rowid is Transactions.id.
+# Kept by triggers, see core/triggers.py.
+create_transactions_search = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS TransactionsSearch USING fts5(
+	description,
+	category,
+	tag,
+	tokenize = 'unicode61 remove_diacritics 2',
+	prefix = '2 3'
+)
+'''
+
+rebuild_transactions_search_sql = '''
+INSERT INTO TransactionsSearch (rowid, description, category, tag)
+SELECT Transactions.id, Transactions.description, Categories.title, Tags.title
+FROM Transactions
+LEFT JOIN Categories ON Categories.id = Transactions.category_id
+LEFT JOIN Tags ON Tags.id = Transactions.tag_id
+'''
+
+TransactionsSearch = table(
+    'TransactionsSearch',
+    column('rowid'),
+    column('TransactionsSearch'),
+    column('rank'),
+)
+
+def rebuild_transactions_search(connection):
+    """
+    Recompute TransactionsSearch from Transactions in one pass
+    """
+    connection.exec_driver_sql('DELETE FROM TransactionsSearch')
+    connection.exec_driver_sql(rebuild_transactions_search_sql)
+
+def match_query(text: str) -> str | None:
+    """
+    Turn user input into FTS5 query: every word must match as a prefix.
+    Words are quoted, so FTS5 operators in input are searched as text.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
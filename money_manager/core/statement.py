@@ -0,0 +1,176 @@
+import csv
+import re
+from html import unescape
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from types import SimpleNamespace
+
+# Parsers of bank statement files. Every parser reads text file lazily
+# and yields rows one by one: SimpleNamespace(line, date, amount, description),
+# amount is signed, negative is money leaving the account.
+
+CHUNK_SIZE = 64 * 1024
+
+class StatementError(ValueError):
+    def __init__(self, line: int, msg: str):
+        super().__init__(msg)
+        self.line = line
+        self.msg = msg
+
+def parse_amount(value: str, decimal_separator: str = '.') -> Decimal:
+    value = re.sub(r'[^\d,.\-+]', '', value)
+    thousands = ',' if decimal_separator == '.' else '.'
+    value = value.replace(thousands, '').replace(decimal_separator, '.')
+    return Decimal(value)
+
+def make_row(line: int, date: str, amount: str, description, date_format: str, decimal_separator='.'):
+    try:
+        return SimpleNamespace(
+            line=line,
+            date=datetime.strptime(date.strip(), date_format).date(),
+            amount=parse_amount(amount, decimal_separator),
+            description=(description or '').strip()[:255] or None,
+        )
+    except (ValueError, InvalidOperation, AttributeError):
+        raise StatementError(line, f'Can\'t parse date {date!r} or amount {amount!r}')
+
+def column_index(column: str, header: list | None) -> int:
+    """
+    Column is name from header or 0-based index
+    """
+    if column.isdigit():
+        return int(column)
+    if header is None or column not in header:
+        raise StatementError(1, f'Column {column!r} not found')
+    return header.index(column)
+
+def parse_csv(
+    text,
+    date_column='date',
+    amount_column='amount',
+    description_column=None,
+    header=True,
+    delimiter=',',
+    date_format='%Y-%m-%d',
+    decimal_separator='.',
+):
+    reader = csv.reader(text, delimiter=delimiter)
+    names = next(reader, None) if header else None
+
+    date = column_index(date_column, names)
+    amount = column_index(amount_column, names)
+    description = column_index(description_column, names) if description_column else None
+
+    for record in reader:
+        if not any(record):
+            continue
+        try:
+            yield make_row(
+                reader.line_num,
+                record[date],
+                record[amount],
+                record[description] if description is not None else None,
+                date_format,
+                decimal_separator,
+            )
+        except IndexError:
+            raise StatementError(reader.line_num, 'Not enough columns')
+
+def ofx_tags(text):
+    """
+    Yield (tag, value) of SGML (OFX 1) and XML (OFX 2) statements, closing tags have '/'
+    """
+    tag = re.compile(r'<(/?[\w.]+)>([^<]*)')
+    rest = ''
+
+    while True:
+        chunk = text.read(CHUNK_SIZE)
+        data = rest + chunk
+        # Last tag may continue in next chunk
+        end = data.rfind('<') if chunk else -1
+        if end < 0:
+            end = len(data)
+        for match in tag.finditer(data, 0, end):
+            yield match.group(1).upper(), unescape(match.group(2).strip())
+        rest = data[end:]
+        if not chunk:
+            break
+
+def parse_ofx(text, **options):
+    transaction = None
+    number = 0
+
+    for tag, value in ofx_tags(text):
+        if tag == 'STMTTRN':
+            transaction = {}
+            number += 1
+        elif tag == '/STMTTRN' and transaction is not None:
+            description = ' '.join(filter(None, (transaction.get('NAME'), transaction.get('MEMO'))))
+            yield make_row(
+                number,
+                transaction.get('DTPOSTED', '')[:8],
+                transaction.get('TRNAMT', ''),
+                description,
+                '%Y%m%d',
+            )
+            transaction = None
+        elif transaction is not None and value:
+            transaction[tag] = value
+
+def qif_date(value: str, date_format: str) -> str:
+    """
+    Quicken writes year after 2000 as 1/5'24 and before it as 1/5/98,
+    two-digit years get the century when date_format expects four digits
+    """
+    value = value.replace(' ', '')
+    match = re.fullmatch(r"(.+)(['/])(\d{2})", value)
+    if match is None or '%Y' not in date_format:
+        return value
+
+    start, separator, year = match.groups()
+    century = '20' if separator == "'" else '19'
+    return f'{start}/{century}{year}'
+
+def parse_qif(text, date_format='%m/%d/%Y', decimal_separator='.', **options):
+    record = {}
+
+    for number, line in enumerate(text, start=1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+
+        code, value = line[0], line[1:]
+        if code == '^':
+            if record:
+                description = ' '.join(filter(None, (record.get('P'), record.get('M'))))
+                yield make_row(
+                    number,
+                    qif_date(record.get('D', ''), date_format),
+                    record.get('T') or record.get('U', ''),
+                    description,
+                    date_format,
+                    decimal_separator,
+                )
+            record = {}
+        else:
+            record[code] = value
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+    'qif': parse_qif,
+}
+
+def parse_statement(format: str, text, **options):
+    """
+    Rows of statement in format, text decoding error is StatementError
+    at the first row not parsed yet: text is decoded in chunks, so the
+    wrong byte may be a few lines further
+    """
+    line = 0
+    try:
+        for row in PARSERS[format](text, **options):
+            line = row.line
+            yield row
+    except UnicodeDecodeError as e:
+        raise StatementError(line + 1, f'Can\'t decode file as {text.encoding}: {e.reason}')
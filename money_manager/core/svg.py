@@ -0,0 +1,163 @@
+from html import escape
+from math import cos, sin, pi
+
+# Built-in charts, rendered from aggregated data without matplotlib
+
+COLORS = (
+    '#4e79a7', '#f28e2b', '#e15759', '#76b7b2', '#59a14f',
+    '#edc948', '#b07aa1', '#ff9da7', '#9c755f', '#bab0ac',
+)
+
+WIDTH = 720
+HEIGHT = 400
+PADDING = 48
+FONT = 'font-family="sans-serif" font-size="12"'
+
+def color(index: int) -> str:
+    return COLORS[index % len(COLORS)]
+
+def number(value: float) -> str:
+    return f'{value:.2f}'
+
+def svg(width: int, height: int, body: list, title: str = None) -> str:
+    if title:
+        body.insert(0, (
+            f'<text x="{width / 2:.1f}" y="20" text-anchor="middle" '
+            f'font-family="sans-serif" font-size="16">{escape(title)}</text>'
+        ))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="{width}" height="{height}">' + ''.join(body) + '</svg>'
+    )
+
+def legend(x: float, y: float, labels: list) -> list:
+    body = []
+    for i, label in enumerate(labels):
+        top = y + i * 20
+        body.append(f'<rect x="{x:.1f}" y="{top:.1f}" width="12" height="12" fill="{color(i)}"/>')
+        body.append(f'<text x="{x + 18:.1f}" y="{top + 10:.1f}" {FONT}>{escape(label)}</text>')
+    return body
+
+def donut(labels: list, values: list, title: str = None) -> str:
+    """
+    Donut with legend '<value>: <label>', values must not be negative
+    """
+    radius = (HEIGHT - PADDING * 2) / 2
+    inner = radius / 2
+    cx, cy = PADDING + radius, HEIGHT / 2
+    total = sum(values)
+    body = []
+
+    angle = -pi / 2
+    for i, value in enumerate(values):
+        if total <= 0 or value <= 0:
+            continue
+
+        share = value / total
+        if share >= 1:
+            # Single slice, arc can't start and end at same point
+            body.append(
+                f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{(radius + inner) / 2:.1f}" '
+                f'fill="none" stroke="{color(i)}" stroke-width="{radius - inner:.1f}"/>'
+            )
+            break
+
+        end = angle + share * 2 * pi
+        large = 1 if share > 0.5 else 0
+        points = [
+            (cx + radius * cos(angle), cy + radius * sin(angle)),
+            (cx + radius * cos(end), cy + radius * sin(end)),
+            (cx + inner * cos(end), cy + inner * sin(end)),
+            (cx + inner * cos(angle), cy + inner * sin(angle)),
+        ]
+        (x1, y1), (x2, y2), (x3, y3), (x4, y4) = points
+        body.append(
+            f'<path d="M{x1:.2f},{y1:.2f} A{radius:.1f},{radius:.1f} 0 {large} 1 {x2:.2f},{y2:.2f} '
+            f'L{x3:.2f},{y3:.2f} A{inner:.1f},{inner:.1f} 0 {large} 0 {x4:.2f},{y4:.2f} Z" '
+            f'fill="{color(i)}"><title>{escape(labels[i])}: {number(value)}</title></path>'
+        )
+        angle = end
+
+    body += legend(
+        cx + radius + PADDING,
+        PADDING,
+        [f'{number(value)}: {label}' for label, value in zip(labels, values)],
+    )
+    return svg(WIDTH, HEIGHT, body, title)
+
+def axes(labels: list, series: dict):
+    """
+    Return body with axes and function mapping value to y coordinate
+    """
+    values = [value for points in series.values() for value in points]
+    top = max(values + [0])
+    bottom = min(values + [0])
+    span = (top - bottom) or 1
+
+    plot_bottom = HEIGHT - PADDING
+    plot_height = HEIGHT - PADDING * 2
+
+    def y(value):
+        return plot_bottom - (value - bottom) / span * plot_height
+
+    body = [
+        f'<line x1="{PADDING}" y1="{y(0):.1f}" x2="{WIDTH - PADDING}" y2="{y(0):.1f}" stroke="#333"/>',
+        f'<line x1="{PADDING}" y1="{PADDING}" x2="{PADDING}" y2="{plot_bottom}" stroke="#333"/>',
+        f'<text x="{PADDING - 4}" y="{y(top) + 4:.1f}" text-anchor="end" {FONT}>{number(top)}</text>',
+    ]
+    if bottom < 0:
+        body.append(f'<text x="{PADDING - 4}" y="{y(bottom) + 4:.1f}" text-anchor="end" {FONT}>{number(bottom)}</text>')
+
+    body += legend(WIDTH - PADDING - 100, PADDING, list(series))
+    return body, y
+
+def ticks(labels: list, x) -> list:
+    # Every label would overlap with many points
+    step = max(1, len(labels) // 12)
+    return [
+        f'<text x="{x(i):.1f}" y="{HEIGHT - PADDING + 16}" text-anchor="middle" {FONT}>{escape(label)}</text>'
+        for i, label in enumerate(labels) if i % step == 0
+    ]
+
+def bar(labels: list, series: dict, title: str = None) -> str:
+    """
+    Grouped bars, series maps name to one value per label
+    """
+    body, y = axes(labels, series)
+    slot = (WIDTH - PADDING * 2) / max(len(labels), 1)
+    width = slot * 0.8 / max(len(series), 1)
+
+    def x(i):
+        return PADDING + slot * (i + 0.5)
+
+    for s, (name, values) in enumerate(series.items()):
+        for i, value in enumerate(values):
+            left = PADDING + slot * i + slot * 0.1 + width * s
+            y1, y2 = sorted((y(0), y(value)))
+            body.append(
+                f'<rect x="{left:.1f}" y="{y1:.1f}" width="{width:.1f}" height="{y2 - y1:.1f}" '
+                f'fill="{color(s)}"><title>{escape(name)} {escape(labels[i])}: {number(value)}</title></rect>'
+            )
+
+    body += ticks(labels, x)
+    return svg(WIDTH, HEIGHT, body, title)
+
+def line(labels: list, series: dict, title: str = None) -> str:
+    """
+    Lines, series maps name to one value per label
+    """
+    body, y = axes(labels, series)
+    step = (WIDTH - PADDING * 2) / max(len(labels) - 1, 1)
+
+    def x(i):
+        return PADDING + step * i
+
+    for s, (name, values) in enumerate(series.items()):
+        points = ' '.join(f'{x(i):.1f},{y(value):.1f}' for i, value in enumerate(values))
+        body.append(
+            f'<polyline points="{points}" fill="none" stroke="{color(s)}" stroke-width="2">'
+            f'<title>{escape(name)}</title></polyline>'
+        )
+
+    body += ticks(labels, x)
+    return svg(WIDTH, HEIGHT, body, title)
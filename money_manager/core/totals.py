@@ -0,0 +1,18 @@
+# Sequential scan and one sort, walking account_id index reads rows out of order
+monthly_totals_sql = '''
+SELECT account_id, category_id, substr(date, 1, 7), transaction_type, ROUND(SUM(amount), 2), COUNT(*)
+FROM Transactions NOT INDEXED
+GROUP BY account_id, category_id, substr(date, 1, 7), transaction_type
+'''
+
+rebuild_monthly_totals_sql = f'''
+INSERT INTO MonthlyTotals (account_id, category_id, month, type, total, count)
+{monthly_totals_sql}
+'''
+
+def rebuild_monthly_totals(connection):
+    """
+    Recompute MonthlyTotals from Transactions in one pass
+    """
+    connection.exec_driver_sql('DELETE FROM MonthlyTotals')
+    connection.exec_driver_sql(rebuild_monthly_totals_sql)
@@ -2,29 +2,22 @@ update_balance_on_transaction_delete = '''
 CREATE TRIGGER Update_Balance_On_Transaction_Delete
 AFTER DELETE ON Transactions
 FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
 
 BEGIN
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer'
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) + old.amount, 2)
-		
-		WHEN old.transaction_type = 'Deposit'
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) - old.amount, 2)
-		
-		ELSE RAISE(ABORT, "ELSE UPDATE Accounts ON DELETE")
-	END WHERE id = old.account_id;
-	
+	SET balance = ROUND(balance - CASE
+		WHEN old.transaction_type = 'Deposit' THEN old.amount
+		ELSE -old.amount
+	END, 2)
+	WHERE id = old.account_id;
+
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN old.to_account_id IS NOT NULL AND (old.to_amount IS NOT NULL AND old.to_amount <> 0)
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.to_amount, 2)
-		
-		WHEN old.to_account_id IS NOT NULL AND old.amount IS NOT NULL
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.amount, 2)
-		
-		ELSE RAISE(IGNORE)
-	END WHERE id = old.to_account_id;
+	SET balance = ROUND(balance - CASE
+		WHEN old.to_amount <> 0 THEN old.to_amount
+		ELSE old.amount
+	END, 2)
+	WHERE id = old.to_account_id;
 END
 '''
 
@@ -32,127 +25,292 @@ update_balance_on_transaction_insert = '''
 CREATE TRIGGER Update_Balance_On_Transaction_Insert
 AFTER INSERT ON Transactions
 FOR EACH ROW
+WHEN NOT EXISTS (SELECT 1 FROM BalanceDeferred)
 
 BEGIN
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN new.transaction_type = 'Withdrawal' OR new.transaction_type = 'Transfer'
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) - new.amount, 2)
-		
-		WHEN new.transaction_type = 'Deposit'
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) + new.amount, 2)
-		
-		ELSE RAISE(IGNORE)
-	END WHERE id = new.account_id;
-	
+	SET balance = ROUND(balance + CASE
+		WHEN new.transaction_type = 'Deposit' THEN new.amount
+		ELSE -new.amount
+	END, 2)
+	WHERE id = new.account_id;
+
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN new.to_account_id IS NOT NULL AND (new.to_amount IS NOT NULL AND new.to_amount <> 0)
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.to_amount, 2)
-		
-		WHEN new.to_account_id IS NOT NULL AND new.amount IS NOT NULL
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.amount, 2)
-		
-		ELSE RAISE(IGNORE)
-	END WHERE id = new.to_account_id;
-END;
+	SET balance = ROUND(balance + CASE
+		WHEN new.to_amount <> 0 THEN new.to_amount
+		ELSE new.amount
+	END, 2)
+	WHERE id = new.to_account_id;
+END
 '''
 
 update_balance_on_transaction_update = '''
 CREATE TRIGGER Update_Balance_On_Transaction_Update
-AFTER UPDATE ON Transactions
+AFTER UPDATE OF account_id, transaction_type, amount ON Transactions
 FOR EACH ROW
 
 BEGIN
-
+	-- Revert OLD data, then apply NEW data, account may be the same
 	UPDATE Accounts
-	SET balance = CASE
-		-- Update new.account if new.account_id EQUAL old.account_id
-		WHEN new.account_id = old.account_id
-		THEN CASE
-			WHEN new.transaction_type = 'Withdrawal' AND (old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer')
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) + old.amount) - new.amount, 2)
-			
-			WHEN new.transaction_type = 'Withdrawal' AND old.transaction_type = 'Deposit'
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) - old.amount) - new.amount, 2)
-			
-			WHEN new.transaction_type = 'Deposit' AND (old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer')
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) + old.amount) + new.amount, 2)
-			
-			WHEN new.transaction_type = 'Deposit' AND old.transaction_type = 'Deposit'
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) - old.amount) + new.amount, 2)
-			
-			WHEN new.transaction_type = 'Transfer' AND (old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer')
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) + old.amount) - new.amount, 2)
-			
-			WHEN new.transaction_type = 'Transfer' AND old.transaction_type = 'Deposit'
-			THEN ROUND(((SELECT balance FROM Accounts WHERE id = new.account_id) - old.amount) - new.amount, 2)
-
-			ELSE RAISE(ABORT, "-- Update new.account if new.account_id EQUAL old.account_id")
-			END
-			
-		WHEN new.account_id <> old.account_id
-		THEN CASE
-			WHEN new.transaction_type = 'Withdrawal' OR new.transaction_type = 'Transfer'
-			THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) - new.amount, 2)
-
-			WHEN new.transaction_type = 'Deposit'
-			THEN ROUND((SELECT balance FROM Accounts WHERE id = new.account_id) + new.amount, 2)
-
-			ELSE RAISE(ABORT, "-- Update new.account if new.account_id NOT EQUAL old.account_id")
-			END
-
-	END WHERE id = new.account_id;
-	
-	-- Update old.account if new.account_id NOT EQUAL old.account_id
+	SET balance = ROUND(balance - CASE
+		WHEN old.transaction_type = 'Deposit' THEN old.amount
+		ELSE -old.amount
+	END, 2)
+	WHERE id = old.account_id;
+
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN new.account_id <> old.account_id
-		THEN CASE 
-			WHEN old.transaction_type = 'Withdrawal' OR old.transaction_type = 'Transfer'
-			THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) + old.amount, 2)
-
-			WHEN old.transaction_type = 'Deposit'
-			THEN ROUND((SELECT balance FROM Accounts WHERE id = old.account_id) - old.amount, 2)
-
-			ELSE RAISE(ABORT, "Update old.account if new.account_id NOT EQUAL old.account_id")
-			END
-		ELSE RAISE(IGNORE)
-	END WHERE id = old.account_id;
-	
-END;
+	SET balance = ROUND(balance + CASE
+		WHEN new.transaction_type = 'Deposit' THEN new.amount
+		ELSE -new.amount
+	END, 2)
+	WHERE id = new.account_id;
+END
 '''
 
 update_to_account_balance = '''
 CREATE TRIGGER Update_ToAccount_Balance
-AFTER UPDATE ON Transactions
+AFTER UPDATE OF to_account_id, amount, to_amount ON Transactions
 FOR EACH ROW
 
 BEGIN
-	
-	-- Update new.to_account with NEW data
+	-- Revert OLD data, then apply NEW data, account may be the same
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN new.to_account_id IS NOT NULL AND (new.to_amount IS NOT NULL AND new.to_amount <> 0)
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.to_amount, 2)
-		
-		WHEN new.to_account_id IS NOT NULL AND new.amount IS NOT NULL
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = new.to_account_id) + new.amount, 2)
-		
-		ELSE RAISE(ABORT, "Update new.to_account with NEW data")
-	END WHERE id = new.to_account_id;
-	
-	-- Update old.to_account with OLD data
+	SET balance = ROUND(balance - CASE
+		WHEN old.to_amount <> 0 THEN old.to_amount
+		ELSE old.amount
+	END, 2)
+	WHERE id = old.to_account_id;
+
 	UPDATE Accounts
-	SET balance = CASE
-		WHEN old.to_account_id IS NOT NULL AND (old.to_amount IS NOT NULL AND old.to_amount <> 0)
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.to_amount, 2)
-		
-		WHEN old.to_account_id IS NOT NULL AND old.amount IS NOT NULL
-		THEN ROUND((SELECT balance FROM Accounts WHERE id = old.to_account_id) - old.amount, 2)
-		
-		ELSE RAISE(ABORT, "Update old.to_account with OLD data")
-	END WHERE id = old.to_account_id;
-	
+	SET balance = ROUND(balance + CASE
+		WHEN new.to_amount <> 0 THEN new.to_amount
+		ELSE new.amount
+	END, 2)
+	WHERE id = new.to_account_id;
+END
+'''
+
+update_monthly_totals_on_transaction_insert = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO MonthlyTotals (account_id, category_id, month, type, total, count)
+	VALUES (new.account_id, new.category_id, substr(new.date, 1, 7), new.transaction_type, ROUND(new.amount, 2), 1)
+	ON CONFLICT (account_id, category_id, month, type) DO UPDATE
+	SET total = ROUND(total + excluded.total, 2), count = count + 1;
+END
+'''
+
+update_monthly_totals_on_transaction_delete = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	UPDATE MonthlyTotals
+	SET total = ROUND(total - old.amount, 2), count = count - 1
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type;
+
+	DELETE FROM MonthlyTotals
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type
+		AND count <= 0;
+END
+'''
+
+update_monthly_totals_on_transaction_update = '''
+CREATE TRIGGER Update_MonthlyTotals_On_Transaction_Update
+AFTER UPDATE OF account_id, category_id, transaction_type, date, amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Remove OLD data
+	UPDATE MonthlyTotals
+	SET total = ROUND(total - old.amount, 2), count = count - 1
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type;
+
+	DELETE FROM MonthlyTotals
+	WHERE account_id = old.account_id
+		AND category_id = old.category_id
+		AND month = substr(old.date, 1, 7)
+		AND type = old.transaction_type
+		AND count <= 0;
+
+	-- Add NEW data
+	INSERT INTO MonthlyTotals (account_id, category_id, month, type, total, count)
+	VALUES (new.account_id, new.category_id, substr(new.date, 1, 7), new.transaction_type, ROUND(new.amount, 2), 1)
+	ON CONFLICT (account_id, category_id, month, type) DO UPDATE
+	SET total = ROUND(total + excluded.total, 2), count = count + 1;
+END
+'''
+
+update_search_on_transaction_insert = '''
+CREATE TRIGGER Update_Search_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO TransactionsSearch (rowid, description, category, tag)
+	VALUES (
+		new.id,
+		new.description,
+		(SELECT title FROM Categories WHERE id = new.category_id),
+		(SELECT title FROM Tags WHERE id = new.tag_id)
+	);
+END
+'''
+
+update_search_on_transaction_delete = '''
+CREATE TRIGGER Update_Search_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	DELETE FROM TransactionsSearch WHERE rowid = old.id;
+END
+'''
+
+update_search_on_transaction_update = '''
+CREATE TRIGGER Update_Search_On_Transaction_Update
+AFTER UPDATE OF description, category_id, tag_id ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Tag delete sets tag_id to NULL, so it's handled here too
+	UPDATE TransactionsSearch
+	SET description = new.description,
+		category = (SELECT title FROM Categories WHERE id = new.category_id),
+		tag = (SELECT title FROM Tags WHERE id = new.tag_id)
+	WHERE rowid = new.id;
+END
+'''
+
+update_search_on_category_update = '''
+CREATE TRIGGER Update_Search_On_Category_Update
+AFTER UPDATE OF title ON Categories
+FOR EACH ROW
+
+BEGIN
+	UPDATE TransactionsSearch
+	SET category = new.title
+	WHERE rowid IN (SELECT id FROM Transactions WHERE category_id = new.id);
+END
+'''
+
+update_search_on_tag_update = '''
+CREATE TRIGGER Update_Search_On_Tag_Update
+AFTER UPDATE OF title ON Tags
+FOR EACH ROW
+
+BEGIN
+	UPDATE TransactionsSearch
+	SET tag = new.title
+	WHERE rowid IN (SELECT id FROM Transactions WHERE tag_id = new.id);
+END
+'''
+
+update_balance_checkpoints_on_transaction_insert = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Insert
+AFTER INSERT ON Transactions
+FOR EACH ROW
+
+BEGIN
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	VALUES (
+		new.account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.transaction_type = 'Deposit' THEN new.amount ELSE -new.amount END,
+		1
+	)
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	SELECT
+		new.to_account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.to_amount <> 0 THEN new.to_amount ELSE new.amount END,
+		1
+	WHERE new.to_account_id IS NOT NULL
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+END
+'''
+
+update_balance_checkpoints_on_transaction_delete = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Delete
+AFTER DELETE ON Transactions
+FOR EACH ROW
+
+BEGIN
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.transaction_type = 'Deposit' THEN old.amount ELSE -old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.account_id AND month = substr(old.date, 1, 7);
+
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.to_amount <> 0 THEN old.to_amount ELSE old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.to_account_id AND month = substr(old.date, 1, 7);
+
+	DELETE FROM BalanceCheckpoints
+	WHERE account_id IN (old.account_id, old.to_account_id)
+		AND month = substr(old.date, 1, 7)
+		AND count <= 0;
+END
+'''
+
+update_balance_checkpoints_on_transaction_update = '''
+CREATE TRIGGER Update_BalanceCheckpoints_On_Transaction_Update
+AFTER UPDATE OF account_id, to_account_id, transaction_type, date, amount, to_amount ON Transactions
+FOR EACH ROW
+
+BEGIN
+	-- Remove OLD data
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.transaction_type = 'Deposit' THEN old.amount ELSE -old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.account_id AND month = substr(old.date, 1, 7);
+
+	UPDATE BalanceCheckpoints
+	SET delta = ROUND(delta - CASE WHEN old.to_amount <> 0 THEN old.to_amount ELSE old.amount END, 2),
+		count = count - 1
+	WHERE account_id = old.to_account_id AND month = substr(old.date, 1, 7);
+
+	DELETE FROM BalanceCheckpoints
+	WHERE account_id IN (old.account_id, old.to_account_id)
+		AND month = substr(old.date, 1, 7)
+		AND count <= 0;
+
+	-- Add NEW data
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	VALUES (
+		new.account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.transaction_type = 'Deposit' THEN new.amount ELSE -new.amount END,
+		1
+	)
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
+
+	INSERT INTO BalanceCheckpoints (account_id, month, delta, count)
+	SELECT
+		new.to_account_id,
+		substr(new.date, 1, 7),
+		CASE WHEN new.to_amount <> 0 THEN new.to_amount ELSE new.amount END,
+		1
+	WHERE new.to_account_id IS NOT NULL
+	ON CONFLICT (account_id, month) DO UPDATE
+	SET delta = ROUND(delta + excluded.delta, 2), count = count + 1;
 END
 '''
@@ -0,0 +1,114 @@
+import sqlite3
+from os import fsync, getenv, link, remove, replace
+from os.path import basename, exists
+from tempfile import NamedTemporaryFile
+from fastapi.concurrency import run_in_threadpool
+from .error import HTTPException, makeDetail
+from .engine import evict
+
+# Uploaded project is written next to live ones and installed only after it's
+# complete and checked, so a live project is never half-written: new project
+# is hard linked (never overwrites), update renames over the live one.
+
+UPLOAD_CHUNK = 1024 * 1024
+MAX_PROJECT_SIZE = int(getenv('MAX_PROJECT_SIZE', 1024 * 1024 * 1024))
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+async def save_upload(file, folder: str) -> str:
+    """
+    Copy uploaded file to hidden temporary file in folder chunk by chunk,
+    return its path. Throws HTTPException if file is bigger than MAX_PROJECT_SIZE.
+    """
+    size = 0
+
+    # Not .db, so it's never listed as a project
+    with NamedTemporaryFile(dir=folder, prefix='.', suffix='.upload', delete=False) as temp:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK):
+                size += len(chunk)
+                if size > MAX_PROJECT_SIZE:
+                    HTTPException(
+                        status_code=413,
+                        detail=[makeDetail(
+                            msg=f'Project is bigger than {MAX_PROJECT_SIZE} bytes',
+                        )])
+                await run_in_threadpool(temp.write, chunk)
+
+            temp.flush()
+            await run_in_threadpool(fsync, temp.fileno())
+        except BaseException:
+            temp.close()
+            remove(temp.name)
+            raise
+
+    return temp.name
+
+def check_project_file(path: str):
+    """
+    Throws HTTPException if file isn't an intact SQLite database
+    """
+    with open(path, 'rb') as file:
+        header = file.read(len(SQLITE_HEADER))
+
+    if header != SQLITE_HEADER:
+        HTTPException(
+            status_code=422,
+            detail=[makeDetail(
+                msg='File is not SQLite database',
+            )])
+
+    # immutable: no locks, journal or WAL files are created for the check
+    connection = sqlite3.connect(f'file:{path}?mode=ro&immutable=1', uri=True)
+    try:
+        result = connection.execute('PRAGMA quick_check').fetchone()[0]
+    except sqlite3.DatabaseError as err:
+        result = str(err)
+    finally:
+        connection.close()
+
+    if result != 'ok':
+        HTTPException(
+            status_code=422,
+            detail=[makeDetail(
+                msg=f'Database is damaged: {result}',
+            )])
+
+def remove_wal(path: str):
+    """
+    Remove WAL and shared memory files left by project at path
+    """
+    for suffix in ('-wal', '-shm'):
+        if exists(path + suffix):
+            remove(path + suffix)
+
+def add_project(temp: str, path: str):
+    """
+    Install checked temporary file as new project at path. Hard link fails
+    if path exists, so a project created meanwhile is never overwritten.
+    """
+    try:
+        link(temp, path)
+    except FileExistsError:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg=f"File {basename(path)} already exist.",
+            )])
+    remove(temp)
+
+    # Left by deleted project with the same name
+    remove_wal(path)
+
+async def install_project(temp: str, path: str):
+    """
+    Atomically replace project at path with checked temporary file
+    """
+    await evict(path)
+    replace(temp, path)
+
+    # WAL of the replaced file would be applied to the new one
+    remove_wal(path)
+
+    # Engines opened while evicting point to the replaced file
+    await evict(path)
@@ -1,11 +1,12 @@
-from sqlmodel import SQLModel, Session
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..core.error import HTTPException, makeDetail
 
-def checkIfExist(session: Session, model: SQLModel, id: int):
+async def checkIfExist(session: AsyncSession, model: SQLModel, id: int):
     """
     Throws HTTPException if doesn't exist
     """
-    obj = session.get(model, id)
+    obj = await session.get(model, id)
     if obj is None:
         HTTPException(
             status_code=400, 
@@ -1,19 +1,25 @@
 from types import SimpleNamespace
-from os import getenv, makedirs
+from os import getenv, makedirs, remove
 from os.path import exists, splitext, join, abspath
-from sqlmodel import create_engine, Session, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing_extensions import Annotated
 from .core.error import HTTPException, makeDetail
 from .core.models import ProjectFileScheme
+from .core.engine import async_engines
+from .core.upload import save_upload, check_project_file
+from .core.catalog import ProjectCatalog
 from fastapi import (
     Cookie,
     UploadFile,
     File,
     Depends,
 )
+from fastapi.concurrency import run_in_threadpool
 
 folder_path = getenv('PROJECT_FOLDER', abspath('./money_manager/projects'))
 
+catalog = ProjectCatalog(folder_path)
+
 def check_project_folder():
     if not exists(folder_path):
         makedirs(folder_path)
@@ -27,21 +33,24 @@ async def check_cookie(project: Annotated[str, Cookie()]):
 
     return file.file_path
 
-async def session(
+async def async_session(
     file: Annotated[str, Depends(check_cookie)]
-) -> Session:
+):
     """
-    Create session from database file (project).
+    Create async session from database file (project).
+    Queries are awaited, so they don't block the event loop.
+    Session is closed after the request even if handler raised.
     """
-    engine = create_engine(f"sqlite:///{file}") 
-
-    with engine.connect() as connection:
-        connection.execute(text("PRAGMA foreign_keys=ON"))
+    engine = await async_engines.get(file)
 
-    session = Session(engine)
-    return SimpleNamespace(session=session, engine=engine)
+    async with AsyncSession(engine) as session:
+        yield SimpleNamespace(session=session, engine=engine)
 
 async def upload_process(file: Annotated[UploadFile, File(...)]):
+    """
+    Stream uploaded project to temporary file in folder and check it.
+    Temporary file is removed after the request unless handler installed it.
+    """
     if splitext(file.filename)[1] != '.db':
         HTTPException(
             status_code=409, 
@@ -50,9 +59,14 @@ async def upload_process(file: Annotated[UploadFile, File(...)]):
             )])
 
     file_path = join(folder_path, file.filename)
-    content = await file.read()
+    temp_path = await save_upload(file, folder_path)
 
-    return SimpleNamespace(content=content, path=file_path, filename=file.filename)
+    try:
+        await run_in_threadpool(check_project_file, temp_path)
+        yield SimpleNamespace(temp_path=temp_path, path=file_path, filename=file.filename)
+    finally:
+        if exists(temp_path):
+            remove(temp_path)
 
 async def check_file(file: ProjectFileScheme):
     """
@@ -70,5 +84,5 @@ async def check_file(file: ProjectFileScheme):
     return SimpleNamespace(file_path=file_path, filename=file.name)
 
 CheckFileDep = Annotated[SimpleNamespace, Depends(check_file)]
-SessionDep = Annotated[Session, Depends(session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(async_session)]
 UploadFileDep = Annotated[SimpleNamespace, Depends(upload_process)]
@@ -8,6 +8,7 @@ from .routers import (
     transactions,
     tags,
     import_statement,
+    report,
 )
 from .logger import setupLogger
 
@@ -22,3 +23,4 @@ app.include_router(categories.router)
 app.include_router(transactions.router)
 app.include_router(tags.router)
 app.include_router(import_statement.router)
+app.include_router(report.router)
@@ -1,9 +1,14 @@
+import datetime
 from decimal import Decimal
+from typing import Optional
 from sqlmodel import Field, select
 from sqlalchemy.exc import IntegrityError
-from fastapi import APIRouter, Response
-from ..dependencies import SessionDep
+from fastapi import APIRouter, Query, Response
+from ..dependencies import AsyncSessionDep
 from ..core.error import HTTPException, makeDetail
+from ..core.ledger import balance_at, balance_history
+from ..core.responses import FastJSONResponse
+from .report import MONTH
 from ..core.models import (
     Accounts, 
     AccountScheme, 
@@ -22,27 +27,27 @@ class AccountUpdate(AccountScheme):
     currency: str = Field(default=None, min_length=1, max_length=10)
     balance: Decimal = Field(default=None, decimal_places=2)
 
-def account_list(db):
+async def account_list(db):
     session = db.session
     statement = select(Accounts).order_by(Accounts.title.asc())
-    results = session.exec(statement) 
+    results = await session.exec(statement) 
     accounts = results.all()
     
-    session.close()
-    db.engine.dispose()
+    await session.close()
     return accounts
 
-def account_create(account, db):
+async def account_create(account, db):
     session = db.session
     save_account = Accounts(
         title=account.title, 
         currency=account.currency, 
         balance=account.balance,
+        opening_balance=account.balance,
     ) 
 
     try:
         session.add(save_account)
-        session.commit()
+        await session.commit()
 
     except IntegrityError:
         HTTPException(
@@ -53,16 +58,15 @@ def account_create(account, db):
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(save_account)
+    await session.refresh(save_account)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     return save_account
 
-def account_update(account, db):
+async def account_update(account, db):
     session = db.session
-    update_account = session.get(Accounts, account.id)
+    update_account = await session.get(Accounts, account.id)
 
     if update_account is None:
         HTTPException(
@@ -71,6 +75,8 @@ def account_update(account, db):
                 msg='Account not found',
             )])
 
+    balance = update_account.balance
+
     if not update_attributes(account, update_account):
         HTTPException(
             status_code=404, 
@@ -78,9 +84,13 @@ def account_update(account, db):
                 msg='Nothing to update',
             )])
 
+    # Balance set by hand moves the whole history, transactions stay the same
+    if update_account.balance is not None and update_account.balance != balance:
+        update_account.opening_balance += Decimal(update_account.balance) - Decimal(balance)
+
     try:
         session.add(update_account)
-        session.commit()
+        await session.commit()
     except IntegrityError:
         HTTPException(
             status_code=400, 
@@ -88,16 +98,15 @@ def account_update(account, db):
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(update_account)
+    await session.refresh(update_account)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     return update_account
 
-def account_delete(id, db):
+async def account_delete(id, db):
     session = db.session
-    account = session.get(Accounts, id)
+    account = await session.get(Accounts, id)
 
     if account is None:
         HTTPException(
@@ -106,56 +115,116 @@ def account_delete(id, db):
                 msg='Account not found',
             )])
 
-    session.delete(account)
-    session.commit()
+    await session.delete(account)
+    await session.commit()
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
+
+async def account_balance(id, day, db):
+    balance = await balance_at(db.session, id, day)
+    await db.session.close()
+
+    if balance is None:
+        HTTPException(
+            status_code=400, 
+            detail=[makeDetail(
+                msg='Account not found',
+            )])
+
+    return balance
+
+async def account_history(id, first, last, db):
+    session = db.session
+
+    if await session.get(Accounts, id) is None:
+        HTTPException(
+            status_code=400, 
+            detail=[makeDetail(
+                msg='Account not found',
+            )])
+
+    history = await balance_history(session, id, first, last)
+    await session.close()
+
+    return history
 
 @router.get('/list')
 async def list_accounts(
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Return list of all accounts
     """
-    accounts = account_list(db)    
+    accounts = await account_list(db)    
     response.status_code = 200
     return accounts
 
 @router.post('/create')
 async def create_account(
     account: AccountScheme,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Create an account
     """
-    save_account = account_create(account, db)
+    save_account = await account_create(account, db)
     response.status_code = 201
     return save_account
 
 @router.post('/update')
 async def update_account(
     account: AccountUpdate,
-    db: SessionDep,
+    db: AsyncSessionDep,
 ):
     """
     Update data of an account.
     """
-    return account_update(account, db)
+    return await account_update(account, db)
 
 @router.get('/delete')
 async def delete_account(
     id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Delete an account
     """
-    account_delete(id, db)
+    await account_delete(id, db)
     response.status_code = 204
     return
+
+@router.get('/balance', response_class=FastJSONResponse)
+async def get_account_balance(
+    id: int,
+    db: AsyncSessionDep,
+    date: Optional[datetime.date] = Query(None, title="balance at the end of day, today by default"),
+):
+    """
+    Return balance of an account at the end of day
+    """
+    day = date or datetime.date.today()
+    balance = await account_balance(id, day, db)
+    return FastJSONResponse({
+        "account_id": id,
+        "date": day,
+        "balance": balance,
+    })
+
+@router.get('/balance/history', response_class=FastJSONResponse)
+async def get_account_history(
+    id: int,
+    db: AsyncSessionDep,
+    start: Optional[str] = Query(None, pattern=MONTH, title="first month of range, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH, title="last month of range, YYYY-MM"),
+):
+    """
+    Return change and closing balance of an account per month with transactions
+    """
+    history = await account_history(id, start, end, db)
+    return FastJSONResponse({
+        "account_id": id,
+        "months": history,
+    })
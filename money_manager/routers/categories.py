@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Response
+from typing import Optional
+from fastapi import APIRouter, Query, Response
 from sqlmodel import Field, select
+from sqlalchemy import Float, cast, func
+from sqlalchemy.orm import aliased
 from sqlalchemy.exc import IntegrityError
-from ..dependencies import SessionDep
+from ..dependencies import AsyncSessionDep
 from ..core.error import HTTPException, makeDetail
+from ..core.responses import FastJSONResponse
 from ..core.models import (
     Categories, 
     CategoryScheme, 
+    MonthlyTotals,
+    TransactionStatus,
     update_attributes
 )
+from .report import month_range, month_filter, MONTH
 
 router = APIRouter(
     prefix="/category",
@@ -18,32 +25,132 @@ router = APIRouter(
 class CategoryUpdate(CategoryScheme):
     id: int = Field(primary_key=True)
 
-def categories_list(db):
+async def categories_list(db):
     session = db.session
     statement = select(Categories).order_by(Categories.title.asc())
-    results = session.exec(statement) 
+    results = await session.exec(statement) 
     categories = results.all()
     
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     return categories
 
 @router.get('/list')
 async def list_categories(
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Return list of all categories
     """
     response.status_code = 200
-    return categories_list(db)
+    return await categories_list(db)
+
+async def category_tree(
+    db,
+    first=None,
+    last=None,
+    account_id=None,
+    transaction_type=TransactionStatus.Withdrawal,
+) -> list:
+    """
+    Return nested categories with own and subtree totals, computed in one query
+    """
+    filter = month_filter(MonthlyTotals.month, first, last)
+    filter.append(MonthlyTotals.type == transaction_type)
+    if account_id:
+        filter.append(MonthlyTotals.account_id == account_id)
+
+    own = (
+        select(
+            MonthlyTotals.category_id.label('category_id'),
+            func.sum(MonthlyTotals.total).label('total'),
+            func.sum(MonthlyTotals.count).label('count'),
+        )
+        .where(*filter)
+        .group_by(MonthlyTotals.category_id)
+        .cte('own')
+    )
+
+    # Every category paired with itself and all its descendants.
+    # UNION drops repeated pairs, so a cycle in parent_id can't loop forever.
+    subtree = select(
+        Categories.id.label('root_id'),
+        Categories.id.label('id'),
+    ).cte('subtree', recursive=True)
+    child = aliased(Categories)
+    subtree = subtree.union(
+        select(subtree.c.root_id, child.id)
+        .join(child, child.parent_id == subtree.c.id)
+    )
+
+    descendant = own.alias('descendant')
+
+    query = (
+        select(
+            Categories.id,
+            Categories.parent_id,
+            Categories.title,
+            cast(func.round(func.coalesce(own.c.total, 0), 2), Float).label('total'),
+            func.coalesce(own.c.count, 0).label('count'),
+            cast(func.round(func.coalesce(func.sum(descendant.c.total), 0), 2), Float).label('subtree_total'),
+            func.coalesce(func.sum(descendant.c.count), 0).label('subtree_count'),
+        )
+        .join(subtree, subtree.c.root_id == Categories.id)
+        .outerjoin(descendant, descendant.c.category_id == subtree.c.id)
+        .outerjoin(own, own.c.category_id == Categories.id)
+        .group_by(Categories.id)
+        .order_by(Categories.title.asc())
+    )
+
+    results = await db.session.execute(query)
+    nodes = {row['id']: dict(row, children=[]) for row in results.mappings()}
+
+    await db.session.close()
+
+    tree = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if parent is None or parent is node:
+            tree.append(node)
+        else:
+            parent['children'].append(node)
+
+    # Categories in a parent_id cycle aren't reachable from any root
+    reachable = set()
+    stack = list(tree)
+    while stack:
+        node = stack.pop()
+        reachable.add(node['id'])
+        stack.extend(node['children'])
+    for node in nodes.values():
+        if node['id'] not in reachable:
+            node['children'] = []
+            tree.append(node)
+
+    return tree
+
+@router.get('/tree', response_class=FastJSONResponse)
+async def tree_categories(
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    transaction_type: TransactionStatus = Query(TransactionStatus.Withdrawal, title="type of transactions"),
+    year: Optional[int] = Query(None, title="totals of year"),
+    month: Optional[str] = Query(None, pattern=MONTH, title="totals of month, YYYY-MM"),
+    start: Optional[str] = Query(None, pattern=MONTH, title="first month of range, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH, title="last month of range, YYYY-MM"),
+):
+    """
+    Return tree of categories with totals of own transactions and of subtree
+    """
+    first, last = month_range(year, month, start, end)
+    tree = await category_tree(db, first, last, account_id, transaction_type)
+    return FastJSONResponse(tree)
 
 @router.post('/create')
 async def create_category(
     category: CategoryScheme,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
@@ -54,7 +161,7 @@ async def create_category(
 
     try:
         session.add(new_category)
-        session.commit()
+        await session.commit()
     except IntegrityError:
         HTTPException(
             status_code=400, 
@@ -64,10 +171,9 @@ async def create_category(
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(new_category)
+    await session.refresh(new_category)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 201
     return new_category
@@ -75,13 +181,13 @@ async def create_category(
 @router.post('/update')
 async def update_category(
     category: CategoryUpdate,
-    db: SessionDep,
+    db: AsyncSessionDep,
 ):
     """
     Update data of a category.
     """
     session = db.session
-    update_category = session.get(Categories, category.id)
+    update_category = await session.get(Categories, category.id)
 
     if update_category is None:
         HTTPException(
@@ -99,7 +205,7 @@ async def update_category(
 
     try:
         session.add(update_category)
-        session.commit()
+        await session.commit()
     except IntegrityError:
         HTTPException(
             status_code=400, 
@@ -109,24 +215,23 @@ async def update_category(
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(update_category)
+    await session.refresh(update_category)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     return update_category
 
 @router.get('/delete')
 async def delete_category(
     id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Delete a category
     """
     session = db.session
-    category = session.get(Categories, id)
+    category = await session.get(Categories, id)
 
     if category is None:
         HTTPException(
@@ -135,11 +240,10 @@ async def delete_category(
                 msg='Category not found',
             )])
 
-    session.delete(category)
-    session.commit()
+    await session.delete(category)
+    await session.commit()
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 204
     return
@@ -1,17 +1,21 @@
 from os import path
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import APIRouter, Query, Request, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import RedirectResponse, HTMLResponse
 from ..dependencies import (
-    SessionDep,
+    AsyncSessionDep,
     CheckFileDep,
 )
 from .account import account_list
 from .project import project_list, project_open
 from .categories import categories_list
-from .transactions import transaction_list
+from .transactions import transaction_list, PAGE_SIZE
+from .report import category_summary, month_summary, month_range, MONTH
+from ..core import svg
+from ..core.chart_cache import charts
+from ..core.error import HTTPException, makeDetail
 
 router = APIRouter(
     responses={404: {"description": "Not found"}},
@@ -26,7 +30,7 @@ async def projects(
     """
     Display all existing projects
     """
-    projects = project_list()
+    projects = await project_list()
     return templates.TemplateResponse(
         request=request,
         name="project.html",
@@ -51,24 +55,28 @@ async def project_select(
 
 @router.get('/list')
 async def list_by(
-    db: SessionDep,
+    db: AsyncSessionDep,
     request: Request,
     account_id: Optional[int] = Query(None, title="list transactions by account"),
     category_id: Optional[int] = Query(None, title="list transactions by category"),
     tag_id: Optional[int] = Query(None, title="list transactions by tag"),
     year: Optional[int] = Query(None, title="list transactions by year"),
     month: Optional[str] = Query(None, title="list transactions by month"),
+    cursor: Optional[str] = Query(None, title="next or prev cursor of previous page"),
 ):
-    accounts = jsonable_encoder(account_list(db))
-    categories = jsonable_encoder(categories_list(db))
-    transactions = jsonable_encoder(transaction_list(
+    accounts = jsonable_encoder(await account_list(db))
+    categories = jsonable_encoder(await categories_list(db))
+    page = await transaction_list(
         db,
         account_id,
         category_id,
         tag_id,
         year,
         month,
-    ))
+        PAGE_SIZE,
+        cursor,
+    )
+    transactions = page.transactions
     project = path.basename(db.engine.url.database)
     return templates.TemplateResponse(
         request=request,
@@ -77,28 +85,30 @@ async def list_by(
                 "accounts": accounts,
                 "categories": categories,
                 "transactions": transactions,
+                "next": page.next,
+                "prev": page.prev,
                 "request": request,
                 "project": project,
             }
     )
 
-def generate_pie(transactions):
-    import matplotlib.pyplot as plt
-    import mpld3
-    #import numpy as np
-    from collections import defaultdict
-    
-    category_sums = defaultdict(float)
-    for entry in transactions:
-        transaction = entry['transaction']
-        category_title = entry['category']['title']
-        amount = float(transaction['amount'])  # Convert string amount to float
-        if transaction['transaction_type'] == 'Withdrawal':
-            category_sums[category_title] += amount
-
-    # Prepare data for the pie chart
-    categories = list(category_sums.keys())
-    amounts = list(category_sums.values())
+def generate_pie(summary, backend='svg'):
+    # Withdrawals per category, already summed by SQLite
+    categories = [entry['title'] for entry in summary]
+    amounts = [entry['total'] for entry in summary]
+
+    if backend == 'svg':
+        return svg.donut(categories, amounts, title="A donut")
+
+    try:
+        import matplotlib.pyplot as plt
+        import mpld3
+    except ImportError:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Backend mpld3 requires charts extra (matplotlib, mpld3)',
+            )])
 
     fig, ax = plt.subplots(figsize=(12, 8), subplot_kw=dict(aspect="equal"))
     wedges, texts = ax.pie(amounts, wedgeprops=dict(width=0.5), startangle=-40)
@@ -121,9 +131,79 @@ def generate_pie(transactions):
     plt.close(fig)
     return html
 
+async def cached_chart(db, key: tuple, render):
+    """
+    Return chart from cache or render it, render is awaited with db
+    """
+    file = db.engine.url.database
+
+    chart = await charts.get(file, key)
+    if chart is not None:
+        return chart
+
+    # Version is read before the data, later writes make chart stale
+    version = await charts.version(file)
+    chart = await render(db)
+    charts.put(file, key, version, chart)
+    return chart
+
 @router.get('/pie', response_class=HTMLResponse)
 async def pie(
-    db: SessionDep,
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    year: Optional[int] = Query(None, title="chart of year"),
+    month: Optional[str] = Query(None, pattern=MONTH, title="chart of month, YYYY-MM"),
+    backend: Literal['svg', 'mpld3'] = Query('svg', title="chart renderer"),
 ):
-    transactions = jsonable_encoder(transaction_list(db))
-    return generate_pie(transactions)
+    """
+    Donut of withdrawals per category, rendered chart is cached until project changes
+    """
+    async def render(db):
+        first, last = month_range(year, month)
+        summary = await category_summary(db, first, last, account_id)
+        return generate_pie(summary, backend)
+
+    return await cached_chart(db, ('pie', account_id, year, month, backend), render)
+
+@router.get('/bar', response_class=HTMLResponse)
+async def bar(
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    year: Optional[int] = Query(None, title="chart of year"),
+):
+    """
+    Bars of income and expense per month
+    """
+    async def render(db):
+        first, last = month_range(year)
+        summary = await month_summary(db, first, last, account_id)
+        return svg.bar(
+            [entry['month'] for entry in summary],
+            {
+                "Income": [entry['income'] for entry in summary],
+                "Expense": [entry['expense'] for entry in summary],
+            },
+            title="Income and expense",
+        )
+
+    return await cached_chart(db, ('bar', account_id, year), render)
+
+@router.get('/line', response_class=HTMLResponse)
+async def line(
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    year: Optional[int] = Query(None, title="chart of year"),
+):
+    """
+    Line of net (income - expense) per month
+    """
+    async def render(db):
+        first, last = month_range(year)
+        summary = await month_summary(db, first, last, account_id)
+        return svg.line(
+            [entry['month'] for entry in summary],
+            {"Net": [entry['net'] for entry in summary]},
+            title="Net per month",
+        )
+
+    return await cached_chart(db, ('line', account_id, year), render)
@@ -1,18 +1,39 @@
 import copy
-from pydantic import BaseModel
+import json
+import logging
+from codecs import lookup
+from collections import defaultdict
+from io import TextIOWrapper
+from itertools import batched
+from os import getenv, remove
+from os.path import splitext
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile
+from types import SimpleNamespace
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from decimal import Decimal
-from datetime import datetime
-from typing import List
-from sqlmodel import Field
+from datetime import datetime, date, timedelta
+from typing import List, Literal, Optional
+from sqlmodel import Field, select
+from sqlalchemy import func, insert, update
 from sqlalchemy.exc import IntegrityError
-from fastapi import APIRouter, Response
-from ..dependencies import SessionDep
+from fastapi import APIRouter, File, Form, HTTPException as RequestError, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..dependencies import AsyncSessionDep
 from ..core.error import HTTPException, makeDetail
 from ..core.utils import checkIfExist
+from ..core.balance import balance_deltas, defer_balance, apply_balance
+from ..core.statement import PARSERS, StatementError, parse_statement
+from ..core.jobs import jobs
+from ..core.fingerprint import fingerprint
 from ..core.models import (
     Transactions,
     Accounts,
     Categories,
+    ImportJobs,
+    ImportJobStatus,
+    TransactionStatus,
 )
 
 router = APIRouter(
@@ -26,20 +47,361 @@ class Import(BaseModel):
     category_id: int = Field(foreign_key="Categories.id")
     transactions: List[dict]
 
+class StatementLine(BaseModel):
+    date: date
+    price: Decimal = Field(ge=0, decimal_places=2)
+    description: Optional[str] = Field(default=None, max_length=255)
+
+statement_lines = TypeAdapter(List[StatementLine])
+
+def validate_lines(lines: List[dict]) -> List[StatementLine]:
+    """
+    Validate whole statement before anything is written
+    """
+    try:
+        return statement_lines.validate_python(lines)
+    except ValidationError as e:
+        HTTPException(
+            status_code=422,
+            detail=[makeDetail(
+                type_str=error['type'],
+                loc=['transactions', *error['loc']],
+                msg=error['msg'],
+            ) for error in e.errors()])
+
+IMPORT_BATCH = 1000
+# Job whose row wasn't updated for longer is reported as interrupted
+IMPORT_JOB_STALE = int(getenv('IMPORT_JOB_STALE', 60))
+
+def new_summary() -> SimpleNamespace:
+    return SimpleNamespace(
+        imported=0,
+        withdrawal=Decimal(0),
+        deposit=Decimal(0),
+        first_date=None,
+        last_date=None,
+        duplicates=0,
+    )
+
+Duplicates = Literal['keep', 'skip', 'flag', 'merge']
+
+async def find_duplicates(session, transactions: list, last_id: int, matched: set) -> list:
+    """
+    Return id of existing transaction every one of transactions duplicates, or None.
+    One indexed lookup per batch. Only transactions existing before import
+    (id <= last_id) are matched and each of them once, so repeated
+    lines of a statement (two same coffees a day) are not duplicates.
+    """
+    fingerprints = {transaction['fingerprint'] for transaction in transactions}
+    query = (
+        select(Transactions.fingerprint, Transactions.id)
+        .where(Transactions.fingerprint.in_(fingerprints), Transactions.id <= last_id)
+        .order_by(Transactions.id)
+    )
+
+    existing = defaultdict(list)
+    for value, id in await session.execute(query):
+        if id not in matched:
+            existing[value].append(id)
+
+    found = []
+    for transaction in transactions:
+        ids = existing.get(transaction['fingerprint'])
+        id = ids.pop(0) if ids else None
+        if id is not None:
+            matched.add(id)
+        found.append(id)
+    return found
+
+def next_batch(batches) -> list | None:
+    """
+    Take next batch and fingerprint its transactions, None when batches are over.
+    Called in worker thread: statement files are parsed while batches are taken.
+    """
+    transactions = next(batches, None)
+    if transactions is None:
+        return None
+
+    transactions = list(transactions)
+    for transaction in transactions:
+        transaction['fingerprint'] = fingerprint(
+            transaction['account_id'],
+            transaction['date'],
+            transaction['amount'],
+            transaction['description'],
+        )
+    return transactions
+
+async def insert_transactions(session, batches, summary=None, duplicates: Duplicates = 'keep', atomic: bool = True, progress=None) -> SimpleNamespace:
+    """
+    Insert batches (lists of dicts with Transactions fields) with executemany
+    in one transaction, balance is updated once per account at the end
+    instead of once per row. Returns summary of inserted transactions,
+    it's updated after every batch, so it can be polled while import runs.
+
+    Without atomic every batch is committed together with its balance change,
+    other writers wait for one batch at most. On error batches committed
+    before it stay imported, summary counts only them. progress(session, rows)
+    is awaited in every batch transaction, with rows imported after its commit.
+
+    Transactions already in project (same fingerprint) are:
+        - keep: inserted
+        - skip: not inserted
+        - flag: inserted with duplicate_of
+        - merge: not inserted, existing transaction gets category of imported one
+    """
+    summary = summary or new_summary()
+    deltas = defaultdict(Decimal)
+    matched = set()
+    batches = iter(batches)
+    deferred = False
+
+    try:
+        last_id = (await session.execute(select(func.max(Transactions.id)))).scalar() or 0
+
+        while (transactions := await run_in_threadpool(next_batch, batches)) is not None:
+            # Write transaction starts here, batches are parsed outside of it
+            if not deferred:
+                await defer_balance(session)
+                deferred = True
+
+            found = []
+            if duplicates != 'keep':
+                found = await find_duplicates(session, transactions, last_id, matched)
+
+                if duplicates == 'flag':
+                    for transaction, id in zip(transactions, found):
+                        transaction['duplicate_of'] = id
+                else:
+                    if duplicates == 'merge':
+                        merged = [
+                            dict(id=id, category_id=transaction['category_id'])
+                            for transaction, id in zip(transactions, found) if id is not None
+                        ]
+                        if merged:
+                            await session.execute(update(Transactions), merged)
+
+                    transactions = [
+                        transaction for transaction, id in zip(transactions, found) if id is None
+                    ]
+
+            if transactions:
+                await session.execute(insert(Transactions), transactions)
+
+                for account_id, delta in balance_deltas(transactions).items():
+                    deltas[account_id] += delta
+
+            if not atomic:
+                await apply_balance(session, deltas)
+                if progress is not None:
+                    await progress(session, summary.imported + len(transactions))
+                await session.commit()
+                deltas.clear()
+                deferred = False
+
+            summary.duplicates += sum(id is not None for id in found)
+
+            for transaction in transactions:
+                if transaction['transaction_type'] == TransactionStatus.Deposit:
+                    summary.deposit += transaction['amount']
+                else:
+                    summary.withdrawal += transaction['amount']
+
+                day = transaction['date']
+                summary.first_date = min(summary.first_date or day, day)
+                summary.last_date = max(summary.last_date or day, day)
+
+            summary.imported += len(transactions)
+
+        await apply_balance(session, deltas)
+        await session.commit()
+
+    except IntegrityError:
+        await session.rollback()
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                type_str='insert_error',
+                loc=['sql exception'],
+                msg='UNIQUE constraint failed',
+            )])
+    except StatementError as e:
+        await session.rollback()
+        HTTPException(
+            status_code=422,
+            detail=[makeDetail(
+                type_str='statement_error',
+                loc=['file', e.line],
+                msg=e.msg,
+            )])
+
+    return summary
+
+def statement_transactions(rows, account_id: int, category_id: int):
+    """
+    Parsed statement rows as transactions, negative amount is withdrawal
+    """
+    for row in rows:
+        yield dict(
+            account_id=account_id,
+            category_id=category_id,
+            transaction_type=TransactionStatus.Withdrawal if row.amount < 0 else TransactionStatus.Deposit,
+            date=row.date,
+            amount=abs(row.amount),
+            to_amount=0,
+            description=row.description,
+        )
+
+async def update_job(session, id: int, **values):
+    await session.execute(update(ImportJobs).where(ImportJobs.id == id).values(**values))
+    await session.commit()
+
+async def run_import_job(session, id: int, account_id: int, batches, summary, duplicates: Duplicates = 'keep'):
+    """
+    Import in background, state is written to ImportJobs when job starts and ends.
+    Every batch is committed together with rows and updated_at of the job,
+    so the project stays writable and progress can be read by any process.
+    On failure batches committed before the error stay imported, rows is their number.
+    """
+    now = datetime.now()
+    await update_job(session, id, status=ImportJobStatus.running, started_at=now, updated_at=now)
+
+    async def progress(session, rows: int):
+        await session.execute(
+            update(ImportJobs)
+            .where(ImportJobs.id == id)
+            .values(rows=rows, updated_at=datetime.now())
+        )
+
+    errors = None
+    try:
+        await insert_transactions(session, batches, summary, duplicates, atomic=False, progress=progress)
+    except RequestError as e:
+        errors = e.detail
+    except Exception as e:
+        await session.rollback()
+        logging.exception(f'Import job {id} failed')
+        errors = [makeDetail(type_str='import_error', msg=str(e))]
+
+    account = await session.get(Accounts, account_id)
+    now = datetime.now()
+
+    await update_job(
+        session,
+        id,
+        status=ImportJobStatus.failed if errors else ImportJobStatus.done,
+        rows=summary.imported,
+        errors=json.dumps(errors) if errors else None,
+        balance=account.balance if account else None,
+        finished_at=now,
+        updated_at=now,
+    )
+
+async def queue_import(db, account_id: int, source: str, batches, duplicates: Duplicates = 'keep', cleanup=None) -> int:
+    """
+    Create job and run import in asyncio task with its own session,
+    returns job id right away. cleanup is called when job is finished.
+    """
+    session = db.session
+    now = datetime.now()
+    job = ImportJobs(
+        account_id=account_id,
+        source=source[:255],
+        status=ImportJobStatus.queued,
+        created_at=now,
+        updated_at=now,
+    )
+
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    id = job.id
+
+    await session.close()
+
+    engine = db.engine
+
+    async def work():
+        try:
+            async with AsyncSession(engine) as session:
+                await run_import_job(session, id, account_id, batches, new_summary(), duplicates)
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    jobs.start(engine.url.database, id, work)
+    return id
+
+def queued_response(id: int, response: Response):
+    response.status_code = 202
+    return {
+        "job_id": id,
+        "status": ImportJobStatus.queued,
+    }
+
+async def import_response(session, account_id: int, summary, response: Response):
+    account = await session.get(Accounts, account_id)
+
+    await session.close()
+
+    response.status_code = 201
+    return {
+        "account": account,
+        "imported": summary.imported,
+        "withdrawal": summary.withdrawal,
+        "deposit": summary.deposit,
+        "first_date": summary.first_date,
+        "last_date": summary.last_date,
+        "duplicates": summary.duplicates,
+    }
+
 @router.post('/')
 async def import_statement(
     statement: Import,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
+    bulk: bool = Query(False, title="insert all lines at once, respond with summary"),
+    background: bool = Query(False, title="bulk import in background, respond with job id"),
+    duplicates: Duplicates = Query('keep', title="what to do with lines imported before (bulk)"),
 ):
     """
-    Import transactions
+    Import transactions.
+    With bulk whole statement is validated first and inserted in one transaction,
+    response has summary instead of every transaction.
+    With background (implies bulk) import is queued, poll /import/jobs/{id}.
     """
     session = db.session
+
+    if bulk or background:
+        lines = validate_lines(statement.transactions)
+
+        await checkIfExist(session, Accounts, statement.account_id)
+        await checkIfExist(session, Categories, statement.category_id)
+
+        transactions = [
+            dict(
+                account_id=statement.account_id,
+                category_id=statement.category_id,
+                transaction_type=TransactionStatus.Withdrawal,
+                date=line.date,
+                amount=line.price,
+                to_amount=0,
+                description=line.description,
+            )
+            for line in lines
+        ]
+
+        if background:
+            id = await queue_import(db, statement.account_id, 'json', batched(transactions, IMPORT_BATCH), duplicates)
+            return queued_response(id, response)
+
+        summary = await insert_transactions(session, batched(transactions, IMPORT_BATCH), duplicates=duplicates)
+        return await import_response(session, statement.account_id, summary, response)
+
     saved_transactions = []
 
-    checkIfExist(session, Accounts, statement.account_id)
-    checkIfExist(session, Categories, statement.category_id)
+    await checkIfExist(session, Accounts, statement.account_id)
+    await checkIfExist(session, Categories, statement.category_id)
 
     for transaction in statement.transactions:
         save_transaction = Transactions(
@@ -50,10 +412,16 @@ async def import_statement(
             amount=Decimal(transaction['price']),
             description=transaction['description'],
         ) 
+        save_transaction.fingerprint = fingerprint(
+            save_transaction.account_id,
+            save_transaction.date,
+            save_transaction.amount,
+            save_transaction.description,
+        )
 
         try:
             session.add(save_transaction)
-            session.commit()
+            await session.commit()
 
         except IntegrityError:
             HTTPException(
@@ -63,16 +431,150 @@ async def import_statement(
                     loc=['sql exception'],
                     msg='UNIQUE constraint failed',
                 )])
-        session.refresh(save_transaction)
+        await session.refresh(save_transaction)
         saved_transactions.append(copy.copy(save_transaction))
 
-    account = session.get(Accounts, statement.account_id)
+    account = await session.get(Accounts, statement.account_id)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 201
     return { 
         "account": account,
         "transactions": saved_transactions,
     }
+
+@router.post('/upload')
+async def import_file(
+    db: AsyncSessionDep,
+    response: Response,
+    file: UploadFile = File(...),
+    account_id: int = Form(..., gt=0),
+    category_id: int = Form(..., gt=0),
+    format: Optional[Literal['csv', 'ofx', 'qif']] = Form(None, description="by default taken from file extension"),
+    encoding: str = Form('utf-8-sig'),
+    date_column: str = Form('date', description="csv header name or 0-based index"),
+    amount_column: str = Form('amount', description="csv header name or 0-based index, negative amount is withdrawal"),
+    description_column: Optional[str] = Form(None, description="csv header name or 0-based index"),
+    header: bool = Form(True, description="csv has header line"),
+    delimiter: str = Form(',', min_length=1, max_length=1),
+    date_format: Optional[str] = Form(None, description="strptime format, csv %Y-%m-%d, qif %m/%d/%Y by default"),
+    decimal_separator: Literal['.', ','] = Form('.'),
+    background: bool = Form(False, description="import in background, respond with job id"),
+    duplicates: Duplicates = Form('keep', description="what to do with lines imported before"),
+):
+    """
+    Import bank statement file (CSV, OFX or QIF).
+    File is parsed while it's read and inserted in batches of IMPORT_BATCH rows,
+    all in one transaction. Response has summary.
+    With background file is saved and import is queued, poll /import/jobs/{id},
+    batches are committed one by one.
+    """
+    session = db.session
+
+    if format is None:
+        format = splitext(file.filename or '')[1].lstrip('.').lower()
+    if format not in PARSERS:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Unknown statement format, use csv, ofx or qif',
+            )])
+
+    try:
+        lookup(encoding)
+    except LookupError:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg=f'Unknown encoding {encoding}',
+            )])
+
+    await checkIfExist(session, Accounts, account_id)
+    await checkIfExist(session, Categories, category_id)
+
+    options = dict(decimal_separator=decimal_separator)
+    if format == 'csv':
+        options.update(
+            date_column=date_column,
+            amount_column=amount_column,
+            description_column=description_column,
+            header=header,
+            delimiter=delimiter,
+        )
+    if date_format:
+        options['date_format'] = date_format
+
+    if background:
+        # Upload is closed after response, job reads its own copy
+        with NamedTemporaryFile(delete=False, suffix=f'.{format}') as copy_file:
+            await run_in_threadpool(copyfileobj, file.file, copy_file)
+
+        def statement_batches():
+            with open(copy_file.name, 'rb') as binary:
+                text = TextIOWrapper(binary, encoding=encoding, newline='')
+                rows = parse_statement(format, text, **options)
+                yield from batched(statement_transactions(rows, account_id, category_id), IMPORT_BATCH)
+
+        id = await queue_import(
+            db,
+            account_id,
+            file.filename or format,
+            statement_batches(),
+            duplicates,
+            cleanup=lambda: remove(copy_file.name),
+        )
+        return queued_response(id, response)
+
+    # Upload is spooled to disk by starlette, wrapper reads it in small chunks
+    text = TextIOWrapper(file.file, encoding=encoding, newline='')
+    rows = parse_statement(format, text, **options)
+
+    summary = await insert_transactions(
+        session,
+        batched(statement_transactions(rows, account_id, category_id), IMPORT_BATCH),
+        duplicates=duplicates,
+    )
+    text.detach()
+
+    return await import_response(session, account_id, summary, response)
+
+@router.get('/jobs/{id}')
+async def import_job(
+    id: int,
+    db: AsyncSessionDep,
+):
+    """
+    Return state of background import: status, rows processed, throughput,
+    errors and account balance after import.
+    State is read from ImportJobs, job may run in another worker process.
+    """
+    session = db.session
+    job = await session.get(ImportJobs, id)
+
+    if job is None:
+        HTTPException(
+            status_code=404,
+            detail=[makeDetail(
+                msg='Import job not found',
+            )])
+
+    await session.close()
+
+    state = job.model_dump()
+    state['errors'] = json.loads(job.errors) if job.errors else None
+    state['rows_per_second'] = None
+
+    unfinished = job.status in (ImportJobStatus.queued, ImportJobStatus.running)
+    updated_at = job.updated_at or job.started_at or job.created_at
+    stale = datetime.now() - updated_at > timedelta(seconds=IMPORT_JOB_STALE)
+
+    if unfinished and stale and jobs.get(db.engine.url.database, id) is None:
+        # Process running the job was stopped
+        state['status'] = ImportJobStatus.failed
+        state['errors'] = [makeDetail(type_str='import_error', msg='Import was interrupted')]
+    elif job.started_at and (job.finished_at or unfinished):
+        elapsed = ((job.finished_at or updated_at) - job.started_at).total_seconds()
+        state['rows_per_second'] = round(job.rows / elapsed, 1) if elapsed > 0 else None
+
+    return state
@@ -1,23 +1,27 @@
-from typing import List
-from os import listdir, remove, getenv
-from os.path import isfile, join, splitext, abspath, basename, exists
-from fastapi import APIRouter, Response
-from fastapi.responses import FileResponse
-from sqlmodel import create_engine, SQLModel, Session, text
+from typing import List, Literal
+from os import remove
+from os.path import join, splitext, basename, exists
+from fastapi import APIRouter, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from ..dependencies import (
+    folder_path,
+    catalog,
     check_file, 
+    AsyncSessionDep,
     UploadFileDep,
     CheckFileDep,
 )
 from ..core.error import HTTPException, makeDetail
 from ..core.models import ProjectFileScheme
+from ..core.engine import async_engines, evict
 from ..core.default_project import init_default
-from ..core.triggers import (
-    update_balance_on_transaction_delete,
-    update_balance_on_transaction_insert,
-    update_balance_on_transaction_update,
-    update_to_account_balance,
-)
+from ..core.migrations import create_schema
+from ..core.integrity import check
+from ..core.upload import add_project, install_project, remove_wal
+from ..core.backup import COMPRESSIONS, snapshot, compressor, compressed_chunks
+from ..core.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/project",
@@ -25,13 +29,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def project_list():
-    folder_path = getenv('PROJECT_FOLDER', abspath('./money_manager/projects'))
-    return [
-        f for f in listdir(folder_path) 
-        if isfile(join(folder_path, f))
-        if splitext(f)[1] == '.db'
-    ]
+async def project_list():
+    return await catalog.names()
 
 def project_open(file, response):
     response.set_cookie(key="project", value=file.filename)
@@ -46,7 +45,11 @@ async def delete_project_file(
     """
     Delete database file (project) from folder
     """
+    await evict(file.file_path)
     remove(file.file_path)
+    # Project created later with the same name would pick them up
+    remove_wal(file.file_path)
+    await catalog.refresh(file.file_path)
     response.status_code = 200
     return response
 
@@ -58,7 +61,6 @@ async def create_project_file(
     """
     Create database file (project) in folder. Require filename without extension
     """
-    folder_path = getenv('PROJECT_FOLDER', './money_manager/projects')
     filename = splitext(basename(file.name))[0]
     file.name = f'{filename}.db'
     file_path = join(folder_path, file.name)
@@ -70,23 +72,15 @@ async def create_project_file(
                 msg='Project already exist',
             )])
 
-    engine = create_engine(f"sqlite:///{file_path}") 
-    SQLModel.metadata.create_all(engine)
-
-    session = Session(engine)
+    engine = await async_engines.get(file_path)
 
-    session.execute(text(update_balance_on_transaction_delete))
-    session.execute(text(update_balance_on_transaction_insert))
-    session.execute(text(update_balance_on_transaction_update))
-    session.execute(text(update_to_account_balance))
+    async with engine.begin() as connection:
+        await connection.run_sync(create_schema)
+    await catalog.refresh(file_path)
 
     # TODO: remove on production
     # await init_default(session)
 
-    session.commit()
-    session.close()
-    engine.dispose()
-
     response.set_cookie(key="project", value=file.name)
     response.status_code = 201
     return response
@@ -99,16 +93,16 @@ async def upload_project_file(
     """
     Save database file (project) passed by user in folder.
     """
-    try:
-        new_file = open(file.path, 'xb')
-        new_file.write(file.content)
-    except FileExistsError:
+    if exists(file.path):
         HTTPException(
             status_code=400, 
             detail=[makeDetail(
                 msg=f"File {file.filename} already exist.",
             )])
 
+    add_project(file.temp_path, file.path)
+    await catalog.refresh(file.path)
+
     response.set_cookie(key="project", value=file.filename)
     response.status_code = 204
     return
@@ -118,7 +112,16 @@ async def get_project_files() -> List[str]:
     """
     Return list of all database files in folder.
     """
-    return project_list() 
+    return await project_list()
+
+@router.get('/catalog', response_class=FastJSONResponse)
+async def get_project_catalog():
+    """
+    Return all projects with size, modification time, number of transactions
+    and date of the last one.
+    """
+    projects = await catalog.projects()
+    return FastJSONResponse([vars(project) for project in projects.values()])
 
 @router.post('/update')
 async def update_project_file(
@@ -130,16 +133,8 @@ async def update_project_file(
     """
     ProjectFileScheme.name = file.filename
     await check_file(ProjectFileScheme)
-
-    try:
-        saved_file = open(file.path, 'wb')
-        saved_file.write(file.content)
-    except FileNotFoundError as err:
-        HTTPException(
-            status_code=400, 
-            detail=[makeDetail(
-                msg=str(err),
-            )])
+    await install_project(file.temp_path, file.path)
+    await catalog.refresh(file.path)
 
     response.set_cookie(key="project", value=file.filename)
     response.status_code = 204
@@ -148,13 +143,26 @@ async def update_project_file(
 @router.post('/download')
 async def download_project_file(
     file: CheckFileDep,
+    compression: Literal['gzip', 'zstd'] | None = Query(None),
 ):
     """
-    Return existed file.
+    Return consistent copy of existed file, made while project stays in use.
     """
-    return FileResponse(
-        path=file.file_path,
-        filename=file.filename,     
+    compress = compressor(compression) if compression else None
+    path = await run_in_threadpool(snapshot, file.file_path)
+
+    if compress is None:
+        return FileResponse(
+            path=path,
+            filename=file.filename,
+            background=BackgroundTask(remove, path),
+        )
+
+    suffix, media_type = COMPRESSIONS[compression]
+    return StreamingResponse(
+        compressed_chunks(path, compress),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{file.filename}{suffix}"'},
     )
 
 @router.post('/open')
@@ -166,3 +174,22 @@ async def open_project(
     Sends cookie with selected database file.
     """
     return project_open(file, response)    
+
+@router.post('/verify', response_class=FastJSONResponse)
+async def verify_project(
+    db: AsyncSessionDep,
+    repair: bool = Query(False, title="recompute everything that differs"),
+):
+    """
+    Check balances of accounts, balance checkpoints and monthly totals
+    of opened project against its transactions.
+    With repair they are recomputed, result shows what was wrong before.
+    opening_balances lists accounts whose opening balance was derived by
+    migration from their balance then, so earlier drift can't be seen.
+    """
+    await db.session.close()
+
+    async with db.engine.begin() as connection:
+        result = await connection.run_sync(check, repair)
+
+    return FastJSONResponse(vars(result))
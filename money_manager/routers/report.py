@@ -0,0 +1,227 @@
+from typing import Optional
+from fastapi import APIRouter, Query
+from sqlalchemy import Float, case, cast, func
+from sqlmodel import select
+from ..dependencies import AsyncSessionDep
+from ..core.responses import FastJSONResponse
+from ..core.models import (
+    Accounts,
+    Categories,
+    MonthlyTotals,
+    Transactions,
+    TransactionStatus,
+)
+
+router = APIRouter(
+    prefix="/report",
+    tags=["report"],
+    responses={404: {"description": "Not found"}},
+)
+
+MONTH = r'^\d{4}-(0[1-9]|1[0-2])$'
+
+def month_range(year=None, month=None, start=None, end=None) -> tuple:
+    """
+    Return first and last month ('YYYY-MM') of range, None if not bounded
+    """
+    if month:
+        return month, month
+    if year:
+        return f'{year:04d}-01', f'{year:04d}-12'
+    return start, end
+
+def month_filter(column, first, last) -> list:
+    filter = []
+    if first:
+        filter.append(column >= first)
+    if last:
+        filter.append(column <= last)
+    return filter
+
+def total(column):
+    return cast(func.round(func.sum(column), 2), Float)
+
+async def category_summary(
+    db,
+    first=None,
+    last=None,
+    account_id=None,
+    transaction_type=TransactionStatus.Withdrawal,
+):
+    """
+    Total and count of transactions per category
+    """
+    filter = month_filter(MonthlyTotals.month, first, last)
+    filter.append(MonthlyTotals.type == transaction_type)
+    if account_id:
+        filter.append(MonthlyTotals.account_id == account_id)
+
+    query = (
+        select(
+            MonthlyTotals.category_id,
+            Categories.title,
+            total(MonthlyTotals.total).label('total'),
+            func.sum(MonthlyTotals.count).label('count'),
+        )
+        .join(Categories, Categories.id == MonthlyTotals.category_id)
+        .where(*filter)
+        .group_by(MonthlyTotals.category_id)
+        .order_by(func.sum(MonthlyTotals.total).desc())
+    )
+
+    results = await db.session.execute(query)
+    return [dict(row) for row in results.mappings()]
+
+async def month_summary(
+    db,
+    first=None,
+    last=None,
+    account_id=None,
+):
+    """
+    Income (Deposit) and expense (Withdrawal) per month, transfers are not included
+    """
+    filter = month_filter(MonthlyTotals.month, first, last)
+    if account_id:
+        filter.append(MonthlyTotals.account_id == account_id)
+
+    def by_type(transaction_type):
+        return func.sum(case(
+            (MonthlyTotals.type == transaction_type, MonthlyTotals.total),
+            else_=0,
+        ))
+
+    income = by_type(TransactionStatus.Deposit)
+    expense = by_type(TransactionStatus.Withdrawal)
+
+    query = (
+        select(
+            MonthlyTotals.month,
+            cast(func.round(income, 2), Float).label('income'),
+            cast(func.round(expense, 2), Float).label('expense'),
+            cast(func.round(income - expense, 2), Float).label('net'),
+        )
+        .where(*filter)
+        .group_by(MonthlyTotals.month)
+        .order_by(MonthlyTotals.month)
+    )
+
+    results = await db.session.execute(query)
+    return [dict(row) for row in results.mappings()]
+
+async def account_summary(
+    db,
+    first=None,
+    last=None,
+):
+    """
+    Net flow per account: deposits and incoming transfers minus
+    withdrawals and outgoing transfers
+    """
+    outgoing = (
+        select(
+            MonthlyTotals.account_id.label('account_id'),
+            total(case(
+                (MonthlyTotals.type == TransactionStatus.Deposit, MonthlyTotals.total),
+                else_=0,
+            )).label('income'),
+            total(case(
+                (MonthlyTotals.type == TransactionStatus.Withdrawal, MonthlyTotals.total),
+                else_=0,
+            )).label('expense'),
+            total(case(
+                (MonthlyTotals.type == TransactionStatus.Transfer, MonthlyTotals.total),
+                else_=0,
+            )).label('transfer_out'),
+        )
+        .where(*month_filter(MonthlyTotals.month, first, last))
+        .group_by(MonthlyTotals.account_id)
+        .subquery()
+    )
+
+    # Incoming side of transfers is not in MonthlyTotals, uses to_account_id index
+    month = func.substr(Transactions.date, 1, 7)
+    incoming = (
+        select(
+            Transactions.to_account_id.label('account_id'),
+            total(case(
+                (Transactions.to_amount != 0, Transactions.to_amount),
+                else_=Transactions.amount,
+            )).label('transfer_in'),
+        )
+        .where(Transactions.to_account_id.is_not(None))
+        .where(*month_filter(month, first, last))
+        .group_by(Transactions.to_account_id)
+        .subquery()
+    )
+
+    income = cast(func.coalesce(outgoing.c.income, 0), Float)
+    expense = cast(func.coalesce(outgoing.c.expense, 0), Float)
+    transfer_out = cast(func.coalesce(outgoing.c.transfer_out, 0), Float)
+    transfer_in = cast(func.coalesce(incoming.c.transfer_in, 0), Float)
+
+    query = (
+        select(
+            Accounts.id.label('account_id'),
+            Accounts.title,
+            Accounts.currency,
+            income.label('income'),
+            expense.label('expense'),
+            transfer_out.label('transfer_out'),
+            transfer_in.label('transfer_in'),
+            cast(func.round(income + transfer_in - expense - transfer_out, 2), Float).label('net'),
+        )
+        .outerjoin(outgoing, outgoing.c.account_id == Accounts.id)
+        .outerjoin(incoming, incoming.c.account_id == Accounts.id)
+        .order_by(Accounts.title.asc())
+    )
+
+    results = await db.session.execute(query)
+    return [dict(row) for row in results.mappings()]
+
+@router.get('/summary/category', response_class=FastJSONResponse)
+async def summary_by_category(
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    transaction_type: TransactionStatus = Query(TransactionStatus.Withdrawal, title="type of transactions"),
+    year: Optional[int] = Query(None, title="summary of year"),
+    month: Optional[str] = Query(None, pattern=MONTH, title="summary of month, YYYY-MM"),
+    start: Optional[str] = Query(None, pattern=MONTH, title="first month of range, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH, title="last month of range, YYYY-MM"),
+):
+    """
+    Return total and count of transactions per category
+    """
+    first, last = month_range(year, month, start, end)
+    summary = await category_summary(db, first, last, account_id, transaction_type)
+    return FastJSONResponse(summary)
+
+@router.get('/summary/month', response_class=FastJSONResponse)
+async def summary_by_month(
+    db: AsyncSessionDep,
+    account_id: Optional[int] = Query(None, title="only transactions of account"),
+    year: Optional[int] = Query(None, title="summary of year"),
+    start: Optional[str] = Query(None, pattern=MONTH, title="first month of range, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH, title="last month of range, YYYY-MM"),
+):
+    """
+    Return income, expense and net per month
+    """
+    first, last = month_range(year, None, start, end)
+    summary = await month_summary(db, first, last, account_id)
+    return FastJSONResponse(summary)
+
+@router.get('/summary/account', response_class=FastJSONResponse)
+async def summary_by_account(
+    db: AsyncSessionDep,
+    year: Optional[int] = Query(None, title="summary of year"),
+    month: Optional[str] = Query(None, pattern=MONTH, title="summary of month, YYYY-MM"),
+    start: Optional[str] = Query(None, pattern=MONTH, title="first month of range, YYYY-MM"),
+    end: Optional[str] = Query(None, pattern=MONTH, title="last month of range, YYYY-MM"),
+):
+    """
+    Return net flow per account
+    """
+    first, last = month_range(year, month, start, end)
+    summary = await account_summary(db, first, last)
+    return FastJSONResponse(summary)
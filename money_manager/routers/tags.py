@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Response
 from sqlmodel import Field, select
 from sqlalchemy.exc import IntegrityError
-from ..dependencies import SessionDep
+from ..dependencies import AsyncSessionDep
 from ..core.error import HTTPException, makeDetail
 from ..core.models import (
     Tags, 
@@ -20,7 +20,7 @@ class TagUpdate(TagScheme):
 
 @router.get('/list')
 async def list_tags(
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
@@ -28,11 +28,10 @@ async def list_tags(
     """
     session = db.session
     statement = select(Tags).order_by(Tags.title.asc())
-    results = session.exec(statement) 
+    results = await session.exec(statement) 
     tags = results.all()
     
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 200
     return tags
@@ -40,7 +39,7 @@ async def list_tags(
 @router.post('/create')
 async def create_tag(
     tag: TagScheme,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
@@ -51,7 +50,7 @@ async def create_tag(
 
     try:
         session.add(new_tag)
-        session.commit()
+        await session.commit()
     except IntegrityError:
         HTTPException(
             status_code=400, 
@@ -61,10 +60,9 @@ async def create_tag(
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(new_tag)
+    await session.refresh(new_tag)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 201
     return new_tag
@@ -72,13 +70,13 @@ async def create_tag(
 @router.post('/update')
 async def update_tag(
     tag: TagUpdate,
-    db: SessionDep,
+    db: AsyncSessionDep,
 ):
     """
     Update data of a tag.
     """
     session = db.session
-    update_tag = session.get(Tags, tag.id)
+    update_tag = await session.get(Tags, tag.id)
 
     if update_tag is None:
         HTTPException(
@@ -96,7 +94,7 @@ async def update_tag(
 
     try:
         session.add(update_tag)
-        session.commit()
+        await session.commit()
     except IntegrityError:
         HTTPException(
             status_code=400, 
@@ -106,24 +104,23 @@ async def update_tag(
                 msg='UNIQUE constraint failed',
             )])
 
-    session.refresh(update_tag)
+    await session.refresh(update_tag)
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     return update_tag
 
 @router.get('/delete')
 async def delete_tag(
     id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     response: Response,
 ):
     """
     Delete a tag
     """
     session = db.session
-    tag = session.get(Tags, id)
+    tag = await session.get(Tags, id)
 
     if tag is None:
         HTTPException(
@@ -132,11 +129,10 @@ async def delete_tag(
                 msg='Tag not found',
             )])
 
-    session.delete(tag)
-    session.commit()
+    await session.delete(tag)
+    await session.commit()
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
     response.status_code = 204
     return
@@ -1,25 +1,42 @@
-from typing import List, Optional
+import json
 import datetime
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from types import SimpleNamespace
+from typing import Annotated, List, Literal, Optional, Union
 from decimal import Decimal
-from fastapi import APIRouter, Response, Query
+from fastapi import APIRouter, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import aliased
-from sqlalchemy import and_
+from pydantic import BaseModel, Discriminator
+from sqlalchemy import Float, case, cast, delete, or_, func
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import (
     Field,
     Column,
     Enum,
     select,
 )
-from ..dependencies import SessionDep
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..dependencies import AsyncSessionDep
 from ..core.error import HTTPException, makeDetail
 from ..core.utils import checkIfExist
+from ..core.projection import Projection
+from ..core.responses import FastJSONResponse, dumps
+from ..core.search import TransactionsSearch, match_query
+from ..core.fingerprint import fingerprint
+from ..core.balance import apply_balance, defer_balance, removed_balance_deltas
+from ..core.ledger import incoming, outgoing
 from ..core.models import (
     Accounts,
+    BalanceCheckpoints,
     Categories,
     Tags,
     TransactionStatus,
     Transactions,
     TransactionScheme, 
+    AccountScheme,
+    CategoryScheme,
+    TagScheme,
     update_attributes
 )
 
@@ -43,113 +60,534 @@ class TransactionUpdate(TransactionScheme):
     amount: Decimal = Field(default=None, ge=0, decimal_places=2)
     to_amount: Decimal = Field(default=None, ge=0, decimal_places=2)
 
-def transaction_list(
+class BatchCreate(BaseModel):
+    op: Literal['create']
+    transaction: TransactionScheme
+
+class BatchUpdate(BaseModel):
+    op: Literal['update']
+    transaction: TransactionUpdate
+
+class BatchDelete(BaseModel):
+    op: Literal['delete']
+    id: int
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchDelete], Discriminator('op')]
+
+PAGE_SIZE = 100
+STREAM_BATCH = 500
+BATCH_SIZE = 1000
+
+Transaction = aliased(Transactions, name="transaction")
+Account = aliased(Accounts, name="from_account")
+ToAccount = aliased(Accounts, name="to_account")
+Category = aliased(Categories, name="category")
+Tag = aliased(Tags, name="tag")
+
+# Fields of API schemes, columns used internally (fingerprint, opening_balance) stay out
+transaction_view = Projection(
+    ("transaction", Transaction, TransactionScheme.model_fields),
+    ("from_account", Account, AccountScheme.model_fields),
+    ("to_account", ToAccount, AccountScheme.model_fields),
+    ("category", Category, CategoryScheme.model_fields),
+    ("tag", Tag, TagScheme.model_fields),
+)
+
+def encode_cursor(transaction: dict, backward=False) -> str:
+    """
+    Opaque cursor pointing at (date, id) of a transaction
+    """
+    value = json.dumps([transaction['date'], transaction['id'], backward])
+    return urlsafe_b64encode(value.encode()).decode()
+
+def decode_cursor(cursor: str) -> SimpleNamespace:
+    try:
+        date, id, backward = json.loads(urlsafe_b64decode(cursor.encode()))
+        return SimpleNamespace(
+            date=datetime.date.fromisoformat(date),
+            id=int(id),
+            backward=bool(backward),
+        )
+    except (ValueError, TypeError):
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Invalid cursor',
+            )])
+
+def update_fingerprint(transaction: Transactions):
+    transaction.fingerprint = fingerprint(
+        transaction.account_id,
+        transaction.date,
+        transaction.amount,
+        transaction.description,
+    )
+
+def ids_filter(column, ids: list):
+    """
+    column IN ids, all ids are bound as one JSON parameter,
+    so there is no limit of SQL variables
+    """
+    requested = func.json_each(json.dumps(ids)).table_valued('value')
+    return column.in_(select(requested.c.value))
+
+async def transaction_filter(
+    session,
+    Transaction,
+    account_id=None,
+    category_id=None,
+    tag_id=None,
+    year=None,
+    month=None,
+) -> list:
+    """
+    Return where clauses for Transaction (aliased Transactions)
+    """
+    filter = []
+
+    if account_id:
+        await checkIfExist(session, Accounts, account_id)
+        filter.append(Transaction.account_id == account_id)
+
+    if category_id:
+        await checkIfExist(session, Categories, category_id)
+        filter.append(Transaction.category_id == category_id)
+
+    if tag_id:
+        await checkIfExist(session, Tags, tag_id)
+        filter.append(Transaction.tag_id == tag_id)
+
+    if year:
+        start_of_year = datetime.date(year, 1, 1)
+        end_of_year = datetime.date(year, 12, 31)
+        filter.append(Transaction.date >= start_of_year)
+        filter.append(Transaction.date <= end_of_year)
+
+    if month:
+        year, month_num = map(int, month.split('-'))
+
+        start_of_month = datetime.date(year, month_num, 1)
+        next_month = month_num + 1 if month_num < 12 else 1
+        next_year = year if month_num < 12 else year + 1
+        end_of_month = datetime.date(next_year, next_month, 1)
+
+        filter.append(Transaction.date >= start_of_month)
+        filter.append(Transaction.date < end_of_month)
+
+    return filter
+
+def period_start(year=None, month=None):
+    """
+    First day of year/month filter, None if not filtered by them
+    """
+    starts = []
+    if year:
+        starts.append(datetime.date(year, 1, 1))
+    if month:
+        year, month_num = map(int, month.split('-'))
+        starts.append(datetime.date(year, month_num, 1))
+    return max(starts, default=None)
+
+def running_balance(account_id: int, since=None, until=None):
+    """
+    Subquery of (id, balance) with balance of account after each of its transactions,
+    incoming transfers (to_account_id, to_amount) included.
+    Balance is current one minus all later transactions, so rows before since
+    don't change the result and are skipped. Rows of months after until are
+    replaced with their BalanceCheckpoints.
+    """
+    change = (
+        case((Transactions.account_id == account_id, outgoing()), else_=0)
+        + case((Transactions.to_account_id == account_id, incoming()), else_=0)
+    )
+    later = func.sum(change).over(
+        order_by=(Transactions.date.desc(), Transactions.id.desc()),
+        rows=(None, -1),
+    )
+    balance = select(Accounts.balance).where(Accounts.id == account_id).scalar_subquery()
+
+    filter = [or_(
+        Transactions.account_id == account_id,
+        Transactions.to_account_id == account_id,
+    )]
+    if since:
+        filter.append(Transactions.date >= since)
+    if until:
+        month = until.strftime('%Y-%m')
+        later_months = (
+            select(func.coalesce(func.sum(BalanceCheckpoints.delta), 0))
+            .where(BalanceCheckpoints.account_id == account_id, BalanceCheckpoints.month > month)
+            .scalar_subquery()
+        )
+        balance = balance - later_months
+        next_month = (until.replace(day=1) + datetime.timedelta(days=31)).replace(day=1)
+        filter.append(Transactions.date < next_month)
+
+    return (
+        select(
+            Transactions.id,
+            cast(func.round(balance - func.coalesce(later, 0), 2), Float).label('balance'),
+        )
+        .where(*filter)
+        .subquery('running')
+    )
+
+async def add_running_balance(session, account_id: int, transactions: list):
+    """
+    Set balance of account after every transaction of a page,
+    only months the page spans are summed
+    """
+    if not transactions:
+        return
+
+    dates = [datetime.date.fromisoformat(item['transaction']['date']) for item in transactions]
+    running = running_balance(account_id, min(dates).replace(day=1), max(dates))
+    ids = [item['transaction']['id'] for item in transactions]
+
+    results = await session.execute(
+        select(running.c.id, running.c.balance).where(ids_filter(running.c.id, ids))
+    )
+    balances = dict(results.all())
+
+    for item in transactions:
+        item['balance'] = balances[item['transaction']['id']]
+
+def with_running_balance(query, account_id, year=None, month=None):
+    running = running_balance(account_id, period_start(year, month))
+    return query.join(running, running.c.id == Transaction.id).add_columns(running.c.balance)
+
+def nest(row, running=False) -> dict:
+    """
+    Row of transaction_select as dict, running balance is the last column
+    """
+    transaction = transaction_view.nest(row)
+    if running:
+        transaction['balance'] = row[-1]
+    return transaction
+
+def transaction_select():
+    """
+    Select transactions with joined accounts, category and tag as plain columns,
+    rows are turned into dicts with transaction_view.nest
+    """
+    query = select(*transaction_view.columns).select_from(Transaction)
+    query = query.outerjoin(Account, Transaction.account_id == Account.id)
+    query = query.outerjoin(ToAccount, Transaction.to_account_id == ToAccount.id)
+    query = query.outerjoin(Category, Transaction.category_id == Category.id)
+    query = query.outerjoin(Tag, Transaction.tag_id == Tag.id)
+    return query
+
+async def transaction_list(
     db,
     account_id=None,
     category_id=None,
     tag_id=None,
     year=None,
     month=None,
+    limit=None,
+    cursor=None,
+    total=False,
+    running=False,
 ):
+    """
+    Return page of transactions ordered by (date desc, id desc).
+    Without limit all transactions are returned.
+    Cursor is taken from next/prev of previous page.
+    With running every transaction has balance of account_id after it.
+    """
     session = db.session
+    query = transaction_select()
+
+    filter = await transaction_filter(
+        session,
+        Transaction,
+        account_id,
+        category_id,
+        tag_id,
+        year,
+        month,
+    )
 
-    Transaction = aliased(Transactions, name="transaction")
-    Account = aliased(Accounts, name="from_account")
-    ToAccount = aliased(Accounts, name="to_account")
-    Category = aliased(Categories, name="category")
-    Tag = aliased(Tags, name="tag")
+    page = SimpleNamespace(transactions=[], next=None, prev=None, total=None)
+
+    if total:
+        count = select(func.count()).select_from(Transaction).where(*filter)
+        page.total = (await session.execute(count)).scalar_one()
+
+    position = decode_cursor(cursor) if cursor else None
+    backward = position is not None and position.backward
+
+    if position is not None:
+        # Keyset condition, date bound is repeated so index range can be used
+        if backward:
+            filter.append(Transaction.date >= position.date)
+            filter.append(or_(
+                Transaction.date > position.date,
+                Transaction.id > position.id,
+            ))
+        else:
+            filter.append(Transaction.date <= position.date)
+            filter.append(or_(
+                Transaction.date < position.date,
+                Transaction.id < position.id,
+            ))
+
+    if backward:
+        order = (Transaction.date.asc(), Transaction.id.asc())
+    else:
+        order = (Transaction.date.desc(), Transaction.id.desc())
 
-    query = select(Transaction)
+    query = query.where(*filter).order_by(*order)
 
-    if (account_id is not None or
-        category_id is not None or
-        tag_id is not None or
-        month is not None or
-        year is not None):
+    if limit is not None:
+        # One extra row tells if there is another page
+        query = query.limit(limit + 1)
 
-        filter = []
+    results = await session.execute(query)
+    transactions = [transaction_view.nest(row) for row in results]
 
-        if account_id:
-            checkIfExist(session, Accounts, account_id)
-            filter.append(Transaction.account_id == account_id)
+    more = limit is not None and len(transactions) > limit
+    if more:
+        transactions = transactions[:limit]
 
-        if category_id:
-            checkIfExist(session, Categories, category_id)
-            filter.append(Transaction.category_id == category_id)
+    if running:
+        await add_running_balance(session, account_id, transactions)
 
-        if tag_id:
-            checkIfExist(session, Tags, tag_id)
-            filter.append(Transaction.tag_id == tag_id)
+    await session.close()
 
-        if year:
-            start_of_year = datetime.date(year, 1, 1)
-            end_of_year = datetime.date(year, 12, 31)
-            filter.append(Transaction.date >= start_of_year)
-            filter.append(Transaction.date <= end_of_year)
+    if backward:
+        transactions = transactions[::-1]
 
-        if month:
-            year, month_num = map(int, month.split('-'))
+    page.transactions = transactions
 
-            start_of_month = datetime.date(year, month_num, 1)
-            next_month = month_num + 1 if month_num < 12 else 1
-            next_year = year if month_num < 12 else year + 1
-            end_of_month = datetime.date(next_year, next_month, 1)
+    if transactions:
+        first = transactions[0]['transaction']
+        last = transactions[-1]['transaction']
 
-            filter.append(Transaction.date >= start_of_month)
-            filter.append(Transaction.date < end_of_month)
+        # Going backward there is always a next page, going forward
+        # there is a previous one if cursor was passed
+        if more or backward:
+            page.next = encode_cursor(last)
+        if more if backward else position is not None:
+            page.prev = encode_cursor(first, backward=True)
 
-        query = query.outerjoin(Account, Transaction.account_id == Account.id).where(and_(*filter)).order_by(Transaction.date.desc()).add_columns(Account)
+    return page
 
-    else:
-        query = query.outerjoin(Account, Transaction.account_id == Account.id).order_by(Transaction.date.desc()).add_columns(Account)
+async def transaction_stream(
+    db,
+    account_id=None,
+    category_id=None,
+    tag_id=None,
+    year=None,
+    month=None,
+    format='ndjson',
+    running=False,
+):
+    """
+    Return async generator of encoded chunks with all matching transactions.
+    Rows are fetched with server side cursor in batches of STREAM_BATCH,
+    so only one batch is held in memory.
+    """
+    query = transaction_select()
+    if running:
+        query = with_running_balance(query, account_id, year, month)
+
+    filter = await transaction_filter(
+        db.session,
+        Transaction,
+        account_id,
+        category_id,
+        tag_id,
+        year,
+        month,
+    )
+    await db.session.close()
+
+    query = query.where(*filter).order_by(Transaction.date.desc(), Transaction.id.desc())
+    query = query.execution_options(yield_per=STREAM_BATCH)
+
+    async def chunks():
+        # Request session is closed before response body is sent
+        async with AsyncSession(db.engine) as session:
+            result = await session.stream(query)
 
-    query = query.outerjoin(ToAccount, Transaction.to_account_id == ToAccount.id).add_columns(ToAccount)
-    query = query.outerjoin(Category, Transaction.category_id == Category.id).add_columns(Category)
-    query = query.outerjoin(Tag, Transaction.tag_id == Tag.id).add_columns(Tag)
+            if format == 'json':
+                yield '['
 
-    results = session.execute(query)
-    transactions = results.mappings().all()
-    
-    session.close()
-    db.engine.dispose()
+            separator = ''
+            async for rows in result.partitions():
+                lines = [dumps(nest(row, running)) for row in rows]
 
-    return transactions
+                if format == 'json':
+                    yield separator + ','.join(lines)
+                    separator = ','
+                else:
+                    yield '\n'.join(lines) + '\n'
 
-@router.get('/list')
+            if format == 'json':
+                yield ']'
+
+    return chunks()
+
+@router.get('/list', response_class=FastJSONResponse)
 async def list_transactions(
-    db: SessionDep,
-    response: Response,
+    db: AsyncSessionDep,
     account_id: Optional[int] = Query(None, title="list transactions by account"),
     category_id: Optional[int] = Query(None, title="list transactions by category"),
     tag_id: Optional[int] = Query(None, title="list transactions by tag"),
     year: Optional[int] = Query(None, title="list transactions by year"),
     month: Optional[str] = Query(None, title="list transactions by month"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=1000, title="page size"),
+    cursor: Optional[str] = Query(None, title="next or prev cursor of previous page"),
+    total: bool = Query(False, title="count all transactions matching filter"),
+    stream: Optional[Literal['ndjson', 'json']] = Query(None, title="stream all matching transactions"),
+    running_balance: bool = Query(False, title="balance of account_id after every transaction"),
 ):
     """
-    Return list of transactions:
+    Return page of transactions:
         - all
         - by account_id
         - by category_id
         - by tag_id
         - by month
         - by year
+    Follow next/prev cursors to get other pages.
+    With stream all matching transactions are sent as NDJSON or JSON array,
+    without pagination.
+    With running_balance every transaction has balance of the account after it,
+    incoming transfers of the account count even though they aren't listed.
+    """
+    if running_balance and not account_id:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='running_balance needs account_id',
+            )])
+
+    if stream is not None:
+        chunks = await transaction_stream(
+            db,
+            account_id,
+            category_id,
+            tag_id,
+            year,
+            month,
+            stream,
+            running_balance,
+        )
+        media_type = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        return StreamingResponse(chunks, media_type=media_type)
+
+    page = await transaction_list(
+        db,
+        account_id,
+        category_id,
+        tag_id,
+        year,
+        month,
+        limit,
+        cursor,
+        total,
+        running_balance,
+    )
+    return FastJSONResponse({
+        "transactions": page.transactions,
+        "next": page.next,
+        "prev": page.prev,
+        "total": page.total,
+    })
+
+async def transaction_search(
+    db,
+    text,
+    account_id=None,
+    category_id=None,
+    tag_id=None,
+    year=None,
+    month=None,
+    limit=PAGE_SIZE,
+    offset=0,
+):
+    """
+    Return transactions matching text in description, category or tag title,
+    best matches (bm25) first
+    """
+    session = db.session
+    match = match_query(text)
+
+    if match is None:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Search text has no words',
+            )])
+
+    filter = await transaction_filter(
+        session,
+        Transaction,
+        account_id,
+        category_id,
+        tag_id,
+        year,
+        month,
+    )
+
+    query = (
+        transaction_select()
+        .join(TransactionsSearch, TransactionsSearch.c.rowid == Transaction.id)
+        .where(TransactionsSearch.c.TransactionsSearch.match(match), *filter)
+        .order_by(TransactionsSearch.c.rank, Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+        .offset(offset)
+    )
+
+    results = await session.execute(query)
+    transactions = [transaction_view.nest(row) for row in results]
+
+    await session.close()
+
+    page = SimpleNamespace(transactions=transactions[:limit], next_offset=None)
+    if len(transactions) > limit:
+        page.next_offset = offset + limit
+
+    return page
+
+@router.get('/search', response_class=FastJSONResponse)
+async def search_transactions(
+    db: AsyncSessionDep,
+    q: str = Query(..., min_length=1, max_length=255, title="words to search, last ones may be incomplete"),
+    account_id: Optional[int] = Query(None, title="search transactions by account"),
+    category_id: Optional[int] = Query(None, title="search transactions by category"),
+    tag_id: Optional[int] = Query(None, title="search transactions by tag"),
+    year: Optional[int] = Query(None, title="search transactions by year"),
+    month: Optional[str] = Query(None, title="search transactions by month"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=1000, title="page size"),
+    offset: int = Query(0, ge=0, title="next_offset of previous page"),
+):
     """
-    transactions = transaction_list(
+    Full-text search in description, category and tag title.
+    Every word matches as a prefix, best matches come first.
+    """
+    page = await transaction_search(
         db,
+        q,
         account_id,
         category_id,
         tag_id,
         year,
         month,
+        limit,
+        offset,
     )
-    response.status_code = 200
-    return transactions
+    return FastJSONResponse({
+        "transactions": page.transactions,
+        "next_offset": page.next_offset,
+    })
 
-@router.post('/create')
+@router.post('/create', response_class=FastJSONResponse)
 async def create_transaction(
     transaction: TransactionScheme,
-    db: SessionDep,
-    response: Response,
+    db: AsyncSessionDep,
 ):
     """
     Create a transaction
@@ -166,44 +604,32 @@ async def create_transaction(
         to_amount=transaction.to_amount,
         description=transaction.description,
     )
+    update_fingerprint(save_transaction)
 
     session.add(save_transaction)
-    session.commit()
-
-    session.refresh(save_transaction)
-
-    Transaction = aliased(Transactions, name="transaction")
-    Account = aliased(Accounts, name="from_account")
-    ToAccount = aliased(Accounts, name="to_account")
-    Category = aliased(Categories, name="category")
-    Tag = aliased(Tags, name="tag")
+    await session.commit()
 
-    query = select(Transaction).where(Transaction.id == save_transaction.id)
+    await session.refresh(save_transaction)
 
-    query = query.outerjoin(Account, Transaction.account_id == Account.id).add_columns(Account)
-    query = query.outerjoin(ToAccount, Transaction.to_account_id == ToAccount.id).add_columns(ToAccount)
-    query = query.outerjoin(Category, Transaction.category_id == Category.id).add_columns(Category)
-    query = query.outerjoin(Tag, Transaction.tag_id == Tag.id).add_columns(Tag)
+    query = transaction_select().where(Transaction.id == save_transaction.id)
 
-    results = session.execute(query)
-    new_transaction = results.mappings().first()
+    results = await session.execute(query)
+    new_transaction = transaction_view.nest(results.one())
 
-    session.close()
-    db.engine.dispose()
+    await session.close()
 
-    response.status_code = 201
-    return new_transaction
+    return FastJSONResponse(new_transaction, status_code=201)
 
-@router.post('/update')
+@router.post('/update', response_class=FastJSONResponse)
 async def update_transaction(
     transaction: TransactionUpdate,
-    db: SessionDep,
+    db: AsyncSessionDep,
 ):
     """
     Update data of a transaction.
     """
     session = db.session
-    update_transaction = session.get(Transactions, transaction.id)
+    update_transaction = await session.get(Transactions, transaction.id)
 
     if update_transaction is None:
         HTTPException(
@@ -219,63 +645,257 @@ async def update_transaction(
                 msg='Nothing to update',
             )])
 
+    update_fingerprint(update_transaction)
+
     session.add(update_transaction)
-    session.commit()
+    await session.commit()
+
+    await session.refresh(update_transaction)
 
-    session.refresh(update_transaction)
+    query = transaction_select().where(Transaction.id == update_transaction.id)
 
-    Transaction = aliased(Transactions, name="transaction")
-    Account = aliased(Accounts, name="from_account")
-    ToAccount = aliased(Accounts, name="to_account")
-    Category = aliased(Categories, name="category")
-    Tag = aliased(Tags, name="tag")
+    results = await session.execute(query)
+    updated_transaction = transaction_view.nest(results.one())
 
-    query = select(Transaction).where(Transaction.id == update_transaction.id)
+    await session.close()
 
-    query = query.outerjoin(Account, Transaction.account_id == Account.id).add_columns(Account)
-    query = query.outerjoin(ToAccount, Transaction.to_account_id == ToAccount.id).add_columns(ToAccount)
-    query = query.outerjoin(Category, Transaction.category_id == Category.id).add_columns(Category)
-    query = query.outerjoin(Tag, Transaction.tag_id == Tag.id).add_columns(Tag)
+    return FastJSONResponse(updated_transaction)
 
-    results = session.execute(query)
-    updated_transaction = results.mappings().first()
+class TransactionDeleteFilter(BaseModel):
+    account_id: Optional[int] = Field(default=None, gt=0)
+    category_id: Optional[int] = Field(default=None, gt=0)
+    tag_id: Optional[int] = Field(default=None, gt=0)
+    start: Optional[datetime.date] = Field(default=None, title="first day, inclusive")
+    end: Optional[datetime.date] = Field(default=None, title="last day, inclusive")
 
-    session.close()
-    db.engine.dispose()
+async def delete_where(session, filter: list) -> int:
+    """
+    Delete Transactions matching filter with one DELETE in one transaction,
+    balance is changed once per account by summed delta
+    """
+    # Takes write lock first, so deltas are computed from rows being deleted
+    await defer_balance(session)
+    deltas = await removed_balance_deltas(session, filter)
+
+    result = await session.execute(
+        delete(Transactions)
+        .where(*filter)
+        .execution_options(synchronize_session=False)
+    )
 
-    return updated_transaction
+    await apply_balance(session, deltas)
+    await session.commit()
+
+    return result.rowcount
 
 @router.post('/delete')
 async def delete_transactions(
     ids: List[int],
-    db: SessionDep,
-    response: Response,
+    db: AsyncSessionDep,
+):
+    """
+    Delete transactions by ids, not found ids are returned
+    """
+    session = db.session
+
+    filter = [ids_filter(Transactions.id, ids)]
+
+    found = set((await session.execute(select(Transactions.id).where(*filter))).scalars())
+    deleted = await delete_where(session, filter) if found else 0
+
+    await session.close()
+
+    return {
+        "deleted": deleted,
+        "not_found": list(dict.fromkeys(id for id in ids if id not in found)),
+    }
+
+@router.post('/delete/filter')
+async def delete_transactions_by_filter(
+    delete_filter: TransactionDeleteFilter,
+    db: AsyncSessionDep,
 ):
     """
-    Delete a transactions
+    Delete all transactions:
+        - of account_id
+        - of category_id
+        - of tag_id
+        - between start and end dates
+    At least one of them is required.
     """
     session = db.session
-    skiped = []
+    filter = []
+
+    if delete_filter.account_id:
+        filter.append(Transactions.account_id == delete_filter.account_id)
+    if delete_filter.category_id:
+        filter.append(Transactions.category_id == delete_filter.category_id)
+    if delete_filter.tag_id:
+        filter.append(Transactions.tag_id == delete_filter.tag_id)
+    if delete_filter.start:
+        filter.append(Transactions.date >= delete_filter.start)
+    if delete_filter.end:
+        filter.append(Transactions.date <= delete_filter.end)
+
+    if not filter:
+        HTTPException(
+            status_code=400,
+            detail=[makeDetail(
+                msg='Filter is empty',
+            )])
+
+    deleted = await delete_where(session, filter)
 
-    for id in ids:
-        transaction = session.get(Transactions, id)
+    await session.close()
 
-        if transaction is None:
-            skiped.append(id)
+    return {
+        "deleted": deleted,
+    }
+
+async def check_references(session, operations: list):
+    """
+    Throws HTTPException with index of the first operation
+    referencing account, category or tag that doesn't exist
+    """
+    references = (
+        ('account_id', Accounts),
+        ('to_account_id', Accounts),
+        ('category_id', Categories),
+        ('tag_id', Tags),
+    )
+    transactions = [
+        (index, operation.transaction) for index, operation in enumerate(operations)
+        if operation.op != 'delete'
+    ]
+
+    for field, model in references:
+        ids = {getattr(transaction, field) for _, transaction in transactions} - {None}
+        if not ids:
             continue
 
-        session.delete(transaction)
-        session.commit()
+        found = set((await session.execute(
+            select(model.id).where(ids_filter(model.id, list(ids)))
+        )).scalars())
+
+        for index, transaction in transactions:
+            id = getattr(transaction, field)
+            if id is not None and id not in found:
+                HTTPException(
+                    status_code=400,
+                    detail=[makeDetail(
+                        type_str='insert_error',
+                        loc=[index, 'transaction', field],
+                        msg=f'{model.id}={id} doesn\' exist',
+                    )])
+
+async def apply_batch(session, operations: list) -> list:
+    """
+    Apply operations in order without committing,
+    return id of created or updated transaction (None for delete) per operation
+    """
+    await check_references(session, operations)
+
+    ids = [
+        operation.id if operation.op == 'delete' else operation.transaction.id
+        for operation in operations if operation.op != 'create'
+    ]
+    stored = {}
+    if ids:
+        result = await session.execute(
+            select(Transactions).where(ids_filter(Transactions.id, ids))
+        )
+        stored = {transaction.id: transaction for transaction in result.scalars()}
+
+    created = []
+    deleted = set()
+    results = []
+
+    for index, operation in enumerate(operations):
+        if operation.op == 'create':
+            save_transaction = Transactions(**dict(operation.transaction, id=None))
+            update_fingerprint(save_transaction)
+            created.append(save_transaction)
+            results.append(save_transaction)
+            continue
 
-    if len(skiped) > 0:
+        id = operation.id if operation.op == 'delete' else operation.transaction.id
+        if id not in stored:
+            HTTPException(
+                status_code=404,
+                detail=[makeDetail(
+                    loc=[index],
+                    msg=f'Transaction {id} not found',
+                )])
+
+        if operation.op == 'delete':
+            deleted.add(stored.pop(id).id)
+            results.append(None)
+        else:
+            update_transaction = stored[id]
+            update_attributes(operation.transaction, update_transaction)
+            update_fingerprint(update_transaction)
+            results.append(update_transaction)
+
+    try:
+        session.add_all(created)
+        await session.flush()
+
+        if deleted:
+            await session.execute(
+                delete(Transactions)
+                .where(ids_filter(Transactions.id, list(deleted)))
+                .execution_options(synchronize_session=False)
+            )
+    except IntegrityError:
+        await session.rollback()
         HTTPException(
-            status_code=200,
+            status_code=400,
             detail=[makeDetail(
-                msg=f'Transactions with ID\'s {skiped} not found',
+                type_str='insert_error',
+                loc=['sql exception'],
+                msg='Constraint failed',
             )])
 
-    session.close()
-    db.engine.dispose()
+    # Transactions updated and then deleted in the same batch are gone
+    return [
+        None if transaction is None or transaction.id in deleted else transaction.id
+        for transaction in results
+    ]
 
-    response.status_code = 204
-    return
+@router.post('/batch', response_class=FastJSONResponse)
+async def batch_transactions(
+    operations: Annotated[List[BatchOperation], Body(min_length=1, max_length=BATCH_SIZE)],
+    db: AsyncSessionDep,
+):
+    """
+    Create, update and delete transactions in one database transaction:
+        - {"op": "create", "transaction": {...}}
+        - {"op": "update", "transaction": {"id": ..., ...}}
+        - {"op": "delete", "id": ...}
+    Operations are applied in order, if one fails nothing is saved.
+    Result of every operation is returned in the same order.
+    """
+    session = db.session
+    ids = await apply_batch(session, operations)
+
+    saved = [id for id in ids if id is not None]
+    transactions = {}
+    if saved:
+        query = transaction_select().where(ids_filter(Transaction.id, saved))
+        for row in await session.execute(query):
+            transaction = transaction_view.nest(row)
+            transactions[transaction['transaction']['id']] = transaction
+
+    await session.commit()
+    await session.close()
+
+    results = []
+    for operation, id in zip(operations, ids):
+        if id is not None:
+            results.append({"op": operation.op, "transaction": transactions[id]})
+        elif operation.op == 'delete':
+            results.append({"op": operation.op, "id": operation.id})
+        else:
+            results.append({"op": operation.op, "id": operation.transaction.id})
+
+    return FastJSONResponse({"results": results})
@@ -0,0 +1,104 @@
+"""
+Latency under mixed read/write load.
+
+Starts uvicorn on a fresh project with ROWS transactions. One client keeps
+listing transactions, CLIENTS clients mix /account/list and /tag/create
+(1 write : 3 reads). Prints p50/p90/p99 of the mixed requests.
+
+    python scripts/bench_latency.py --rows 20000
+    python scripts/bench_latency.py --src ../other-checkout
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--src', default=os.path.join(os.path.dirname(__file__), '..'),
+                        help='checkout to run, main.py is started from it')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--port', type=int, default=8765)
+    return parser.parse_args()
+
+def fill(path: str, rows: int):
+    random.seed(0)
+    db = sqlite3.connect(path)
+    db.executemany(
+        "INSERT INTO Transactions (account_id, category_id, transaction_type, date, amount, to_amount, description) "
+        "VALUES (1, 1, 'Withdrawal', ?, 1.0, 0, 'x')",
+        [(f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',) for _ in range(rows)],
+    )
+    db.commit()
+    db.close()
+
+def percentile(values: list, p: float) -> float:
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000
+
+async def run(args, folder: str):
+    url = f'http://127.0.0.1:{args.port}/api/manager'
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        await client.post('/project/create', json={'name': 'bench'})
+        client.cookies.set('project', 'bench.db')
+        await client.post('/account/create', json={'title': 'Cash', 'currency': 'BYN', 'balance': 100})
+        await client.post('/category/create', json={'title': 'Food'})
+        fill(os.path.join(folder, 'bench.db'), args.rows)
+
+        latencies = []
+        stop = asyncio.Event()
+
+        async def listing():
+            while not stop.is_set():
+                await client.get('/transaction/list')
+
+        async def mixed(number: int):
+            count = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                if count % 4 == 0:
+                    await client.post('/tag/create', json={'title': f'tag-{number}-{count}'})
+                else:
+                    await client.get('/account/list')
+                latencies.append(time.perf_counter() - start)
+                count += 1
+
+        tasks = [asyncio.create_task(listing())]
+        tasks += [asyncio.create_task(mixed(number)) for number in range(args.clients)]
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    latencies.sort()
+    print(
+        f'rows={args.rows} requests={len(latencies)} '
+        f'p50={percentile(latencies, 0.5):.1f}ms '
+        f'p90={percentile(latencies, 0.9):.1f}ms '
+        f'p99={percentile(latencies, 0.99):.1f}ms'
+    )
+
+def main():
+    args = parse_args()
+    folder = tempfile.mkdtemp()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--log-level', 'warning'],
+        cwd=args.src,
+        env=dict(os.environ, PROJECT_FOLDER=folder),
+    )
+    try:
+        time.sleep(3)
+        asyncio.run(run(args, folder))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == '__main__':
+    main()
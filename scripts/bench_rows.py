@@ -0,0 +1,102 @@
+"""
+Throughput of transaction listing in rows/s.
+
+Runs the app in process (TestClient) on a fresh project with ROWS
+transactions, walks every page of /transaction/list with limit=1000 and
+then reads the whole NDJSON export. With --dump the first page is written
+as JSON, to compare output of two checkouts.
+
+    python scripts/bench_rows.py --rows 50000
+    python scripts/bench_rows.py --src ../other-checkout --dump before.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+PREFIX = '/api/manager'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--src', default=os.path.join(os.path.dirname(__file__), '..'),
+                        help='checkout to run, main.py is imported from it')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--limit', type=int, default=1000)
+    parser.add_argument('--dump', help='write first page of 50 transactions to this file')
+    return parser.parse_args()
+
+def fill(path: str, rows: int):
+    """
+    Transfers every 5th row, tag on every other row
+    """
+    random.seed(0)
+    db = sqlite3.connect(path)
+    db.executemany(
+        "INSERT INTO Transactions (account_id, to_account_id, category_id, tag_id, transaction_type, "
+        "date, amount, to_amount, description) VALUES (1, ?, 1, ?, ?, ?, ?, 0, 'some description')",
+        [(
+            2 if number % 5 == 0 else None,
+            1 if number % 2 else None,
+            'Transfer' if number % 5 == 0 else 'Withdrawal',
+            f'20{random.randint(10, 24)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
+            round(random.uniform(1, 100), 2),
+        ) for number in range(rows)],
+    )
+    db.commit()
+    db.close()
+
+def main():
+    args = parse_args()
+    src = os.path.abspath(args.src)
+    dump = args.dump and os.path.abspath(args.dump)
+    folder = tempfile.mkdtemp()
+
+    # Read by money_manager on import, static/ and templates/ are relative to src
+    os.environ['PROJECT_FOLDER'] = folder
+    os.chdir(src)
+    sys.path.insert(0, src)
+    from fastapi.testclient import TestClient
+    from main import app
+    logging.disable(logging.CRITICAL)
+
+    client = TestClient(app, base_url=f'http://testserver{PREFIX}')
+    client.post('/project/create', json={'name': 'bench'})
+    client.cookies.set('project', 'bench.db')
+    for title in ('Cash', 'Visa'):
+        client.post('/account/create', json={'title': title, 'currency': 'BYN', 'balance': 100})
+    client.post('/category/create', json={'title': 'Food'})
+    client.post('/tag/create', json={'title': 'Coffee'})
+    fill(os.path.join(folder, 'bench.db'), args.rows)
+
+    # Warm up engine and caches
+    client.get('/transaction/list', params={'limit': 10})
+
+    start = time.perf_counter()
+    rows, cursor = 0, None
+    while True:
+        params = {'limit': args.limit, **({'cursor': cursor} if cursor else {})}
+        page = client.get('/transaction/list', params=params).json()
+        rows += len(page['transactions'])
+        cursor = page['next']
+        if not cursor:
+            break
+    elapsed = time.perf_counter() - start
+    print(f'paged  rows={rows} {elapsed:.2f}s {rows / elapsed:,.0f} rows/s')
+
+    start = time.perf_counter()
+    rows = client.get('/transaction/list', params={'stream': 'ndjson'}).text.count('\n')
+    elapsed = time.perf_counter() - start
+    print(f'stream rows={rows} {elapsed:.2f}s {rows / elapsed:,.0f} rows/s')
+
+    if dump:
+        first = client.get('/transaction/list', params={'limit': 50}).json()['transactions']
+        with open(dump, 'w') as file:
+            json.dump(first, file, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFIX = '/api/manager'
+
+# Read by money_manager on import, static/ and templates/ are relative to ROOT
+os.environ['PROJECT_FOLDER'] = tempfile.mkdtemp()
+os.chdir(ROOT)
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app
+    return app
+
+@pytest.fixture
+def client(app):
+    """
+    Requests share one event loop, so background tasks outlive the request
+    """
+    from fastapi.testclient import TestClient
+    with TestClient(app, base_url=f'http://testserver{PREFIX}') as client:
+        yield client
+
+@pytest.fixture
+def project(client):
+    """
+    New project with one account, category and tag, opened in client
+    """
+    name = f'{uuid4().hex}.db'
+    response = client.post('/project/create', json={'name': name})
+    assert response.status_code == 201, response.text
+    client.cookies.set('project', name)
+
+    account = client.post('/account/create', json={'title': 'Cash', 'currency': 'BYN', 'balance': 100})
+    category = client.post('/category/create', json={'title': 'Food'})
+    tag = client.post('/tag/create', json={'title': 'Coffee'})
+
+    return SimpleNamespace(
+        name=name,
+        path=os.path.join(os.environ['PROJECT_FOLDER'], name),
+        account_id=account.json()['id'],
+        category_id=category.json()['id'],
+        tag_id=tag.json()['id'],
+    )
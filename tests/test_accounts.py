@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+# Response fields of /account endpoints, opening_balance is internal
+FIELDS = {'id', 'title', 'currency', 'balance'}
+
+def test_response_fields(client, project):
+    response = client.post('/account/create', json={'title': 'Card', 'currency': 'BYN', 'balance': 50})
+    assert response.status_code == 201, response.text
+    account = response.json()
+    assert set(account) == FIELDS
+
+    response = client.post('/account/update', json={**account, 'balance': 80})
+    assert response.status_code == 200, response.text
+    assert set(response.json()) == FIELDS
+
+    accounts = client.get('/account/list').json()
+    assert len(accounts) == 2
+    for item in accounts:
+        assert set(item) == FIELDS
+    assert {item['id']: Decimal(str(item['balance'])) for item in accounts}[account['id']] == 80
@@ -0,0 +1,142 @@
+import sqlite3
+from collections import defaultdict
+from decimal import Decimal
+import pytest
+from money_manager.core.engine import create_project_engine
+from money_manager.core.migrations import create_schema
+
+ACCOUNTS = [(1, 'Cash', 100), (2, 'Card', 50), (3, 'Savings', 0)]
+
+# id, account_id, to_account_id, transaction_type, date, amount, to_amount
+TRANSACTIONS = [
+    (1, 1, None, 'Withdrawal', '2024-03-05', 10.25, 0),
+    (2, 1, None, 'Deposit', '2024-03-10', 200, 0),
+    (3, 1, 2, 'Transfer', '2024-03-15', 30, 0),
+    (4, 2, 3, 'Transfer', '2024-04-01', 40, 38.5),
+]
+
+INSERT = (
+    'INSERT INTO Transactions (id, account_id, to_account_id, category_id, transaction_type, date, amount, to_amount) '
+    'VALUES (?, ?, ?, 1, ?, ?, ?, ?)'
+)
+
+@pytest.fixture
+def ledger(tmp_path):
+    """
+    New project with ACCOUNTS and TRANSACTIONS written through the triggers
+    """
+    path = str(tmp_path / 'ledger.db')
+    engine = create_project_engine(path)
+    with engine.begin() as connection:
+        create_schema(connection)
+    engine.dispose()
+
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute('PRAGMA foreign_keys=ON')
+    db.executemany(
+        "INSERT INTO Accounts (id, title, currency, balance, opening_balance) VALUES (?, ?, 'BYN', ?, ?)",
+        [(id, title, balance, balance) for id, title, balance in ACCOUNTS],
+    )
+    db.execute("INSERT INTO Categories (id, title) VALUES (1, 'Food')")
+    for transaction in TRANSACTIONS:
+        db.execute(INSERT, transaction)
+
+    yield db
+    db.close()
+
+def money(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+def assert_recomputed(db):
+    """
+    Accounts.balance and BalanceCheckpoints equal a full recompute from Transactions
+    """
+    balances = {id: money(balance) for id, balance in db.execute('SELECT id, opening_balance FROM Accounts')}
+    checkpoints = defaultdict(lambda: [Decimal(0), 0])
+
+    def add(account_id, month, delta):
+        balances[account_id] += delta
+        checkpoints[(account_id, month)][0] += delta
+        checkpoints[(account_id, month)][1] += 1
+
+    for account_id, to_account_id, transaction_type, date, amount, to_amount in db.execute(
+        'SELECT account_id, to_account_id, transaction_type, date, amount, to_amount FROM Transactions'
+    ):
+        month = date[:7]
+        add(account_id, month, money(amount) if transaction_type == 'Deposit' else -money(amount))
+        if to_account_id is not None:
+            add(to_account_id, month, money(to_amount) if to_amount else money(amount))
+
+    stored = {id: money(balance) for id, balance in db.execute('SELECT id, balance FROM Accounts')}
+    assert stored == balances
+
+    stored = {
+        (account_id, month): [money(delta), count]
+        for account_id, month, delta, count in db.execute(
+            'SELECT account_id, month, delta, count FROM BalanceCheckpoints'
+        )
+    }
+    assert stored == {key: [money(delta), count] for key, (delta, count) in checkpoints.items()}
+
+def test_seeded(ledger):
+    assert_recomputed(ledger)
+    assert dict(ledger.execute('SELECT id, balance FROM Accounts')) == {1: 259.75, 2: 40, 3: 38.5}
+
+@pytest.mark.parametrize('values', [
+    (5, 1, None, 'Withdrawal', '2024-05-01', 0.1, 0),
+    (5, 3, None, 'Deposit', '2024-05-01', 0.2, 0),
+    (5, 3, 1, 'Transfer', '2024-03-31', 5.55, 0),
+    (5, 1, 3, 'Transfer', '2024-05-01', 10, 9.99),
+], ids=['withdrawal', 'deposit', 'transfer', 'transfer to_amount'])
+def test_insert(ledger, values):
+    ledger.execute(INSERT, values)
+    assert_recomputed(ledger)
+
+@pytest.mark.parametrize('sql', [
+    'UPDATE Transactions SET amount = 0.35 WHERE id = 1',
+    "UPDATE Transactions SET transaction_type = 'Deposit' WHERE id = 1",
+    'UPDATE Transactions SET account_id = 3 WHERE id = 1',
+    "UPDATE Transactions SET date = '2024-05-31' WHERE id = 2",
+    'UPDATE Transactions SET amount = 31.1 WHERE id = 3',
+    'UPDATE Transactions SET to_account_id = 3 WHERE id = 3',
+    'UPDATE Transactions SET account_id = 3, to_account_id = 1 WHERE id = 3',
+    'UPDATE Transactions SET to_amount = 29.9 WHERE id = 3',
+    'UPDATE Transactions SET to_amount = 0 WHERE id = 4',
+    "UPDATE Transactions SET date = '2024-03-02' WHERE id = 4",
+    "UPDATE Transactions SET transaction_type = 'Withdrawal', to_account_id = NULL WHERE id = 3",
+    "UPDATE Transactions SET transaction_type = 'Transfer', to_account_id = 3, to_amount = 1 WHERE id = 1",
+    'UPDATE Transactions SET amount = amount + 1',
+], ids=[
+    'withdrawal amount',
+    'withdrawal to deposit',
+    'withdrawal account',
+    'deposit month',
+    'transfer amount',
+    'transfer to_account',
+    'transfer both accounts',
+    'transfer to_amount set',
+    'transfer to_amount cleared',
+    'transfer month',
+    'transfer to withdrawal',
+    'withdrawal to transfer',
+    'all amounts',
+])
+def test_update(ledger, sql):
+    ledger.execute(sql)
+    assert_recomputed(ledger)
+
+@pytest.mark.parametrize('sql', [
+    'DELETE FROM Transactions WHERE id = 1',
+    'DELETE FROM Transactions WHERE id = 2',
+    'DELETE FROM Transactions WHERE id = 3',
+    'DELETE FROM Transactions WHERE id = 4',
+    'DELETE FROM Transactions',
+], ids=['withdrawal', 'deposit', 'transfer', 'transfer to_amount', 'all'])
+def test_delete(ledger, sql):
+    ledger.execute(sql)
+    assert_recomputed(ledger)
+
+def test_delete_account(ledger):
+    # Transactions of account are removed by cascade, through the same triggers
+    ledger.execute('DELETE FROM Accounts WHERE id = 3')
+    assert_recomputed(ledger)
@@ -0,0 +1,115 @@
+from decimal import Decimal
+import pytest
+
+@pytest.fixture
+def ledger(client, project):
+    """
+    Cash (100) with a deposit of 50 and a withdrawal of 20, empty Card (0)
+    """
+    card = client.post('/account/create', json={'title': 'Card', 'currency': 'BYN', 'balance': 0}).json()['id']
+    ids = []
+    for type, amount in (('Deposit', '50'), ('Withdrawal', '20')):
+        response = client.post('/transaction/create', json=transaction(project, type=type, amount=amount))
+        assert response.status_code == 201, response.text
+        ids.append(response.json()['transaction']['id'])
+    return ids, project.account_id, card
+
+def transaction(project, type='Withdrawal', amount='1', **fields) -> dict:
+    # Every field is sent, update clears the ones left out
+    return {
+        'account_id': project.account_id,
+        'category_id': project.category_id,
+        'transaction_type': type,
+        'date': '2024-03-01',
+        'amount': amount,
+        'to_amount': '0',
+        **fields,
+    }
+
+def balances(client) -> dict:
+    return {account['id']: Decimal(str(account['balance'])) for account in client.get('/account/list').json()}
+
+def count(client) -> int:
+    return len(client.get('/transaction/list').json()['transactions'])
+
+def assert_consistent(client):
+    result = client.post('/project/verify').json()
+    assert result['ok'], result
+
+def test_batch(client, project, ledger):
+    (deposit, withdrawal), cash, card = ledger
+
+    response = client.post('/transaction/batch', json=[
+        {'op': 'create', 'transaction': transaction(project, amount='10')},
+        {'op': 'create', 'transaction': transaction(
+            project, type='Transfer', amount='5', to_account_id=card, to_amount='4', date='2024-04-01',
+        )},
+        {'op': 'update', 'transaction': transaction(
+            project, type='Deposit', amount='60', id=deposit, account_id=card,
+        )},
+        {'op': 'delete', 'id': withdrawal},
+    ])
+    assert response.status_code == 200, response.text
+
+    results = response.json()['results']
+    assert [result['op'] for result in results] == ['create', 'create', 'update', 'delete']
+    assert results[1]['transaction']['transaction']['to_amount'] == 4
+    assert results[2]['transaction']['transaction']['account_id'] == card
+    assert results[3] == {'op': 'delete', 'id': withdrawal}
+
+    assert balances(client) == {cash: Decimal('85'), card: Decimal('64')}
+    assert count(client) == 3
+    assert_consistent(client)
+
+@pytest.mark.parametrize('field', ['account_id', 'to_account_id', 'category_id', 'tag_id'])
+def test_missing_reference(client, project, ledger, field):
+    before = balances(client)
+
+    fields = {'type': 'Transfer'} if field == 'to_account_id' else {}
+    response = client.post('/transaction/batch', json=[
+        {'op': 'create', 'transaction': transaction(project)},
+        {'op': 'delete', 'id': ledger[0][1]},
+        {'op': 'create', 'transaction': transaction(project, **fields, **{field: 999999})},
+    ])
+    assert response.status_code == 400, response.text
+    assert response.json()['detail'][0]['loc'] == [2, 'transaction', field]
+
+    # Nothing of the batch is saved
+    assert balances(client) == before
+    assert count(client) == 2
+    assert_consistent(client)
+
+@pytest.mark.parametrize('op', ['update', 'delete'])
+def test_missing_id(client, project, ledger, op):
+    before = balances(client)
+
+    missing = (
+        {'op': 'delete', 'id': 999999} if op == 'delete'
+        else {'op': 'update', 'transaction': transaction(project, id=999999)}
+    )
+    response = client.post('/transaction/batch', json=[
+        {'op': 'create', 'transaction': transaction(project)},
+        missing,
+    ])
+    assert response.status_code == 404, response.text
+    assert response.json()['detail'][0]['loc'] == [1]
+
+    assert balances(client) == before
+    assert count(client) == 2
+
+def test_update_then_delete(client, project, ledger):
+    (deposit, _), cash, card = ledger
+
+    response = client.post('/transaction/batch', json=[
+        {'op': 'update', 'transaction': transaction(project, type='Deposit', amount='70', id=deposit, account_id=card)},
+        {'op': 'delete', 'id': deposit},
+    ])
+    assert response.status_code == 200, response.text
+    assert response.json()['results'] == [
+        {'op': 'update', 'id': deposit},
+        {'op': 'delete', 'id': deposit},
+    ]
+
+    assert balances(client) == {cash: Decimal('80'), card: Decimal('0')}
+    assert count(client) == 1
+    assert_consistent(client)
@@ -0,0 +1,114 @@
+import sqlite3
+from decimal import Decimal
+import pytest
+
+@pytest.fixture
+def ledger(client, project):
+    """
+    Cash (100) and Card (50) with withdrawals, deposits and transfers both ways
+    over two months, returns ids of transactions by name
+    """
+    card = client.post('/account/create', json={'title': 'Card', 'currency': 'BYN', 'balance': 50}).json()['id']
+    cash = project.account_id
+    transactions = {
+        'coffee': (cash, None, 'Withdrawal', '2024-03-05', '3.25', '0'),
+        'salary': (cash, None, 'Deposit', '2024-03-10', '200', '0'),
+        'to card': (cash, card, 'Transfer', '2024-03-15', '30', '0'),
+        'to cash': (card, cash, 'Transfer', '2024-04-01', '20', '19.5'),
+        'rent': (card, None, 'Withdrawal', '2024-04-02', '10.1', '0'),
+    }
+    ids = {}
+    for name, (account_id, to_account_id, type, date, amount, to_amount) in transactions.items():
+        response = client.post('/transaction/create', json={
+            'account_id': account_id,
+            'to_account_id': to_account_id,
+            'category_id': project.category_id,
+            'tag_id': project.tag_id if type == 'Withdrawal' else None,
+            'transaction_type': type,
+            'date': date,
+            'amount': amount,
+            'to_amount': to_amount,
+        })
+        assert response.status_code == 201, response.text
+        ids[name] = response.json()['transaction']['id']
+    return ids, cash, card
+
+def balances(client) -> dict:
+    return {account['id']: Decimal(str(account['balance'])) for account in client.get('/account/list').json()}
+
+def assert_consistent(client, project):
+    """
+    Balances and checkpoints match a full recompute, balance triggers are on again
+    """
+    result = client.post('/project/verify').json()
+    assert result['ok'], result
+
+    db = sqlite3.connect(project.path)
+    try:
+        assert db.execute('SELECT COUNT(*) FROM BalanceDeferred').fetchone() == (0,)
+    finally:
+        db.close()
+
+def test_seeded(client, project, ledger):
+    _, cash, card = ledger
+    assert balances(client) == {cash: Decimal('286.25'), card: Decimal('49.9')}
+    assert_consistent(client, project)
+
+@pytest.mark.parametrize('names, expected', [
+    (['coffee'], ('289.5', '49.9')),
+    (['to card'], ('316.25', '19.9')),
+    (['to cash', 'rent'], ('266.75', '80')),
+    (['coffee', 'salary', 'to card', 'to cash', 'rent'], ('100', '50')),
+], ids=['withdrawal', 'transfer', 'incoming transfer', 'all'])
+def test_delete(client, project, ledger, names, expected):
+    ids, cash, card = ledger
+    response = client.post('/transaction/delete', json=[ids[name] for name in names] + [999999, 999999])
+    assert response.status_code == 200, response.text
+    assert response.json() == {'deleted': len(names), 'not_found': [999999]}
+
+    assert balances(client) == {cash: Decimal(expected[0]), card: Decimal(expected[1])}
+    assert_consistent(client, project)
+
+def test_delete_not_found(client, project, ledger):
+    response = client.post('/transaction/delete', json=[999999])
+    assert response.json() == {'deleted': 0, 'not_found': [999999]}
+    assert_consistent(client, project)
+
+@pytest.mark.parametrize('filter, deleted, expected', [
+    ({'account': 'card'}, 2, ('266.75', '80')),
+    ({'start': '2024-04-01'}, 2, ('266.75', '80')),
+    ({'end': '2024-03-31'}, 3, ('119.5', '19.9')),
+    ({'start': '2024-03-10', 'end': '2024-04-01'}, 3, ('96.75', '39.9')),
+    ({'tag': True}, 2, ('289.5', '60')),
+], ids=['account', 'start', 'end', 'period', 'tag'])
+def test_delete_filter(client, project, ledger, filter, deleted, expected):
+    _, cash, card = ledger
+    body = {key: value for key, value in filter.items() if key in ('start', 'end')}
+    if 'account' in filter:
+        body['account_id'] = card
+    if 'tag' in filter:
+        body['tag_id'] = project.tag_id
+
+    response = client.post('/transaction/delete/filter', json=body)
+    assert response.status_code == 200, response.text
+    assert response.json() == {'deleted': deleted}
+
+    assert balances(client) == {cash: Decimal(expected[0]), card: Decimal(expected[1])}
+    assert_consistent(client, project)
+
+    # Balance triggers are back on for following writes
+    response = client.post('/transaction/create', json={
+        'account_id': cash,
+        'category_id': project.category_id,
+        'transaction_type': 'Deposit',
+        'date': '2024-05-01',
+        'amount': '1',
+    })
+    assert response.status_code == 201, response.text
+    assert balances(client)[cash] == Decimal(expected[0]) + 1
+    assert_consistent(client, project)
+
+def test_delete_filter_empty(client, project, ledger):
+    response = client.post('/transaction/delete/filter', json={})
+    assert response.status_code == 400, response.text
+    assert len(client.get('/transaction/list').json()['transactions']) == 5
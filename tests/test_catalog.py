@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sqlite3
+import time
+import pytest
+from money_manager.core.catalog import ProjectCatalog, read_metadata
+from money_manager.core.engine import create_project_engine
+from money_manager.core.migrations import create_schema
+
+def create_project(path: str, transactions: int = 0):
+    """
+    Closed project with checkpointed WAL, as left by the app
+    """
+    engine = create_project_engine(path)
+    with engine.begin() as connection:
+        create_schema(connection)
+    engine.dispose()
+
+    db = sqlite3.connect(path)
+    try:
+        add_transactions(db, transactions)
+        db.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        db.close()
+
+def add_transactions(db, count: int):
+    db.execute("INSERT OR IGNORE INTO Accounts (id, title, currency, balance, opening_balance) VALUES (1, 'Cash', 'BYN', 0, 0)")
+    db.execute("INSERT OR IGNORE INTO Categories (id, title) VALUES (1, 'Food')")
+    db.executemany(
+        "INSERT INTO Transactions (account_id, category_id, transaction_type, date, amount, to_amount) "
+        "VALUES (1, 1, 'Withdrawal', ?, 1, 0)",
+        [(f'2024-03-{day + 1:02d}',) for day in range(count)],
+    )
+    db.commit()
+
+def test_closed_project(tmp_path):
+    path = str(tmp_path / 'closed.db')
+    create_project(path, 3)
+
+    metadata = read_metadata(path)
+    assert (metadata.name, metadata.transactions, metadata.last_activity) == ('closed.db', 3, '2024-03-03')
+    # Opened immutable, nothing is left next to the project
+    assert sorted(os.listdir(tmp_path)) == ['closed.db']
+
+    # Unchanged file isn't opened again
+    assert read_metadata(path, metadata) is metadata
+
+def test_open_project(tmp_path):
+    path = str(tmp_path / 'open.db')
+    create_project(path, 3)
+
+    # Writer keeps new rows in WAL, read only connection sees them
+    db = sqlite3.connect(path)
+    try:
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA wal_autocheckpoint=0')
+        cached = read_metadata(path)
+        add_transactions(db, 2)
+        assert os.path.getsize(path + '-wal') > 0
+
+        metadata = read_metadata(path, cached)
+        assert metadata is not cached
+        assert (metadata.transactions, metadata.last_activity) == (5, '2024-03-03')
+    finally:
+        db.close()
+
+async def wait_for(catalog: ProjectCatalog, until, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        projects = await catalog.projects()
+        if until(projects) or time.monotonic() > deadline:
+            return projects
+        await asyncio.sleep(0.05)
+
+def test_watcher(tmp_path):
+    create_project(str(tmp_path / 'first.db'), 1)
+    (tmp_path / 'notes.txt').write_text('not a project')
+
+    async def main():
+        catalog = ProjectCatalog(str(tmp_path))
+        assert list(await catalog.projects()) == ['first.db']
+        # Watcher task starts watching on its first run
+        await asyncio.sleep(0.5)
+
+        # Changes made by others are picked up by the watcher
+        create_project(str(tmp_path / 'second.db'), 2)
+        projects = await wait_for(catalog, lambda projects: 'second.db' in projects)
+        assert projects['second.db'].transactions == 2
+
+        db = sqlite3.connect(str(tmp_path / 'first.db'))
+        try:
+            add_transactions(db, 1)
+        finally:
+            db.close()
+        projects = await wait_for(catalog, lambda projects: projects['first.db'].transactions == 2)
+        assert projects['first.db'].transactions == 2
+
+        os.remove(tmp_path / 'second.db')
+        projects = await wait_for(catalog, lambda projects: 'second.db' not in projects)
+        assert list(projects) == ['first.db']
+
+        # Changes made by the app are applied right away
+        create_project(str(tmp_path / 'third.db'))
+        await catalog.refresh(str(tmp_path / 'third.db'))
+        assert 'third.db' in await catalog.names()
+
+    asyncio.run(main())
+
+def test_concurrent_first_use(tmp_path, monkeypatch):
+    create_project(str(tmp_path / 'first.db'))
+    catalog = ProjectCatalog(str(tmp_path))
+    scans = []
+    scan = catalog._scan
+    monkeypatch.setattr(catalog, '_scan', lambda: scans.append(1) or scan())
+
+    async def main():
+        results = await asyncio.gather(*[catalog.names() for _ in range(5)])
+        assert results == [['first.db']] * 5
+
+    asyncio.run(main())
+    assert len(scans) == 1
+
+def test_app_catalog():
+    from money_manager.dependencies import catalog, folder_path
+    assert catalog.folder == folder_path
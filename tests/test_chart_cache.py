@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sqlite3
+import pytest
+from money_manager.core.chart_cache import ChartCache
+
+@pytest.fixture
+def closed_project(tmp_path):
+    """
+    Project in WAL mode closed by its last connection, no -wal or -shm
+    """
+    path = str(tmp_path / 'charts.db')
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('CREATE TABLE Transactions (amount)')
+    db.commit()
+    db.close()
+    return path
+
+def write(db):
+    db.execute('INSERT INTO Transactions VALUES (1)')
+    db.commit()
+
+def test_version(closed_project):
+    async def main():
+        charts = ChartCache(maxsize=1024, maxwatchers=4)
+
+        # Closed project is watched immutable, nothing is created next to it
+        version = await charts.version(closed_project)
+        assert await charts.version(closed_project) == version
+        assert sorted(os.listdir(os.path.dirname(closed_project))) == ['charts.db']
+
+        db = sqlite3.connect(closed_project)
+        try:
+            write(db)
+            opened = await charts.version(closed_project)
+            assert opened != version
+
+            # Commits to WAL are seen by the read only watcher
+            assert await charts.version(closed_project) == opened
+            write(db)
+            assert await charts.version(closed_project) != opened
+        finally:
+            await charts.evict(closed_project)
+            db.close()
+
+        # Watcher closed first, last writer removed WAL
+        assert sorted(os.listdir(os.path.dirname(closed_project))) == ['charts.db']
+
+    asyncio.run(main())
+
+def test_get(closed_project):
+    async def main():
+        charts = ChartCache(maxsize=1024, maxwatchers=4)
+        key = ('pie', None)
+
+        charts.put(closed_project, key, await charts.version(closed_project), '<svg/>')
+        assert await charts.get(closed_project, key) == '<svg/>'
+
+        db = sqlite3.connect(closed_project)
+        try:
+            write(db)
+        finally:
+            db.close()
+        assert await charts.get(closed_project, key) is None
+
+        charts.put(closed_project, key, await charts.version(closed_project), '<svg/>')
+        await charts.evict(closed_project)
+        assert await charts.get(closed_project, key) is None
+        assert charts.size == 0
+
+    asyncio.run(main())
+
+def test_maxwatchers(tmp_path):
+    async def main():
+        charts = ChartCache(maxsize=1024, maxwatchers=2)
+        files = []
+        for name in ('a', 'b', 'c'):
+            files.append(str(tmp_path / f'{name}.db'))
+            sqlite3.connect(files[-1]).close()
+            charts.put(files[-1], ('pie',), await charts.version(files[-1]), name)
+
+        # Watcher of the first project was closed, its chart can't be trusted
+        assert await charts.get(files[0], ('pie',)) is None
+        assert await charts.get(files[2], ('pie',)) == 'c'
+
+    asyncio.run(main())
+
+def test_pie(client, project):
+    first = client.get('/pie')
+    assert first.status_code == 200, first.text
+    assert client.get('/pie').text == first.text
+
+    response = client.post('/transaction/create', json={
+        'account_id': project.account_id,
+        'category_id': project.category_id,
+        'transaction_type': 'Withdrawal',
+        'date': '2024-03-01',
+        'amount': '10',
+    })
+    assert response.status_code == 201, response.text
+    assert client.get('/pie').text != first.text
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from money_manager.routers import import_statement
+
+BATCH = 10
+LINES = 3 * BATCH
+
+@pytest.fixture
+def paused_import(monkeypatch):
+    """
+    Background import stops after its first batch until resumed is set
+    """
+    resumed = threading.Event()
+    next_batch = import_statement.next_batch
+    taken = []
+
+    def paused_next_batch(batches):
+        if len(taken) == 1:
+            resumed.wait(10)
+        transactions = next_batch(batches)
+        taken.append(transactions)
+        return transactions
+
+    monkeypatch.setattr(import_statement, 'IMPORT_BATCH', BATCH)
+    monkeypatch.setattr(import_statement, 'next_batch', paused_next_batch)
+    yield resumed
+    resumed.set()
+
+def wait_job(client, id: int, until, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/import/jobs/{id}').json()
+        if until(job) or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+def test_write_during_background_import(client, project, paused_import):
+    response = client.post('/import/', params={'background': True}, json={
+        'account_id': project.account_id,
+        'category_id': project.category_id,
+        'transactions': [
+            {'date': '2024-05-01', 'price': '1.5', 'description': f'line {number}'}
+            for number in range(LINES)
+        ],
+    })
+    assert response.status_code == 202, response.text
+    id = response.json()['job_id']
+
+    job = wait_job(client, id, lambda job: job['rows'] == BATCH)
+    assert job['status'] == 'running', job
+
+    # Progress is committed with the batch, other worker processes read it
+    db = sqlite3.connect(project.path)
+    try:
+        assert db.execute('SELECT status, rows FROM ImportJobs WHERE id = ?', (id,)).fetchone() == ('running', BATCH)
+    finally:
+        db.close()
+
+    response = client.post('/transaction/create', json={
+        'account_id': project.account_id,
+        'category_id': project.category_id,
+        'transaction_type': 'Deposit',
+        'date': '2024-05-02',
+        'amount': '10',
+    })
+    assert response.status_code == 201, response.text
+
+    paused_import.set()
+    job = wait_job(client, id, lambda job: job['status'] != 'running')
+    assert job['status'] == 'done', job
+    assert job['rows'] == LINES
+
+    # Balance triggers of the concurrent write weren't deferred by the import
+    expected = Decimal(100) - Decimal('1.5') * LINES + Decimal(10)
+    accounts = {account['id']: account for account in client.get('/account/list').json()}
+    assert Decimal(str(accounts[project.account_id]['balance'])) == expected
+    assert Decimal(str(job['balance'])) == expected
+
+@pytest.mark.parametrize('age, status', [(0, 'running'), (3600, 'failed')], ids=['other worker', 'stale'])
+def test_job_of_other_process(client, project, age, status):
+    updated_at = datetime.now() - timedelta(seconds=age)
+    db = sqlite3.connect(project.path)
+    try:
+        id = db.execute(
+            "INSERT INTO ImportJobs (account_id, source, status, rows, created_at, started_at, updated_at) "
+            "VALUES (?, 'statement.csv', 'running', 2000, ?, ?, ?)",
+            (project.account_id, *[str(updated_at - timedelta(seconds=10))] * 2, str(updated_at)),
+        ).lastrowid
+        db.commit()
+    finally:
+        db.close()
+
+    job = client.get(f'/import/jobs/{id}').json()
+    assert job['status'] == status, job
+    assert job['rows'] == 2000
+    if status == 'failed':
+        assert job['errors'][0]['msg'] == 'Import was interrupted'
+    else:
+        assert job['rows_per_second'] == pytest.approx(200, rel=0.01)
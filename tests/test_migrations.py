@@ -0,0 +1,70 @@
+import logging
+import sqlite3
+import pytest
+from money_manager.core.engine import create_project_engine
+from money_manager.core.integrity import check
+from money_manager.core.migrations import VERSION, create_schema, get_version, upgrade
+
+@pytest.fixture
+def v7_project(tmp_path):
+    """
+    Project of version 7, before opening balances and balance checkpoints.
+    Cash (100) spent 30, Card (50) lost 80 of its balance to drift.
+    """
+    path = str(tmp_path / 'v7.db')
+    engine = create_project_engine(path)
+    with engine.begin() as connection:
+        create_schema(connection)
+    engine.dispose()
+
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute(
+        "INSERT INTO Accounts (id, title, currency, balance, opening_balance) "
+        "VALUES (1, 'Cash', 'BYN', 100, 0), (2, 'Card', 'BYN', 50, 0)"
+    )
+    db.execute("INSERT INTO Categories (id, title) VALUES (1, 'Food')")
+    db.execute(
+        "INSERT INTO Transactions (account_id, category_id, transaction_type, date, amount, to_amount) "
+        "VALUES (1, 1, 'Withdrawal', '2024-03-01', 30, 0)"
+    )
+    db.execute('UPDATE Accounts SET balance = balance - 80 WHERE id = 2')
+
+    for trigger in ('Insert', 'Delete', 'Update'):
+        db.execute(f'DROP TRIGGER Update_BalanceCheckpoints_On_Transaction_{trigger}')
+    db.execute('DROP TABLE BalanceCheckpoints')
+    db.execute('DROP TABLE DerivedOpeningBalances')
+    db.execute('ALTER TABLE Accounts DROP COLUMN opening_balance')
+    db.execute('ALTER TABLE ImportJobs DROP COLUMN updated_at')
+    db.execute('PRAGMA user_version = 7')
+    db.close()
+
+    engine = create_project_engine(path)
+    yield engine
+    engine.dispose()
+
+def test_derived_opening_balances(v7_project, caplog):
+    with caplog.at_level(logging.WARNING, logger='money_manager.core.migrations'):
+        with v7_project.begin() as connection:
+            upgrade(connection)
+
+    # Only the negative opening balance is suspicious
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert 'Account 2 Card' in warnings[0]
+
+    with v7_project.begin() as connection:
+        assert get_version(connection) == VERSION
+        result = check(connection)
+
+    # Drift became part of opening balance, verify lists what was derived
+    assert result.ok
+    assert result.opening_balances == [
+        {'id': 1, 'title': 'Cash', 'opening_balance': 100, 'derived': 100},
+        {'id': 2, 'title': 'Card', 'opening_balance': -30, 'derived': -30},
+    ]
+
+def test_verify_opening_balances(client, project):
+    # Accounts of new projects have real opening balances
+    result = client.post('/project/verify').json()
+    assert result['ok'], result
+    assert result['opening_balances'] == []
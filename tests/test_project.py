@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import pytest
+
+def test_delete_removes_wal(client, project):
+    # Connection of another process keeps WAL and shared memory after the app closes its own
+    other = sqlite3.connect(project.path)
+    try:
+        other.execute('SELECT COUNT(*) FROM Accounts').fetchone()
+
+        response = client.post('/project/delete', json={'name': project.name})
+        assert response.status_code == 200, response.text
+
+        for suffix in ('', '-wal', '-shm'):
+            assert not os.path.exists(project.path + suffix)
+    finally:
+        other.close()
+
+def project_bytes(path: str) -> bytes:
+    db = sqlite3.connect(path)
+    try:
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        db.close()
+    with open(path, 'rb') as file:
+        return file.read()
+
+def test_upload_new_project(client, project):
+    data = project_bytes(project.path)
+    name = f'copy-{project.name}'
+
+    response = client.post('/project/upload', files={'file': (name, data)})
+    assert response.status_code == 204, response.text
+    assert name in client.get('/project/list').json()
+
+    response = client.post('/project/upload', files={'file': (name, data)})
+    assert response.status_code == 400, response.text
+
+    assert not [name for name in os.listdir(os.path.dirname(project.path)) if name.startswith('.')]
+
+def test_upload_never_overwrites(project, tmp_path):
+    from fastapi import HTTPException
+    from money_manager.core.upload import add_project
+
+    # Project created between the existence check and install
+    temp = tmp_path / 'upload'
+    temp.write_bytes(b'uploaded')
+    before = project_bytes(project.path)
+
+    with pytest.raises(HTTPException) as error:
+        add_project(str(temp), project.path)
+    assert error.value.status_code == 400
+    assert project_bytes(project.path) == before
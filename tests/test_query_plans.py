@@ -0,0 +1,87 @@
+import sqlite3
+from itertools import combinations
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# /transaction/list filters and the index each of them can use,
+# the month filter alone is served by ix_Transactions_date.
+FILTERS = {
+    'account_id': 'ix_Transactions_account_id_date',
+    'category_id': 'ix_Transactions_category_id_date',
+    'tag_id': 'ix_Transactions_tag_id_date',
+    'month': 'ix_Transactions_date',
+}
+
+COMBINATIONS = [
+    combination
+    for size in range(len(FILTERS) + 1)
+    for combination in combinations(FILTERS, size)
+]
+
+@pytest.fixture
+def transactions(client, project):
+    for day in range(1, 7):
+        response = client.post('/transaction/create', json={
+            'account_id': project.account_id,
+            'category_id': project.category_id,
+            'tag_id': project.tag_id,
+            'transaction_type': 'Withdrawal',
+            'date': f'2024-03-0{day}',
+            'amount': '2.5',
+        })
+        assert response.status_code == 201, response.text
+    return project
+
+@pytest.fixture
+def statements():
+    """
+    SQL and parameters of every statement executed during the test
+    """
+    executed = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', capture)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', capture)
+
+def query_plan(path: str, statement: str, parameters) -> list:
+    connection = sqlite3.connect(path)
+    try:
+        return [row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    finally:
+        connection.close()
+
+@pytest.mark.parametrize('with_cursor', [False, True], ids=['first page', 'next page'])
+@pytest.mark.parametrize('filters', COMBINATIONS, ids=lambda filters: '+'.join(filters) or 'none')
+def test_transaction_list_uses_index(client, transactions, statements, filters, with_cursor):
+    values = {
+        'account_id': transactions.account_id,
+        'category_id': transactions.category_id,
+        'tag_id': transactions.tag_id,
+        'month': '2024-03',
+    }
+    params = {name: values[name] for name in filters}
+
+    if with_cursor:
+        first = client.get('/transaction/list', params={**params, 'limit': 1}).json()
+        assert first['next']
+        params['cursor'] = first['next']
+
+    statements.clear()
+    response = client.get('/transaction/list', params={**params, 'limit': 2})
+    assert response.status_code == 200, response.text
+
+    listing = [(sql, parameters) for sql, parameters in statements if 'ORDER BY' in sql]
+    assert len(listing) == 1
+    plan = query_plan(transactions.path, *listing[0])
+
+    indexes = {FILTERS[name] for name in filters if name != 'month'} or {FILTERS['month']}
+    transaction_steps = [step for step in plan if step.split()[1] == 'transaction']
+
+    assert len(transaction_steps) == 1, plan
+    assert any(f'USING INDEX {index} ' in f'{transaction_steps[0]} ' for index in indexes), plan
+    assert not any(step == 'SCAN transaction' for step in plan), plan
+    assert not any('USE TEMP B-TREE FOR ORDER BY' in step for step in plan), plan
@@ -0,0 +1,111 @@
+import json
+from decimal import Decimal
+import pytest
+
+# date, from, to, transaction_type, amount, to_amount
+TRANSACTIONS = [
+    ('2024-01-10', 'cash', None, 'Withdrawal', '10', '0'),
+    ('2024-01-10', 'cash', None, 'Deposit', '200', '0'),
+    ('2024-01-20', 'card', 'cash', 'Transfer', '30', '29.5'),
+    ('2024-02-01', 'cash', 'card', 'Transfer', '40', '0'),
+    ('2024-02-15', 'cash', None, 'Withdrawal', '5.55', '0'),
+    ('2024-03-01', 'card', None, 'Withdrawal', '7', '0'),
+    ('2024-03-02', 'card', 'cash', 'Transfer', '12', '0'),
+    ('2024-03-02', 'cash', None, 'Withdrawal', '1.1', '0'),
+    ('2024-04-30', 'cash', None, 'Deposit', '3', '0'),
+]
+
+@pytest.fixture
+def ledger(client, project):
+    """
+    Cash (100) and Card (50), incoming transfers of cash aren't listed by its account_id.
+    Returns cash id and expected balance of cash after each of its transactions.
+    """
+    accounts = {
+        'cash': project.account_id,
+        'card': client.post('/account/create', json={'title': 'Card', 'currency': 'BYN', 'balance': 50}).json()['id'],
+    }
+    cash = accounts['cash']
+    balance = Decimal(100)
+    expected = {}
+
+    # Created in date order, so (date, id) order is the order of the list
+    for date, account, to_account, type, amount, to_amount in TRANSACTIONS:
+        response = client.post('/transaction/create', json={
+            'account_id': accounts[account],
+            'to_account_id': to_account and accounts[to_account],
+            'category_id': project.category_id,
+            'transaction_type': type,
+            'date': date,
+            'amount': amount,
+            'to_amount': to_amount,
+        })
+        assert response.status_code == 201, response.text
+        id = response.json()['transaction']['id']
+
+        if account == 'cash':
+            balance += Decimal(amount) if type == 'Deposit' else -Decimal(amount)
+            expected[id] = balance
+        if to_account == 'cash':
+            balance += Decimal(to_amount) if Decimal(to_amount) else Decimal(amount)
+
+    return cash, expected
+
+def running(transactions: list) -> dict:
+    return {item['transaction']['id']: Decimal(str(item['balance'])) for item in transactions}
+
+def test_pages(client, ledger):
+    cash, expected = ledger
+    params = {'account_id': cash, 'running_balance': True, 'limit': 2}
+
+    pages = []
+    cursor = None
+    while True:
+        page = client.get('/transaction/list', params={**params, **({'cursor': cursor} if cursor else {})}).json()
+        pages.append(page)
+        cursor = page['next']
+        if not cursor:
+            break
+
+    assert len(pages) == 3
+    listed = {}
+    for page in pages:
+        listed.update(running(page['transactions']))
+    assert listed == expected
+    assert list(listed) == sorted(expected, reverse=True)
+
+    # Previous page from a cursor has the same balances
+    page = client.get('/transaction/list', params={**params, 'cursor': pages[-1]['prev']}).json()
+    assert running(page['transactions']) == running(pages[-2]['transactions'])
+
+@pytest.mark.parametrize('stream', ['ndjson', 'json'])
+def test_stream(client, ledger, stream):
+    cash, expected = ledger
+    response = client.get('/transaction/list', params={
+        'account_id': cash, 'running_balance': True, 'stream': stream,
+    })
+    assert response.status_code == 200, response.text
+
+    if stream == 'ndjson':
+        transactions = [json.loads(line) for line in response.text.splitlines()]
+    else:
+        transactions = response.json()
+    assert running(transactions) == expected
+
+@pytest.mark.parametrize('month', ['2024-02', '2024-03'])
+def test_month(client, ledger, month):
+    cash, expected = ledger
+    params = {'account_id': cash, 'running_balance': True, 'month': month}
+
+    page = client.get('/transaction/list', params=params).json()['transactions']
+    lines = client.get('/transaction/list', params={**params, 'stream': 'ndjson'}).text.splitlines()
+    assert page
+
+    for transactions in (page, [json.loads(line) for line in lines]):
+        balances = running(transactions)
+        assert balances == {id: expected[id] for id in balances}
+        assert all(item['transaction']['date'].startswith(month) for item in transactions)
+
+def test_needs_account(client, ledger):
+    response = client.get('/transaction/list', params={'running_balance': True})
+    assert response.status_code == 400, response.text
@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO, TextIOWrapper
+import pytest
+from money_manager.core.statement import StatementError, parse_csv, parse_ofx, parse_qif, parse_statement
+
+def rows(parser, text: str, **options) -> list:
+    return [
+        (row.date, row.amount, row.description)
+        for row in parser(StringIO(text, newline=''), **options)
+    ]
+
+def test_csv_named_columns():
+    text = 'date,amount,description\r\n2024-01-05,-3.50,Coffee\r\n\r\n2024-01-06,100,Salary\r\n'
+    assert rows(parse_csv, text, description_column='description') == [
+        (date(2024, 1, 5), Decimal('-3.50'), 'Coffee'),
+        (date(2024, 1, 6), Decimal('100'), 'Salary'),
+    ]
+
+def test_csv_indexes_without_header():
+    text = '05.01.2024;"-1 234,50";Rent\n'
+    assert rows(
+        parse_csv, text,
+        header=False, delimiter=';', date_column='0', amount_column='1', description_column='2',
+        date_format='%d.%m.%Y', decimal_separator=',',
+    ) == [(date(2024, 1, 5), Decimal('-1234.50'), 'Rent')]
+
+def test_csv_errors():
+    with pytest.raises(StatementError) as error:
+        rows(parse_csv, 'day,amount\n2024-01-05,1\n')
+    assert error.value.line == 1
+
+    with pytest.raises(StatementError) as error:
+        rows(parse_csv, 'date,amount\n2024-01-05,1\nyesterday,2\n')
+    assert error.value.line == 3
+
+OFX_SGML = '''OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000<TRNAMT>-3.50<NAME>Coffee &amp; cake<MEMO>Card</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240106<TRNAMT>100.00<NAME>Salary</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+'''
+
+OFX_XML = '''<?xml version="1.0"?>
+<OFX><BANKTRANLIST>
+<STMTTRN><DTPOSTED>20240105</DTPOSTED><TRNAMT>-3.50</TRNAMT><NAME>Coffee &amp; cake</NAME><MEMO>Card</MEMO></STMTTRN>
+<STMTTRN><DTPOSTED>20240106</DTPOSTED><TRNAMT>100.00</TRNAMT><NAME>Salary</NAME></STMTTRN>
+</BANKTRANLIST></OFX>
+'''
+
+@pytest.mark.parametrize('text', [OFX_SGML, OFX_XML], ids=['sgml', 'xml'])
+def test_ofx(text):
+    assert rows(parse_ofx, text) == [
+        (date(2024, 1, 5), Decimal('-3.50'), 'Coffee & cake Card'),
+        (date(2024, 1, 6), Decimal('100.00'), 'Salary'),
+    ]
+
+def test_ofx_tag_split_between_chunks(monkeypatch):
+    monkeypatch.setattr('money_manager.core.statement.CHUNK_SIZE', 7)
+    assert len(rows(parse_ofx, OFX_XML)) == 2
+
+def test_qif():
+    text = '''!Type:Bank
+D01/05/2024
+T-3.50
+PCoffee
+MCard
+^
+D1/6'24
+U100.00
+PSalary
+^
+D12/31/99
+T-1
+^
+'''
+    assert rows(parse_qif, text) == [
+        (date(2024, 1, 5), Decimal('-3.50'), 'Coffee Card'),
+        (date(2024, 1, 6), Decimal('100.00'), 'Salary'),
+        (date(1999, 12, 31), Decimal('-1'), None),
+    ]
+
+@pytest.mark.parametrize('value, date_format', [
+    ('05.01.24', '%d.%m.%y'),
+    ('5/1/24', '%d/%m/%y'),
+    ('5/1/2024', '%d/%m/%Y'),
+])
+def test_qif_date_format(value, date_format):
+    assert rows(parse_qif, f'D{value}\nT1\n^\n', date_format=date_format)[0][0] == date(2024, 1, 5)
+
+def test_wrong_encoding():
+    data = 'date,amount,description\n2024-01-05,1,Coffee\n2024-01-06,2,Кофе\n'.encode('cp1251')
+    text = TextIOWrapper(BytesIO(data), encoding='utf-8', newline='')
+
+    with pytest.raises(StatementError) as error:
+        list(parse_statement('csv', text, description_column='description'))
+    assert 'utf-8' in error.value.msg
@@ -0,0 +1,55 @@
+import json
+import pytest
+
+# Response fields of /transaction endpoints, same as API schemes
+FIELDS = {
+    'transaction': {
+        'id', 'account_id', 'to_account_id', 'category_id', 'tag_id',
+        'transaction_type', 'date', 'amount', 'to_amount', 'description',
+    },
+    'from_account': {'id', 'title', 'currency', 'balance'},
+    'to_account': {'id', 'title', 'currency', 'balance'},
+    'category': {'id', 'parent_id', 'title'},
+    'tag': {'id', 'title'},
+}
+
+@pytest.fixture
+def transfer(client, project):
+    account = client.post('/account/create', json={'title': 'Card', 'currency': 'BYN', 'balance': 0})
+    response = client.post('/transaction/create', json={
+        'account_id': project.account_id,
+        'to_account_id': account.json()['id'],
+        'category_id': project.category_id,
+        'tag_id': project.tag_id,
+        'transaction_type': 'Transfer',
+        'date': '2024-03-01',
+        'amount': '2.5',
+        'description': 'to card',
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def assert_fields(item: dict):
+    assert set(item) - {'balance'} == set(FIELDS)
+    for name, fields in FIELDS.items():
+        assert set(item[name]) == fields, name
+
+def test_response_fields(client, transfer):
+    assert_fields(transfer)
+
+    listing = client.get('/transaction/list').json()['transactions']
+    assert len(listing) == 1
+    assert_fields(listing[0])
+
+    params = {'account_id': transfer['transaction']['account_id'], 'running_balance': True}
+    listing = client.get('/transaction/list', params=params).json()['transactions']
+    assert 'balance' in listing[0]
+    assert_fields(listing[0])
+
+    response = client.post('/transaction/update', json={**transfer['transaction'], 'amount': '3'})
+    assert response.status_code == 200, response.text
+    assert_fields(response.json())
+
+    lines = client.get('/transaction/list', params={'stream': 'ndjson'}).text.splitlines()
+    assert len(lines) == 1
+    assert_fields(json.loads(lines[0]))